@@ -0,0 +1,249 @@
+import os
+import sys
+import copy
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Root level for every logger; modules don't set their own
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# Log file, rotated by size into LOG_BACKUP_COUNT numbered backups; empty disables file logging
+LOG_FILE = os.getenv("LOG_FILE", "app.log")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+
+# "text" (default) or "json" for one structured object per line
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+
+# Records waiting for the writer thread; when it is full new records are dropped, never waited on
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Minimum seconds between two records from the same rate-limited call site
+HOT_PATH_LOG_INTERVAL = float(os.getenv("HOT_PATH_LOG_INTERVAL", "10"))
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# LogRecord attributes that are not ``extra`` fields
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_traceback_formatter = logging.Formatter()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the record's fields, any ``extra`` fields and the traceback."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to a queue without ever waiting: a full queue drops the
+    record and counts it.
+
+    Unlike the stdlib handler, ``prepare`` keeps the message, ``extra``
+    fields and traceback separate, so the structured formatter on the
+    other side of the queue still sees them as fields.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            # Tracebacks don't pickle (worker queues) and must be rendered while the frames exist
+            record.exc_text = _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # The default put_nowait fails on a full queue; at shutdown waiting is fine
+        self.queue.put(self._sentinel)
+
+
+class _ForwardHandler(logging.Handler):
+    """Re-emits records received from child processes through this process's loggers."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        logger = logging.getLogger(record.name)
+        if logger.isEnabledFor(record.levelno):
+            logger.handle(record)
+
+
+_lock = threading.Lock()
+_listener: Optional[_QueueListener] = None
+_queue_handler: Optional[_NonBlockingQueueHandler] = None
+
+
+def _build_handlers() -> List[logging.Handler]:
+    formatter = JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+    handlers: List[logging.Handler] = [logging.StreamHandler()]
+    if LOG_FILE:
+        handlers.append(logging.handlers.RotatingFileHandler(
+            LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8", delay=True
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def _replace_root_handlers(handler: logging.Handler) -> None:
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+
+
+def configure_logging() -> None:
+    """
+    Sets up logging for the whole process; safe to call more than once.
+
+    The root logger gets a single handler that puts records on a bounded
+    in-memory queue. A background listener thread takes them off the queue
+    and writes them to stderr and the size-rotated LOG_FILE, so request
+    threads never wait on log I/O. Pending records are flushed at exit.
+    """
+    global _listener, _queue_handler
+    with _lock:
+        if _listener is not None:
+            return
+        _queue_handler = _NonBlockingQueueHandler(queue.Queue(maxsize=max(1, LOG_QUEUE_SIZE)))
+        _replace_root_handlers(_queue_handler)
+        _listener = _QueueListener(_queue_handler.queue, *_build_handlers(), respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Writes out queued records and stops the listener thread."""
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def logging_stats() -> Dict[str, Any]:
+    if _queue_handler is None:
+        return {"configured": False}
+    return {
+        "configured": True,
+        "queued": _queue_handler.queue.qsize(),
+        "queue_size": _queue_handler.queue.maxsize,
+        "dropped": _queue_handler.dropped,
+    }
+
+
+@contextmanager
+def process_log_queue(context) -> Iterator[Any]:
+    """
+    Queue for log records from child processes, forwarded to this process's
+    logging while the block runs.
+
+    Pass the queue to ``configure_worker_logging`` in each child (e.g. from
+    a pool initializer), so workers never write the log file themselves.
+    """
+    log_queue = context.Queue()
+    listener = logging.handlers.QueueListener(log_queue, _ForwardHandler())
+    listener.start()
+    try:
+        yield log_queue
+    finally:
+        listener.stop()
+
+
+def configure_worker_logging(log_queue) -> None:
+    """Sends every record of this (child) process to the parent over ``log_queue``."""
+    _replace_root_handlers(_NonBlockingQueueHandler(log_queue))
+
+
+class RateLimitedLogger:
+    """
+    Logger wrapper for messages on per-request hot paths.
+
+    Each call site emits at most one record per ``interval`` seconds; the
+    next record that gets through reports how many were suppressed since
+    (in the message and as the ``suppressed`` field). Suppressed calls
+    never reach a handler.
+    """
+
+    def __init__(self, logger: logging.Logger, interval: float = HOT_PATH_LOG_INTERVAL):
+        self.logger = logger
+        self.interval = interval
+        # (file, line) -> [time of the last emitted record, calls suppressed since]
+        self._sites: Dict[Tuple[str, int], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def _log(self, level: int, msg: str, *args: Any, **kwargs: Any) -> None:
+        if not self.logger.isEnabledFor(level):
+            return
+        frame = sys._getframe(2)
+        site = (frame.f_code.co_filename, frame.f_lineno)
+        now = time.monotonic()
+        with self._lock:
+            state = self._sites.get(site)
+            if state is not None and now - state[0] < self.interval:
+                state[1] += 1
+                return
+            suppressed = state[1] if state is not None else 0
+            self._sites[site] = [now, 0]
+
+        if suppressed:
+            msg = f"{msg} ({suppressed} similar messages suppressed)"
+        kwargs["extra"] = {**kwargs.get("extra", {}), "suppressed": suppressed}
+        # stacklevel 3 attributes the record to the caller of info()/warning()
+        self.logger.log(level, msg, *args, stacklevel=3, **kwargs)
+
+    def debug(self, msg: str, *args: Any, **kwargs: Any) -> None:
+        self._log(logging.DEBUG, msg, *args, **kwargs)
+
+    def info(self, msg: str, *args: Any, **kwargs: Any) -> None:
+        self._log(logging.INFO, msg, *args, **kwargs)
+
+    def warning(self, msg: str, *args: Any, **kwargs: Any) -> None:
+        self._log(logging.WARNING, msg, *args, **kwargs)
+
+    def error(self, msg: str, *args: Any, **kwargs: Any) -> None:
+        self._log(logging.ERROR, msg, *args, **kwargs)
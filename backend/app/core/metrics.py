@@ -0,0 +1,190 @@
+import os
+import time
+import bisect
+import functools
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Set to false to turn every observation into a no-op
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Histogram upper bounds in seconds, from sub-millisecond lookups to minute-long parses
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+class _Timer:
+    """Context manager that observes its elapsed wall time on exit."""
+
+    __slots__ = ("_histogram", "_labels", "_start")
+
+    def __init__(self, histogram: "Histogram", labels: Dict[str, Any]):
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self._histogram.observe(time.perf_counter() - self._start, **self._labels)
+        return False
+
+
+class Histogram:
+    """
+    Latency histogram with optional labels, exported in Prometheus format.
+
+    Each label combination keeps per-bucket counts plus a running sum, so an
+    observation is one bisect and two increments under a lock. Buckets are
+    stored non-cumulatively and summed only when rendered.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [bucket counts (last one is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def observe(self, value: float, **labels: Any) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, **labels: Any) -> _Timer:
+        """Times a ``with`` block: ``with PARSE_SECONDS.time(file_type="pdf"): ...``"""
+        return _Timer(self, labels)
+
+    def timed(self, **labels: Any) -> Callable:
+        """Decorator that observes the duration of every call, including ones that raise."""
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - start, **labels)
+            return wrapper
+        return decorator
+
+    def take(self) -> Dict[Tuple[str, ...], List[Any]]:
+        """Removes and returns the recorded series (see MetricsRegistry.take_observations)."""
+        with self._lock:
+            series, self._series = self._series, {}
+        return series
+
+    def merge(self, series: Dict[Tuple[str, ...], List[Any]]) -> None:
+        with self._lock:
+            for key, (counts, total) in series.items():
+                current = self._series.get(key)
+                if current is None:
+                    self._series[key] = [list(counts), total]
+                    continue
+                for i, count in enumerate(counts):
+                    current[0][i] += count
+                current[1] += total
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = [(key, list(counts), total) for key, (counts, total) in self._series.items()]
+
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        bounds = self.buckets + (float("inf"),)
+        for key, counts, total in sorted(snapshot):
+            labels = "".join(f'{name}="{_escape(value)}",' for name, value in zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels}le="{_format_bound(bound)}"}} {cumulative}')
+            label_set = f"{{{labels.rstrip(',')}}}" if labels else ""
+            lines.append(f"{self.name}_sum{label_set} {total!r}")
+            lines.append(f"{self.name}_count{label_set} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-wide set of histograms, rendered together for the /metrics endpoint.
+
+    Modules declare their histograms at import time, next to the code they
+    time. Rendering copies each histogram's counts under its own lock, so a
+    scrape never holds up the hot paths for longer than that copy.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        """Returns the named histogram, creating it on first declaration."""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Histogram(name, documentation, labelnames, buckets)
+            return metric
+
+    def take_observations(self) -> Dict[str, Dict[Tuple[str, ...], List[Any]]]:
+        """
+        Removes and returns everything recorded so far.
+
+        Ingestion pool processes return this with each parsed file, and the
+        parent process merges it, so parse and OCR timings from workers show
+        up in the parent's /metrics.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        observations = {}
+        for metric in metrics:
+            series = metric.take()
+            if series:
+                observations[metric.name] = series
+        return observations
+
+    def merge_observations(self, observations: Dict[str, Dict[Tuple[str, ...], List[Any]]]) -> None:
+        for name, series in (observations or {}).items():
+            metric = self._metrics.get(name)
+            # Histograms are declared by module import, which the parent has done for every worker module
+            if metric is not None:
+                metric.merge(series)
+
+    def render(self) -> str:
+        """All histograms in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,95 @@
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class ResourceRegistry:
+    """
+    Lazily created, process-wide heavy resources (embedding model, Chroma
+    client, Docling converters, Tesseract).
+
+    Modules register a factory at import time, which is cheap; the factory
+    only runs on the first ``get``. Each resource has its own lock so two
+    threads never build the same resource twice, and a slow resource never
+    blocks access to one that is already loaded.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._values: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._errors: Dict[str, str] = {}
+        self._load_times: Dict[str, float] = {}
+        self._registry_lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:
+        with self._registry_lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str) -> Any:
+        """Returns the resource, creating it on first use."""
+        value = self._values.get(name, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        if name not in self._factories:
+            raise KeyError(f"Unknown resource: {name}")
+
+        with self._locks[name]:
+            value = self._values.get(name, _MISSING)
+            if value is not _MISSING:
+                return value
+
+            start = time.perf_counter()
+            try:
+                value = self._factories[name]()
+            except Exception as e:
+                self._errors[name] = str(e)
+                logger.error(f"Failed to initialize resource {name}: {e}")
+                raise
+            self._load_times[name] = time.perf_counter() - start
+            self._errors.pop(name, None)
+            self._values[name] = value
+            logger.info(f"Initialized resource {name} in {self._load_times[name]:.2f}s")
+            return value
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._values
+
+    def reset(self, name: str) -> None:
+        """Drops a loaded resource so the next ``get`` rebuilds it."""
+        with self._locks.get(name, self._registry_lock):
+            self._values.pop(name, None)
+
+    def warmup(self, names: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Loads the given (default: all) resources now instead of on first request."""
+        for name in names or list(self._factories):
+            try:
+                self.get(name)
+            except Exception:
+                # Already recorded in the status; warmup keeps going
+                pass
+        return self.status()
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        status = {}
+        for name in self._factories:
+            if name in self._values:
+                status[name] = {"state": "loaded", "load_time": self._load_times.get(name)}
+            elif name in self._errors:
+                status[name] = {"state": "failed", "error": self._errors[name]}
+            else:
+                status[name] = {"state": "not_loaded"}
+        return status
+
+    def ready(self) -> bool:
+        return all(name in self._values for name in self._factories)
+
+
+registry = ResourceRegistry()
@@ -0,0 +1,179 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional, Any
+import numpy as np
+
+from .paragraphs import ParagraphBatch
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever parser output changes so stale entries are never served
+PARSER_VERSION = "2"
+
+INGESTION_CACHE_DIR = os.getenv("INGESTION_CACHE_DIR", ".ingestion_cache")
+INGESTION_CACHE_MAX_BYTES = int(os.getenv("INGESTION_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+INGESTION_CACHE_ENABLED = os.getenv("INGESTION_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _settings_fingerprint() -> str:
+    """Parser settings that change the parsed output."""
+    # Imported here so the cache module does not pull in the parser stack
+    from .triage import TRIAGE_MIN_TEXT_CHARS
+    return f"parser={PARSER_VERSION};triage_min_chars={TRIAGE_MIN_TEXT_CHARS}"
+
+
+class IngestionCache:
+    """
+    Content-addressed on-disk cache of parsed paragraphs and their embeddings.
+
+    Entries are keyed by a hash of the file bytes plus the parser version and
+    settings, so a repeat upload of the same file is a lookup rather than a
+    reparse. Embeddings are stored per embedding model next to the
+    paragraphs. The least recently used files are evicted once the cache
+    grows past ``max_bytes``.
+    """
+
+    def __init__(self, cache_dir: str = INGESTION_CACHE_DIR, max_bytes: int = INGESTION_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {
+            "paragraph_hits": 0,
+            "paragraph_misses": 0,
+            "embedding_hits": 0,
+            "embedding_misses": 0,
+            "evictions": 0,
+        }
+
+    def file_key(self, file_path: str) -> str:
+        """Hashes the file contents together with the parser settings."""
+        digest = hashlib.sha256(_settings_fingerprint().encode("utf-8"))
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _paragraphs_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.paragraphs.json")
+
+    def _embeddings_path(self, key: str, model_name: str) -> str:
+        model_tag = hashlib.sha256(model_name.encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"{key}.{model_tag}.npy")
+
+    def _count(self, stat: str) -> None:
+        with self._lock:
+            self._stats[stat] += 1
+
+    def get_paragraphs(self, key: str, document_name: str, user_id: str) -> Optional[ParagraphBatch]:
+        """Returns cached paragraphs re-bound to the given document and user, or None."""
+        path = self._paragraphs_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                columns = json.load(f)
+            paragraphs = ParagraphBatch.from_columns(columns, document_name, user_id)
+            os.utime(path)
+        except (OSError, ValueError, KeyError, TypeError):
+            self._count("paragraph_misses")
+            return None
+
+        self._count("paragraph_hits")
+        return paragraphs
+
+    def put_paragraphs(self, key: str, paragraphs: ParagraphBatch) -> None:
+        # Stored column-wise; the document and user are re-bound on read
+        columns = paragraphs.to_columns()
+        self._write(self._paragraphs_path(key), lambda f: f.write(json.dumps(columns).encode("utf-8")))
+
+    def get_embeddings(self, key: str, model_name: str) -> Optional[np.ndarray]:
+        path = self._embeddings_path(key, model_name)
+        try:
+            embeddings = np.load(path)
+            os.utime(path)
+        except (OSError, ValueError):
+            self._count("embedding_misses")
+            return None
+
+        self._count("embedding_hits")
+        return embeddings
+
+    def put_embeddings(self, key: str, model_name: str, embeddings: Any) -> None:
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        self._write(self._embeddings_path(key, model_name), lambda f: np.save(f, matrix))
+
+    def _write(self, path: str, writer) -> None:
+        # Write then rename so concurrent readers never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                writer(f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Failed writing ingestion cache entry {path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._evict()
+
+    def _evict(self) -> None:
+        """Removes least recently used files until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".tmp"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self._count("evictions")
+            if total <= self.max_bytes:
+                break
+
+    def take_counts(self) -> Dict[str, int]:
+        """
+        Removes and returns the counters recorded so far.
+
+        Ingestion pool processes return this with each parsed file and the
+        parent merges it (see merge_counts), so lookups made in workers show
+        up in the parent's stats.
+        """
+        with self._lock:
+            counts = dict(self._stats)
+            for stat in self._stats:
+                self._stats[stat] = 0
+        return counts
+
+    def merge_counts(self, counts: Optional[Dict[str, int]]) -> None:
+        with self._lock:
+            for stat, value in (counts or {}).items():
+                if stat in self._stats:
+                    self._stats[stat] += value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["paragraph_hits"] + stats["paragraph_misses"]
+        stats["paragraph_hit_rate"] = stats["paragraph_hits"] / lookups if lookups else 0.0
+        return stats
+
+
+ingestion_cache = IngestionCache() if INGESTION_CACHE_ENABLED else None
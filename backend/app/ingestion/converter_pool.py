@@ -0,0 +1,122 @@
+import os
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+from typing import List, Iterator, Tuple, Any
+
+from app.core.resources import registry
+from .paragraphs import ParagraphBatch
+
+logger = logging.getLogger(__name__)
+
+# Converters kept per process; each one holds its own layout and table models
+DOCLING_POOL_SIZE = int(os.getenv("DOCLING_POOL_SIZE", "1"))
+
+
+class DoclingConverterPool:
+    """
+    Long-lived pool of Docling converters and chunkers shared by the PDF and
+    DOCX parsers.
+
+    Building a DocumentConverter loads layout and table models and a
+    HybridChunker loads a tokenizer, so both are created once per process and
+    handed out to one caller at a time. Converters are created lazily up to
+    ``size``; further callers wait for one to be returned. The ingestion
+    parser processes are long-lived (see pipeline.get_parser_pool), so a
+    worker's converter serves every file it parses.
+    """
+
+    def __init__(self, size: int = DOCLING_POOL_SIZE):
+        self.size = max(1, size)
+        self._idle: "queue.Queue[Tuple[Any, Any]]" = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _create(self) -> Tuple[Any, Any]:
+        # Docling is imported on first use; the import alone pulls in torch
+        from docling.document_converter import DocumentConverter
+        from docling.chunking import HybridChunker
+
+        logger.info("Creating Docling converter")
+        return DocumentConverter(), HybridChunker()
+
+    @contextmanager
+    def acquire(self) -> Iterator[Tuple[Any, Any]]:
+        """Borrows a converter and chunker, creating one if the pool is not full."""
+        try:
+            item = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    item = self._create()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                item = self._idle.get()
+        try:
+            yield item
+        finally:
+            self._idle.put(item)
+
+    def warm(self) -> None:
+        """Creates the converter and initializes the PDF and DOCX pipelines up front."""
+        from docling.datamodel.base_models import InputFormat
+
+        with self.acquire() as (converter, _):
+            for input_format in (InputFormat.PDF, InputFormat.DOCX):
+                try:
+                    converter.initialize_pipeline(input_format)
+                except Exception as e:
+                    logger.warning(f"Could not warm Docling pipeline for {input_format}: {e}")
+        logger.info("Docling converter pool warmed")
+
+
+docling_pool = DoclingConverterPool()
+
+
+def _warm_docling_pool() -> DoclingConverterPool:
+    docling_pool.warm()
+    return docling_pool
+
+
+registry.register("docling", _warm_docling_pool)
+
+
+def load_doc_chunks(file_path: str) -> List[Any]:
+    """
+    Converts and chunks one file with a pooled converter.
+
+    Returns:
+        List[Document]: The file's Docling chunks, in document order.
+    """
+    from langchain_docling import DoclingLoader
+
+    with docling_pool.acquire() as (converter, chunker):
+        loader = DoclingLoader(
+            file_path=file_path,
+            converter=converter,
+            chunker=chunker,
+            export_type="doc_chunks"
+        )
+        return list(loader.lazy_load())
+
+
+def chunks_to_paragraphs(chunks: List[Any], document_name: str, user_id: str) -> ParagraphBatch:
+    """Docling chunks of one file (from load_doc_chunks) as a ParagraphBatch."""
+    paragraphs = ParagraphBatch(document_name, user_id)
+    for chunk in chunks:
+        # append skips chunks whose text is empty
+        paragraphs.append(
+            chunk.page_content,
+            chunk.metadata.get("page", 0),
+            chunk.metadata.get("section"),
+            chunk.metadata.get("is_heading", False)
+        )
+    return paragraphs
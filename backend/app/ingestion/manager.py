@@ -1,13 +1,20 @@
 import os
 import logging
-from typing import List, Dict
+from typing import Optional
 from pathlib import Path
-from .pdf_parser import parse_pdf
+from .pdf_parser import parse_pdf, parse_pdf_text_pages
 from .docs_parser import parse_docx
 from .ocr_parser import parse_ocr_file
+from .triage import classify_pdf_pages
+from .cache import ingestion_cache
+from .paragraphs import ParagraphBatch
+from app.core.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+# Cache hits are not parses and are not observed
+PARSE_SECONDS = metrics.histogram("ingestion_parse_seconds", "Time to parse one file", ["file_type"])
+
 SUPPORTED_FILE_TYPES = {
     ".pdf": "pdf",
     ".docx": "docx",
@@ -17,12 +24,56 @@ SUPPORTED_FILE_TYPES = {
     ".tiff": "image"
 }
 
-def process_file(file_path: str, document_name: str, user_id: str) -> List[Dict]:
+def _process_pdf(file_path: str, document_name: str, user_id: str) -> ParagraphBatch:
+    """
+    Parses each PDF page once, with the cheapest parser that works for it.
+    Digital PDFs go through Docling, fully scanned PDFs straight to OCR, and
+    mixed PDFs read the text layer of digital pages and OCR only the rest.
+    """
+    try:
+        has_text = classify_pdf_pages(file_path)
+    except Exception as e:
+        logger.warning(f"Page triage failed for {document_name}, parsing whole document: {e}")
+        has_text = None
+
+    if has_text is not None and not any(has_text):
+        logger.info(f"No text layer in PDF, using OCR for: {document_name}")
+        parsed_ocr = parse_ocr_file(file_path, document_name, user_id)
+        logger.info(f"OCR parsed {len(parsed_ocr)} paragraphs from {document_name}")
+        return parsed_ocr
+
+    if has_text is not None and not all(has_text):
+        text_pages = [i + 1 for i, flag in enumerate(has_text) if flag]
+        scanned_pages = [i + 1 for i, flag in enumerate(has_text) if not flag]
+        logger.info(f"Mixed PDF {document_name}: {len(text_pages)} text pages, {len(scanned_pages)} scanned pages")
+        parsed = parse_pdf_text_pages(file_path, document_name, user_id, text_pages)
+        parsed += parse_ocr_file(file_path, document_name, user_id, pages=scanned_pages)
+        return parsed.sorted_by_page()
+
+    parsed = parse_pdf(file_path, document_name, user_id)
+
+    if len(parsed) > 0:
+        logger.info(f"Successfully parsed normal PDF: {document_name} with {len(parsed)} paragraphs.")
+        return parsed
+    else:
+        logger.warning(f"No text found in PDF, falling back to OCR for: {document_name}")
+        parsed_ocr = parse_ocr_file(file_path, document_name, user_id)
+        logger.info(f"OCR parsed {len(parsed_ocr)} paragraphs from {document_name}")
+        return parsed_ocr
+
+def process_file(
+    file_path: str,
+    document_name: str,
+    user_id: str,
+    cache_key: Optional[str] = None
+) -> ParagraphBatch:
     """
     Routes the file to the correct parsing utility based on its type.
     Handles normal PDFs, scanned PDFs, DOCX, and image files.
+    Repeat uploads of the same file contents are served from the ingestion
+    cache; pass ``cache_key`` when the caller has already hashed the file.
     Returns:
-        List[Dict]: Parsed paragraphs with metadata.
+        ParagraphBatch: Parsed paragraphs with metadata; empty on failure.
     """
     try:
         ext = Path(file_path).suffix.lower()
@@ -31,35 +82,41 @@ def process_file(file_path: str, document_name: str, user_id: str) -> List[Dict]
             logger.error(f"Unsupported file type: {ext} for {document_name}")
             raise ValueError(f"Unsupported file type: {ext}")
 
-        file_type = SUPPORTED_FILE_TYPES[ext]
-        logger.info(f"Processing file: {document_name} as type: {file_type}")
+        if ingestion_cache is not None:
+            cache_key = cache_key or ingestion_cache.file_key(file_path)
+            cached = ingestion_cache.get_paragraphs(cache_key, document_name, user_id)
+            if cached is not None:
+                logger.info(f"Ingestion cache hit for {document_name}: {len(cached)} paragraphs")
+                return cached
+
+        with PARSE_SECONDS.time(file_type=SUPPORTED_FILE_TYPES[ext]):
+            parsed = _parse_by_type(file_path, ext, document_name, user_id)
+
+        if parsed and ingestion_cache is not None:
+            ingestion_cache.put_paragraphs(cache_key, parsed)
+        return parsed
 
-        if file_type == "pdf":
-            parsed = parse_pdf(file_path, document_name, user_id)
+    except Exception as e:
+        logger.exception(f"[MANAGER ERROR] Failed processing {document_name}: {e}")
+        return ParagraphBatch(document_name, user_id)
 
-            if parsed and len(parsed) > 0:
-                logger.info(f"Successfully parsed normal PDF: {document_name} with {len(parsed)} paragraphs.")
-                return parsed
-            else:
-                logger.warning(f"No text found in PDF, falling back to OCR for: {document_name}")
-                parsed_ocr = parse_ocr_file(file_path, document_name, user_id)
-                logger.info(f"OCR parsed {len(parsed_ocr)} paragraphs from {document_name}")
-                return parsed_ocr
+def _parse_by_type(file_path: str, ext: str, document_name: str, user_id: str) -> ParagraphBatch:
+    file_type = SUPPORTED_FILE_TYPES[ext]
+    logger.info(f"Processing file: {document_name} as type: {file_type}")
 
-        elif file_type == "docx":
-            parsed = parse_docx(file_path, document_name, user_id)
-            logger.info(f"Parsed {len(parsed)} paragraphs from DOCX: {document_name}")
-            return parsed
+    if file_type == "pdf":
+        return _process_pdf(file_path, document_name, user_id)
 
-        elif file_type == "image":
-            parsed = parse_ocr_file(file_path, document_name, user_id)
-            logger.info(f"Parsed {len(parsed)} paragraphs from image file: {document_name}")
-            return parsed
+    elif file_type == "docx":
+        parsed = parse_docx(file_path, document_name, user_id)
+        logger.info(f"Parsed {len(parsed)} paragraphs from DOCX: {document_name}")
+        return parsed
 
-        else:
-            logger.error(f"No parser defined for file type: {file_type}")
-            raise ValueError(f"No parser defined for file type: {file_type}")
+    elif file_type == "image":
+        parsed = parse_ocr_file(file_path, document_name, user_id)
+        logger.info(f"Parsed {len(parsed)} paragraphs from image file: {document_name}")
+        return parsed
 
-    except Exception as e:
-        logger.exception(f"[MANAGER ERROR] Failed processing {document_name}: {e}")
-        return []
+    else:
+        logger.error(f"No parser defined for file type: {file_type}")
+        raise ValueError(f"No parser defined for file type: {file_type}")
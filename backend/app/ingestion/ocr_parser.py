@@ -1,63 +1,148 @@
-import uuid
+import os
 import logging
-from typing import List, Dict
+from typing import List, Iterator, Optional
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
-import pytesseract
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+from app.core.resources import registry
+from app.core.metrics import metrics
+from .paragraphs import ParagraphBatch
 
 logger = logging.getLogger(__name__)
 
+# Concurrent Tesseract processes used for OCR
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+
+# Pages rendered to bitmaps at once; bounds peak memory for large scans
+OCR_PAGE_WINDOW = int(os.getenv("OCR_PAGE_WINDOW", str(OCR_WORKERS)))
+
+# Tesseract time per page; rendering PDF pages to images is not included
+OCR_PAGE_SECONDS = metrics.histogram("ocr_page_seconds", "Time to OCR one page")
+
+
+def _load_tesseract():
+    """Imports pytesseract and checks that the tesseract binary is installed."""
+    import pytesseract
+    pytesseract.get_tesseract_version()
+    return pytesseract
+
+
+registry.register("tesseract", _load_tesseract)
+
+
+def _page_paragraphs(
+    text: str,
+    page: int,
+    document_name: str,
+    user_id: str,
+    min_paragraph_length: int
+) -> ParagraphBatch:
+    """Splits the OCR text of one page into paragraphs."""
+    paragraphs = [p.strip() for p in text.split('\n\n') if len(p.strip()) >= min_paragraph_length]
+
+    parsed = ParagraphBatch(document_name, user_id)
+    char_offset = 0
+    for p in paragraphs:
+        parsed.append(p, page, char_start=char_offset, char_end=char_offset + len(p))
+        char_offset += len(p) + 2
+    return parsed
+
+
+def _ocr_pages(
+    file_path: str,
+    document_name: str,
+    user_id: str,
+    lang: str = "eng",
+    min_paragraph_length: int = 10,
+    workers: int = OCR_WORKERS,
+    page_window: int = OCR_PAGE_WINDOW,
+    pages: Optional[List[int]] = None
+) -> Iterator[ParagraphBatch]:
+    """
+    OCRs a file page by page, yielding the paragraphs of each page in page order.
+
+    PDF pages are rendered ``page_window`` at a time and OCR'd across
+    ``workers`` Tesseract processes, so peak memory depends on the window,
+    not on the page count. ``pages`` restricts a PDF to the given 1-based
+    page numbers.
+
+    Raises:
+        ValueError: If the file type is not supported for OCR.
+    """
+    ext = Path(file_path).suffix.lower()
+    pytesseract = registry.get("tesseract")
+
+    def ocr(image: Image.Image) -> str:
+        try:
+            with OCR_PAGE_SECONDS.time():
+                return pytesseract.image_to_string(image, lang=lang)
+        finally:
+            image.close()
+
+    if ext in [".jpg", ".jpeg", ".png", ".tiff"]:
+        text = ocr(Image.open(file_path))
+        yield _page_paragraphs(text, 1, document_name, user_id, min_paragraph_length)
+        return
+
+    if ext != ".pdf":
+        logger.error(f"Unsupported file type for OCR: {ext}")
+        raise ValueError(f"Unsupported file type for OCR: {ext}")
+
+    page_count = int(pdfinfo_from_path(file_path)["Pages"])
+    if pages is None:
+        page_numbers = list(range(1, page_count + 1))
+    else:
+        page_numbers = sorted(p for p in set(pages) if 1 <= p <= page_count)
+    page_window = max(1, page_window)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for start in range(0, len(page_numbers), page_window):
+            window = page_numbers[start:start + page_window]
+            if window[-1] - window[0] == len(window) - 1:
+                images = convert_from_path(file_path, first_page=window[0], last_page=window[-1])
+            else:
+                images = [
+                    convert_from_path(file_path, first_page=page, last_page=page)[0]
+                    for page in window
+                ]
+            # pytesseract shells out to tesseract, so threads run the pages in parallel
+            for page, text in zip(window, pool.map(ocr, images)):
+                yield _page_paragraphs(text, page, document_name, user_id, min_paragraph_length)
+            del images
+
+
 def parse_ocr_file(
     file_path: str,
     document_name: str,
     user_id: str,
     lang: str = "eng",
-    min_paragraph_length: int = 10
-) -> List[Dict]:
+    min_paragraph_length: int = 10,
+    pages: Optional[List[int]] = None
+) -> ParagraphBatch:
     """
     Handles both scanned PDFs and image files for OCR.
     Supports: PDF, JPG, JPEG, PNG, TIFF
+    For PDFs, ``pages`` limits OCR to the given 1-based page numbers.
+
+    Pages are rendered in bounded windows (see _ocr_pages), but the result
+    is returned for the whole file: indexing diffs a document's complete
+    parse against its stored chunks (vector_store.sync_document).
 
     Returns:
-        List[Dict]: Paragraph-level OCR output with metadata.
+        ParagraphBatch: Paragraph-level OCR output with metadata.
     """
     try:
-        ext = Path(file_path).suffix.lower()
-
-        if ext == ".pdf":
-            images = convert_from_path(file_path)
-        elif ext in [".jpg", ".jpeg", ".png", ".tiff"]:
-            images = [Image.open(file_path)]
-        else:
-            logger.error(f"Unsupported file type for OCR: {ext}")
-            raise ValueError(f"Unsupported file type for OCR: {ext}")
-
-        parsed = []
-
-        for i, image in enumerate(images):
-            text = pytesseract.image_to_string(image, lang=lang)
-            paragraphs = [p.strip() for p in text.split('\n\n') if len(p.strip()) >= min_paragraph_length]
-
-            char_offset = 0
-            for p in paragraphs:
-                para_data = {
-                    "paragraph_id": str(uuid.uuid4()),
-                    "text": p,
-                    "page": i + 1,
-                    "section": None,
-                    "is_heading": False,
-                    "document_name": document_name,
-                    "user_id": user_id,
-                    "char_start": char_offset,
-                    "char_end": char_offset + len(p)
-                }
-                char_offset += len(p) + 2
-                parsed.append(para_data)
+        parsed = ParagraphBatch(document_name, user_id)
+        for page_paragraphs in _ocr_pages(
+            file_path, document_name, user_id, lang, min_paragraph_length, pages=pages
+        ):
+            parsed.extend(page_paragraphs)
 
         logger.info(f"OCR extracted {len(parsed)} paragraphs from {document_name}")
         return parsed
 
     except Exception as e:
         logger.exception(f"[OCR PARSER ERROR] Failed to OCR {document_name}: {e}")
-        return []
+        return ParagraphBatch(document_name, user_id)
@@ -0,0 +1,173 @@
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# char_start / char_end value meaning "not known"
+_NO_OFFSET = -1
+
+
+class ParagraphBatch:
+    """
+    Parsed paragraphs of one document, stored column-wise.
+
+    A list of paragraph dicts repeats the document name, user ID, a UUID
+    string and several None fields per paragraph. Here the document name and
+    user ID are stored once (interned), page numbers, heading flags and
+    character offsets live in typed arrays, and only the text and the
+    (mostly empty) section column are Python objects. The ``texts`` list is
+    handed to embedding and vector-store insertion as is.
+
+    For code that expects dicts, iterating or indexing yields paragraph
+    dicts built on demand.
+    """
+
+    __slots__ = ("document_name", "user_id", "texts", "pages", "sections", "is_heading", "char_starts", "char_ends")
+
+    def __init__(self, document_name: str = "", user_id: str = ""):
+        self.document_name = sys.intern(document_name or "")
+        self.user_id = sys.intern(user_id or "")
+        self.texts: List[str] = []
+        self.pages = array("i")
+        self.sections: List[Optional[str]] = []
+        self.is_heading = bytearray()
+        self.char_starts = array("q")
+        self.char_ends = array("q")
+
+    def append(
+        self,
+        text: str,
+        page: Any = 0,
+        section: Optional[str] = None,
+        is_heading: bool = False,
+        char_start: Optional[int] = None,
+        char_end: Optional[int] = None
+    ) -> None:
+        """Add one paragraph; empty text (after stripping) is skipped."""
+        text = (text or "").strip()
+        if not text:
+            return
+        self.texts.append(text)
+        self.pages.append(_as_page(page))
+        self.sections.append(sys.intern(section) if section else None)
+        self.is_heading.append(1 if is_heading else 0)
+        self.char_starts.append(_NO_OFFSET if char_start is None else char_start)
+        self.char_ends.append(_NO_OFFSET if char_end is None else char_end)
+
+    def extend(self, other: "ParagraphBatch") -> None:
+        self.texts.extend(other.texts)
+        self.pages.extend(other.pages)
+        self.sections.extend(other.sections)
+        self.is_heading.extend(other.is_heading)
+        self.char_starts.extend(other.char_starts)
+        self.char_ends.extend(other.char_ends)
+
+    def __iadd__(self, other: "ParagraphBatch") -> "ParagraphBatch":
+        self.extend(other)
+        return self
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        paragraph = {
+            "text": self.texts[index],
+            "page": self.pages[index],
+            "section": self.sections[index],
+            "is_heading": bool(self.is_heading[index]),
+            "document_name": self.document_name,
+            "user_id": self.user_id,
+        }
+        if self.char_starts[index] != _NO_OFFSET:
+            paragraph["char_start"] = self.char_starts[index]
+            paragraph["char_end"] = self.char_ends[index]
+        return paragraph
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(len(self.texts)):
+            yield self[index]
+
+    def __repr__(self) -> str:
+        return f"ParagraphBatch({self.document_name!r}, {len(self)} paragraphs)"
+
+    def metadata(self, index: int) -> Dict[str, Any]:
+        """Chroma metadata for one paragraph: no text, no None values."""
+        metadata = {
+            "page": self.pages[index],
+            "is_heading": bool(self.is_heading[index]),
+            "document_name": self.document_name,
+            "user_id": self.user_id,
+            "filename": self.document_name,
+        }
+        if self.sections[index] is not None:
+            metadata["section"] = self.sections[index]
+        if self.char_starts[index] != _NO_OFFSET:
+            metadata["char_start"] = self.char_starts[index]
+            metadata["char_end"] = self.char_ends[index]
+        return metadata
+
+    def sorted_by_page(self) -> "ParagraphBatch":
+        """Copy ordered by page; stable, so paragraph order within a page is kept."""
+        order = sorted(range(len(self.texts)), key=self.pages.__getitem__)
+        batch = ParagraphBatch(self.document_name, self.user_id)
+        batch.texts = [self.texts[i] for i in order]
+        batch.pages = array("i", (self.pages[i] for i in order))
+        batch.sections = [self.sections[i] for i in order]
+        batch.is_heading = bytearray(self.is_heading[i] for i in order)
+        batch.char_starts = array("q", (self.char_starts[i] for i in order))
+        batch.char_ends = array("q", (self.char_ends[i] for i in order))
+        return batch
+
+    def rebind(self, document_name: str, user_id: str) -> "ParagraphBatch":
+        """Attribute the paragraphs to another document and user (e.g. a cached parse)."""
+        self.document_name = sys.intern(document_name or "")
+        self.user_id = sys.intern(user_id or "")
+        return self
+
+    def to_columns(self) -> Dict[str, Any]:
+        """JSON-serializable column dict; the inverse of from_columns."""
+        return {
+            "texts": self.texts,
+            "pages": self.pages.tolist(),
+            "sections": self.sections,
+            "is_heading": list(self.is_heading),
+            "char_starts": self.char_starts.tolist(),
+            "char_ends": self.char_ends.tolist(),
+        }
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, Any], document_name: str = "", user_id: str = "") -> "ParagraphBatch":
+        batch = cls(document_name, user_id)
+        batch.texts = list(columns["texts"])
+        batch.pages = array("i", columns["pages"])
+        batch.sections = [sys.intern(s) if s else None for s in columns["sections"]]
+        batch.is_heading = bytearray(columns["is_heading"])
+        batch.char_starts = array("q", columns["char_starts"])
+        batch.char_ends = array("q", columns["char_ends"])
+        return batch
+
+    @classmethod
+    def from_dicts(cls, paragraphs: Iterable[Dict[str, Any]], document_name: str = "", user_id: str = "") -> "ParagraphBatch":
+        """Build a batch from paragraph dicts; the document and user come from the first dict if not given."""
+        batch = None
+        for paragraph in paragraphs:
+            if batch is None:
+                batch = cls(
+                    document_name or paragraph.get("document_name", ""),
+                    user_id or paragraph.get("user_id", "")
+                )
+            batch.append(
+                paragraph.get("text", ""),
+                paragraph.get("page", 0),
+                paragraph.get("section"),
+                paragraph.get("is_heading", False),
+                paragraph.get("char_start"),
+                paragraph.get("char_end"),
+            )
+        return batch if batch is not None else cls(document_name, user_id)
+
+
+def _as_page(page: Any) -> int:
+    try:
+        return int(page)
+    except (TypeError, ValueError):
+        return 0
@@ -1,38 +1,51 @@
-import uuid
 import logging
-from typing import List, Dict
-from langchain_docling import DoclingLoader
+from typing import List
+import fitz  # PyMuPDF
+from .converter_pool import load_doc_chunks, chunks_to_paragraphs
+from .paragraphs import ParagraphBatch
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(
-    filename="app.log",
-    encoding="utf-8",
-    filemode="a",
-    format="{asctime} - {levelname} - {message}",
-    style="{",
-    datefmt="%Y-%m-%d %H:%M"
-)
 
-def parse_pdf(pdf_path: str, document_name: str, user_id: str):
+def parse_pdf(pdf_path: str, document_name: str, user_id: str) -> ParagraphBatch:
     try:
-        loader = DoclingLoader(file_path=[pdf_path], export_type="doc_chunks")
-        docs = loader.load()
-        parsed_content = []
-        for chunk in docs:
-            para_data = {
-                "paragraph_id": str(uuid.uuid4()),
-                "text": chunk.page_content.strip(),
-                "page": chunk.metadata.get("page", 0),
-                "section": chunk.metadata.get("section"),
-                "is_heading": chunk.metadata.get("is_heading", False),
-                "document_name": document_name,
-                "user_id": user_id,
-                # Optionally add char_start/char_end if available in metadata
-            }
-            if para_data["text"]:
-                parsed_content.append(para_data)
+        docs = load_doc_chunks(pdf_path)
+        parsed_content = chunks_to_paragraphs(docs, document_name, user_id)
         logger.info(f"PDF parsed {len(parsed_content)} paragraphs from {document_name}")
         return parsed_content
     except Exception as e:
         logger.exception(f"[PDF PARSER ERROR] Failed to parse {document_name}: {e}")
-        return []
\ No newline at end of file
+        return ParagraphBatch(document_name, user_id)
+
+
+def parse_pdf_text_pages(pdf_path: str, document_name: str, user_id: str, pages: List[int]) -> ParagraphBatch:
+    """
+    Extracts paragraphs straight from the text layer of the given 1-based pages.
+
+    Used for mixed PDFs, where a layout parse of the whole document would
+    also spend time on the scanned pages.
+    """
+    try:
+        parsed_content = ParagraphBatch(document_name, user_id)
+        with fitz.open(pdf_path) as doc:
+            for page_number in sorted(set(pages)):
+                page = doc[page_number - 1]
+                char_offset = 0
+                # blocks are (x0, y0, x1, y1, text, block_no, block_type); type 0 is text
+                for block in page.get_text("blocks", sort=True):
+                    if block[6] != 0:
+                        continue
+                    text = " ".join(block[4].split())
+                    if not text:
+                        continue
+                    parsed_content.append(
+                        text,
+                        page_number,
+                        char_start=char_offset,
+                        char_end=char_offset + len(text)
+                    )
+                    char_offset += len(text) + 2
+        logger.info(f"PDF text layer parsed {len(parsed_content)} paragraphs from {len(pages)} pages of {document_name}")
+        return parsed_content
+    except Exception as e:
+        logger.exception(f"[PDF PARSER ERROR] Failed to read text layer of {document_name}: {e}")
+        return ParagraphBatch(document_name, user_id)
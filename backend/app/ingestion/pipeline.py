@@ -0,0 +1,295 @@
+import os
+import time
+import queue
+import logging
+import threading
+import multiprocessing
+from contextlib import ExitStack
+from typing import List, Dict, Tuple, Optional, Callable, Any
+from concurrent.futures import ProcessPoolExecutor, Future, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from .manager import process_file, SUPPORTED_FILE_TYPES
+from .cache import ingestion_cache
+from .paragraphs import ParagraphBatch
+from app.core.metrics import metrics
+from app.core.logging_config import configure_worker_logging, process_log_queue
+
+logger = logging.getLogger(__name__)
+
+# Number of parser processes; size this to the available cores
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", str(os.cpu_count() or 1)))
+
+# Parsed files allowed to wait for indexing before parsing is paused
+INGESTION_QUEUE_SIZE = int(os.getenv("INGESTION_QUEUE_SIZE", "8"))
+
+_SENTINEL = object()
+
+_pool: Optional[ProcessPoolExecutor] = None
+# Keeps the pool's log forwarding running for as long as the pool lives
+_pool_resources: Optional[ExitStack] = None
+_pool_lock = threading.Lock()
+
+
+def _warm_worker(log_queue) -> None:
+    """
+    Pool initializer: forwards the worker's logging to the parent and loads
+    the Docling models and Tesseract once per worker process.
+    """
+    configure_worker_logging(log_queue)
+    from app.core.resources import registry
+    # warmup records failures instead of raising; parsing reports them per file
+    registry.warmup(["docling", "tesseract"])
+
+
+def get_parser_pool() -> ProcessPoolExecutor:
+    """
+    Process-wide parser pool of INGESTION_WORKERS processes, started on first use.
+
+    Workers load the Docling models and Tesseract once (see _warm_worker)
+    and are reused by every batch, so a small upload does not pay for
+    starting interpreters and loading models. Stopped by
+    shutdown_parser_pool, which the API calls on shutdown.
+    """
+    global _pool, _pool_resources
+    with _pool_lock:
+        if _pool is None:
+            # spawn keeps pool processes clear of the parent's model and client state
+            context = multiprocessing.get_context("spawn")
+            resources = ExitStack()
+            log_queue = resources.enter_context(process_log_queue(context))
+            _pool = ProcessPoolExecutor(
+                max_workers=max(1, INGESTION_WORKERS),
+                mp_context=context,
+                initializer=_warm_worker,
+                initargs=(log_queue,)
+            )
+            _pool_resources = resources
+            logger.info(f"Started parser pool with {max(1, INGESTION_WORKERS)} workers")
+        return _pool
+
+
+def shutdown_parser_pool(pool: Optional[ProcessPoolExecutor] = None) -> None:
+    """
+    Stops the parser pool (only if it is still ``pool``, when given); the
+    next get_parser_pool call starts a new one.
+    """
+    global _pool, _pool_resources
+    with _pool_lock:
+        if _pool is None or (pool is not None and pool is not _pool):
+            return
+        stopping, resources = _pool, _pool_resources
+        _pool, _pool_resources = None, None
+    stopping.shutdown(wait=True, cancel_futures=True)
+    resources.close()
+
+
+def _parse_worker(file_path: str, document_name: str, user_id: str) -> Tuple[ParagraphBatch, float, Optional[str], Dict, Dict]:
+    """
+    Runs inside a pool process. Returns the parsed paragraphs, parse time,
+    cache key, and the metrics and ingestion cache counters recorded while
+    parsing.
+
+    The batch is pickled back to the parent column-wise, which is far
+    smaller than a list of per-paragraph dicts.
+    """
+    start = time.perf_counter()
+    cache_key = ingestion_cache.file_key(file_path) if ingestion_cache is not None else None
+    parsed = process_file(file_path, document_name, user_id, cache_key=cache_key)
+    cache_counts = ingestion_cache.take_counts() if ingestion_cache is not None else {}
+    return parsed, time.perf_counter() - start, cache_key, metrics.take_observations(), cache_counts
+
+
+def _index_paragraphs(
+    paragraphs: ParagraphBatch,
+    collection_name: str,
+    cache_key: Optional[str] = None,
+    file_path: Optional[str] = None
+) -> List[str]:
+    """
+    Syncs a parsed file into the vector store.
+
+    A document that was ingested before is diffed against its catalogued
+    chunks, so only changed paragraphs are embedded and written and
+    removed ones are deleted (see vector_store.sync_document). Cached
+    embeddings are used when the same file contents were embedded before.
+    """
+    # Imported lazily so pool processes never load the vector store
+    from app.services.vector_store import sync_document
+    from app.services.embedding import get_embedding_engine
+
+    file_info: Dict[str, Any] = {}
+    if file_path:
+        file_info["file_type"] = SUPPORTED_FILE_TYPES.get(os.path.splitext(file_path)[1].lower())
+        try:
+            file_info["file_size"] = os.path.getsize(file_path)
+        except OSError:
+            pass
+
+    if ingestion_cache is None or cache_key is None:
+        return sync_document(paragraphs, collection_name, **file_info)["chunk_ids"]
+
+    model_name = get_embedding_engine().name
+    embeddings = ingestion_cache.get_embeddings(cache_key, model_name)
+    if embeddings is not None and len(embeddings) != len(paragraphs):
+        embeddings = None
+    result = sync_document(paragraphs, collection_name, embeddings=embeddings, **file_info)
+    if embeddings is None and result["embeddings"] is not None:
+        ingestion_cache.put_embeddings(cache_key, model_name, result["embeddings"])
+    return result["chunk_ids"]
+
+
+def ingest_files(
+    files: List[Tuple[str, str]],
+    user_id: str,
+    max_workers: Optional[int] = None,
+    collection_name: Optional[str] = None,
+    queue_size: int = INGESTION_QUEUE_SIZE,
+    index_fn: Optional[Callable[[ParagraphBatch, str, Optional[str], Optional[str]], List[str]]] = None,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Parses and indexes many files with overlapping stages.
+
+    Files are parsed in the shared parser pool (see get_parser_pool) while
+    a single indexing thread embeds and writes finished files to the vector
+    store. At most ``max_workers`` parses of this call are in flight and at
+    most ``queue_size`` parsed files wait for indexing; when indexing falls
+    behind, no new parses are submitted until it catches up.
+
+    Args:
+        files: (file_path, document_name) pairs
+        user_id: Owner of the uploaded files
+        max_workers: Parses in flight at once, defaults to INGESTION_WORKERS
+        collection_name: Target vector store collection, defaults to the
+            user's collection (see vector_store.collection_for)
+        queue_size: Maximum parsed files waiting to be indexed
+        index_fn: Override for the indexing stage, called with (paragraphs,
+            collection_name, cache_key, file_path); defaults to cached
+            embeddings + vector_store.sync_document
+        on_result: Called with each file's result as soon as it is final
+
+    Returns:
+        List[Dict]: One result per input file, in input order, with
+        filename, status ("success", "empty" or "failed"), paragraphs,
+        parse_time and message.
+    """
+    if not files:
+        return []
+
+    if collection_name is None:
+        from app.services.vector_store import collection_for
+        collection_name = collection_for(user_id)
+
+    workers = max(1, max_workers or INGESTION_WORKERS)
+    index_fn = index_fn or _index_paragraphs
+    results: List[Optional[Dict[str, Any]]] = [None] * len(files)
+    parsed_queue: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+
+    def finish(position: int, result: Dict[str, Any]) -> None:
+        results[position] = result
+        if on_result:
+            try:
+                on_result(result)
+            except Exception as e:
+                logger.error(f"Ingestion result callback failed for {result['filename']}: {e}")
+
+    def indexer() -> None:
+        while True:
+            item = parsed_queue.get()
+            if item is _SENTINEL:
+                return
+            position, document_name, file_path, paragraphs, parse_time, cache_key = item
+            try:
+                chunk_ids = index_fn(paragraphs, collection_name, cache_key, file_path)
+                finish(position, {
+                    "filename": document_name,
+                    "status": "success",
+                    "paragraphs": len(chunk_ids),
+                    "parse_time": parse_time,
+                    "message": f"Indexed {len(chunk_ids)} paragraphs",
+                })
+            except Exception as e:
+                logger.exception(f"[PIPELINE ERROR] Failed indexing {document_name}: {e}")
+                finish(position, {
+                    "filename": document_name,
+                    "status": "failed",
+                    "paragraphs": 0,
+                    "parse_time": parse_time,
+                    "message": f"Indexing failed: {e}",
+                })
+
+    index_thread = threading.Thread(target=indexer, name="ingestion-indexer", daemon=True)
+    index_thread.start()
+
+    start = time.perf_counter()
+    pool = get_parser_pool()
+    broken = False
+    try:
+        pending: Dict[Future, Tuple[int, str]] = {}
+        next_file = 0
+
+        while next_file < len(files) or pending:
+            while next_file < len(files) and len(pending) < workers:
+                file_path, document_name = files[next_file]
+                try:
+                    future = pool.submit(_parse_worker, file_path, document_name, user_id)
+                    pending[future] = (next_file, document_name)
+                except Exception as e:
+                    # A crashed worker breaks the pool; report the rest instead of raising
+                    broken = broken or isinstance(e, BrokenProcessPool)
+                    finish(next_file, {
+                        "filename": document_name,
+                        "status": "failed",
+                        "paragraphs": 0,
+                        "parse_time": 0.0,
+                        "message": f"Parsing failed: {e}",
+                    })
+                next_file += 1
+
+            if not pending:
+                continue
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                position, document_name = pending.pop(future)
+                try:
+                    paragraphs, parse_time, cache_key, observations, cache_counts = future.result()
+                    metrics.merge_observations(observations)
+                    if ingestion_cache is not None:
+                        ingestion_cache.merge_counts(cache_counts)
+                except Exception as e:
+                    broken = broken or isinstance(e, BrokenProcessPool)
+                    logger.exception(f"[PIPELINE ERROR] Failed parsing {document_name}: {e}")
+                    finish(position, {
+                        "filename": document_name,
+                        "status": "failed",
+                        "paragraphs": 0,
+                        "parse_time": 0.0,
+                        "message": f"Parsing failed: {e}",
+                    })
+                    continue
+
+                if not paragraphs:
+                    finish(position, {
+                        "filename": document_name,
+                        "status": "empty",
+                        "paragraphs": 0,
+                        "parse_time": parse_time,
+                        "message": "No text could be extracted",
+                    })
+                    continue
+
+                # Blocks while the indexer is behind, which pauses new submissions
+                parsed_queue.put((position, document_name, files[position][0], paragraphs, parse_time, cache_key))
+    finally:
+        parsed_queue.put(_SENTINEL)
+        index_thread.join()
+        if broken:
+            # A broken pool rejects all further work; the next batch starts a fresh one
+            shutdown_parser_pool(pool)
+
+    elapsed = time.perf_counter() - start
+    succeeded = sum(1 for r in results if r and r["status"] == "success")
+    logger.info(f"Ingested {succeeded}/{len(files)} files with {workers} workers in {elapsed:.2f}s")
+    return results
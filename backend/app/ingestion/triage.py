@@ -0,0 +1,26 @@
+import os
+import logging
+from typing import List
+import fitz  # PyMuPDF
+
+logger = logging.getLogger(__name__)
+
+# Minimum extractable characters for a page to count as having a text layer
+TRIAGE_MIN_TEXT_CHARS = int(os.getenv("TRIAGE_MIN_TEXT_CHARS", "25"))
+
+
+def classify_pdf_pages(pdf_path: str, min_text_chars: int = TRIAGE_MIN_TEXT_CHARS) -> List[bool]:
+    """
+    Classifies each page of a PDF by whether it has a usable text layer.
+
+    Only reads the PDF's text objects, so it is far cheaper than a layout
+    parse or OCR and can run on every upload.
+
+    Returns:
+        List[bool]: One flag per page, in page order; True means the page has text.
+    """
+    with fitz.open(pdf_path) as doc:
+        flags = [len(page.get_text("text").strip()) >= min_text_chars for page in doc]
+
+    logger.info(f"Triage of {os.path.basename(pdf_path)}: {sum(flags)}/{len(flags)} pages with text layer")
+    return flags
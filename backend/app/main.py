@@ -1,9 +1,11 @@
 from fastapi import FastAPI, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.security import APIKeyHeader
+import sys
 import time
+import asyncio
 import logging
 from typing import Callable
 import os
@@ -13,22 +15,27 @@ from datetime import datetime
 from app.routes.query_router import router as query_router
 from app.routes.document_router import router as document_router
 from app.services.vector_store import get_chroma_collection
+from app.services.jobs import start_job_queue, stop_job_queue
+from app.core.resources import registry
+from app.core.logging_config import configure_logging, logging_stats
+from app.core.metrics import metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('app.log'),
-        logging.StreamHandler()
-    ]
-)
+# Configure logging: records are written by a background thread, see app.core.logging_config
+configure_logging()
 
 logger = logging.getLogger(__name__)
 
+# Resources that must be loaded before the API reports itself ready
+READINESS_RESOURCES = ["chroma_client", "embedding_function"]
+
+# Labelled by route template, not raw path, so path parameters don't create new series
+REQUEST_SECONDS = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request duration", ["method", "route", "status"]
+)
+
 # API key security
 API_KEY_HEADER = APIKeyHeader(name="X-API-Key")
 
@@ -51,13 +58,47 @@ app.add_middleware(
 # Add Gzip compression
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 
+@app.on_event("startup")
+async def warmup_resources():
+    """
+    Load the resources queries need in the background, so /api/ready can
+    report ready without waiting for a first query. With WARMUP_ON_STARTUP
+    every heavy resource is loaded, so the first request doesn't pay for any.
+    """
+    warm_all = os.getenv("WARMUP_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+    loop = asyncio.get_running_loop()
+    loop.run_in_executor(None, registry.warmup, None if warm_all else READINESS_RESOURCES)
+    logger.info(f"Started background warmup of {'all heavy resources' if warm_all else ', '.join(READINESS_RESOURCES)}")
+
+@app.on_event("startup")
+async def recover_ingestion_jobs():
+    """Start the ingestion queue so jobs interrupted by a crash or restart are resubmitted right away."""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, start_job_queue)
+
+@app.on_event("shutdown")
+def stop_ingestion():
+    """Stop taking ingestion jobs and shut the parser pool down; unfinished jobs are rerun once their lease expires."""
+    stop_job_queue()
+    # The pool module is only imported (and the pool only started) once this process has ingested something
+    pipeline = sys.modules.get("app.ingestion.pipeline")
+    if pipeline is not None:
+        pipeline.shutdown_parser_pool()
+
 # Request timing middleware
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next: Callable):
-    start_time = time.time()
+    start_time = time.perf_counter()
     response = await call_next(request)
-    process_time = time.time() - start_time
+    process_time = time.perf_counter() - start_time
     response.headers["X-Process-Time"] = str(process_time)
+    route = request.scope.get("route")
+    REQUEST_SECONDS.observe(
+        process_time,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=response.status_code
+    )
     return response
 
 # Error handling middleware
@@ -113,13 +154,21 @@ async def health_check(api_key: str = Depends(API_KEY_HEADER)):
     """Health check endpoint."""
     try:
         # Check if vector store is accessible
-        from app.services.vector_store import get_chroma_collection
-        collection = get_chroma_collection()
+        from app.services.vector_store import get_collection_count, retrieval_cache
+        from app.services.embedding import query_embedding_cache
+        from app.ingestion.cache import ingestion_cache
+        documents = get_collection_count()
         
         return {
             "status": "healthy",
             "timestamp": time.time(),
-            "vector_store": "connected"
+            "vector_store": "connected",
+            "documents": documents,
+            "query_embedding_cache": query_embedding_cache.stats(),
+            "retrieval_cache": retrieval_cache.stats(),
+            # Counted in the parser processes and merged here as files finish
+            "ingestion_cache": ingestion_cache.stats() if ingestion_cache is not None else {"enabled": False},
+            "logging": logging_stats()
         }
     except Exception as e:
         logger.error(f"Health check failed: {str(e)}")
@@ -128,3 +177,29 @@ async def health_check(api_key: str = Depends(API_KEY_HEADER)):
             "timestamp": time.time(),
             "error": str(e)
         }
+
+@app.get("/api/ready")
+async def readiness_check():
+    """Readiness endpoint: 503 until the resources needed to serve queries are loaded."""
+    resources = registry.status()
+    for name in READINESS_RESOURCES:
+        # Loaded as None means the factory gave up (e.g. the embedding model failed to load)
+        if resources.get(name, {}).get("state") == "loaded" and registry.get(name) is None:
+            resources[name] = {"state": "failed", "error": "Resource unavailable"}
+    ready = all(
+        resources.get(name, {}).get("state") == "loaded"
+        for name in READINESS_RESOURCES
+    )
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "timestamp": time.time(),
+            "resources": resources
+        }
+    )
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Per-stage latency histograms in the Prometheus text format."""
+    return Response(content=metrics.render(), media_type=METRICS_CONTENT_TYPE)
@@ -0,0 +1,150 @@
+import os
+import uuid
+import shutil
+import logging
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Dict, List
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+
+from app.services.security import verify_api_key
+from app.services.jobs import enqueue_files, get_job_store, summarize_batch
+from app.services.catalog import get_catalog
+from app.services.vector_store import collection_for, delete_document
+from app.ingestion.manager import SUPPORTED_FILE_TYPES
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+
+router = APIRouter()
+
+
+@router.post("/documents/upload")
+def upload_documents(
+    files: List[UploadFile] = File(...),
+    user_id: str = Form("default_user"),
+    api_key: str = Depends(verify_api_key)
+) -> Dict[str, Any]:
+    """
+    Save uploaded files and queue them for ingestion.
+
+    Returns immediately with a batch ID and one job per accepted file;
+    parsing and indexing run in the background. Poll
+    /documents/batches/{batch_id} or /documents/jobs/{job_id} for progress.
+
+    Files are saved under UPLOAD_DIR/<batch_id>/, so an upload never
+    overwrites a file that an earlier batch may still be parsing; the
+    original filename is kept as the document name. A file is deleted
+    once its job finishes, successfully or not.
+    """
+    batch_id = uuid.uuid4().hex
+    batch_dir = os.path.join(UPLOAD_DIR, batch_id)
+    results: List[Dict[str, Any]] = []
+    accepted: List[Dict[str, Any]] = []
+    seen = set()
+
+    for upload in files:
+        filename = os.path.basename(upload.filename or "")
+        ext = Path(filename).suffix.lower()
+        logger.info(f"Received file: {filename}")
+
+        if ext not in SUPPORTED_FILE_TYPES:
+            results.append({"filename": filename, "status": "error", "message": f"Unsupported file type: {ext}"})
+            continue
+        if filename in seen:
+            results.append({"filename": filename, "status": "error", "message": "Duplicate file in upload"})
+            continue
+        seen.add(filename)
+
+        file_path = os.path.join(batch_dir, filename)
+        try:
+            os.makedirs(batch_dir, exist_ok=True)
+            with open(file_path, "wb") as f:
+                shutil.copyfileobj(upload.file, f)
+        except OSError as e:
+            logger.error(f"Error saving upload {filename}: {str(e)}")
+            results.append({"filename": filename, "status": "error", "message": "Could not save file"})
+            continue
+        logger.info(f"Saved file at: {file_path}")
+
+        accepted.append({
+            "filename": filename,
+            "file_path": file_path,
+            "file_type": SUPPORTED_FILE_TYPES[ext],
+            "file_size": os.path.getsize(file_path),
+        })
+
+    if not accepted:
+        return {"batch_id": None, "results": results}
+
+    try:
+        batch = enqueue_files(accepted, user_id, batch_id=batch_id)
+    except Exception as e:
+        logger.error(f"Error queueing upload: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Could not queue files")
+    for job in batch["jobs"]:
+        results.append({
+            "filename": job["filename"],
+            "status": "processing",
+            "job_id": job["job_id"],
+            "message": job["message"],
+        })
+
+    return {"batch_id": batch_id, "results": results}
+
+
+@router.get("/documents/jobs/{job_id}")
+def get_job(job_id: str, api_key: str = Depends(verify_api_key)) -> Dict[str, Any]:
+    """Status of a single file's ingestion job."""
+    job = get_job_store().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/documents/batches/{batch_id}")
+def get_batch(batch_id: str, api_key: str = Depends(verify_api_key)) -> Dict[str, Any]:
+    """Progress of an upload batch with per-file job statuses."""
+    jobs = get_job_store().batch(batch_id)
+    if not jobs:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return summarize_batch(batch_id, jobs)
+
+
+@router.get("/documents")
+def list_documents(
+    user_id: str = "default_user",
+    api_key: str = Depends(verify_api_key)
+) -> List[Dict[str, Any]]:
+    """Indexed documents of a user, most recently ingested first."""
+    documents = get_catalog().documents(collection_for(user_id), user_id)
+    return [
+        {
+            "filename": doc["document_name"],
+            "file_type": doc["file_type"],
+            "file_size": doc["file_size"],
+            "upload_date": datetime.fromtimestamp(doc["updated_at"]).isoformat(),
+            "page_count": doc["page_count"],
+            "paragraphs": doc["paragraphs"],
+        }
+        for doc in documents
+    ]
+
+
+@router.delete("/documents/{document_name}")
+def remove_document(
+    document_name: str,
+    user_id: str = "default_user",
+    api_key: str = Depends(verify_api_key)
+) -> Dict[str, Any]:
+    """Remove a document's paragraphs from the index with one batched delete."""
+    catalogued = get_catalog().has_document(collection_for(user_id), user_id, document_name)
+    try:
+        deleted = delete_document(document_name, user_id)
+    except Exception as e:
+        logger.error(f"Error deleting document {document_name}: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Could not delete document")
+    if not deleted and not catalogued:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return {"filename": document_name, "status": "deleted", "paragraphs": deleted}
@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import logging
+from typing import Any, Dict, Iterator, List, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from app.services.security import verify_api_key
+from app.services.query_llm import (
+    answer_query_with_context,
+    answer_queries_with_context,
+    retrieve_answer_context,
+    stream_answer_with_context,
+)
+from app.services.embedding import normalize_query
+from app.services.concurrency import SingleFlight, BoundedExecutor, OverloadedError
+from app.services.themes import get_themes
+from app.services.vector_store import retrieval_scope
+from app.core.logging_config import RateLimitedLogger
+
+logger = logging.getLogger(__name__)
+# Overload rejections come in bursts; log a sample with the suppressed count
+hot_logger = RateLimitedLogger(logger)
+
+# Threads running blocking retrieval and LLM work
+QUERY_WORKERS = int(os.getenv("QUERY_WORKERS", "8"))
+# Queries allowed to hold an execution slot at once
+QUERY_MAX_IN_FLIGHT = int(os.getenv("QUERY_MAX_IN_FLIGHT", "16"))
+# Seconds a query may wait for a slot before it is rejected with 429
+QUERY_QUEUE_TIMEOUT = float(os.getenv("QUERY_QUEUE_TIMEOUT", "5"))
+# Largest number of questions accepted by /query/batch
+QUERY_BATCH_MAX = int(os.getenv("QUERY_BATCH_MAX", "64"))
+
+router = APIRouter()
+
+query_executor = BoundedExecutor(
+    max_workers=QUERY_WORKERS,
+    max_in_flight=QUERY_MAX_IN_FLIGHT,
+    queue_timeout=QUERY_QUEUE_TIMEOUT,
+    name="query"
+)
+query_flights = SingleFlight()
+
+
+class RetrievalFilters(BaseModel):
+    """Metadata filters pushed down into the vector store query."""
+    user_id: Optional[str] = None
+    document_names: Optional[List[str]] = None
+    page_from: Optional[int] = Field(None, ge=0)
+    page_to: Optional[int] = Field(None, ge=0)
+
+    def to_filters(self) -> Dict[str, Any]:
+        filters: Dict[str, Any] = {"user_id": self.user_id, "document_names": self.document_names}
+        if self.page_from is not None or self.page_to is not None:
+            filters["page_range"] = (self.page_from, self.page_to)
+        return filters
+
+
+class QueryRequest(RetrievalFilters):
+    query: str = Field(..., min_length=1)
+    n_results: int = Field(5, ge=1, le=50)
+
+
+@router.post("/query")
+async def query_documents(request: QueryRequest, api_key: str = Depends(verify_api_key)) -> Dict[str, Any]:
+    """
+    Answer a query over the indexed documents.
+
+    Retrieval and answer generation are blocking, so they run on a bounded
+    executor instead of the event loop. Identical queries arriving while
+    one is being answered share its result.
+    """
+    start_time = time.perf_counter()
+    filters = request.to_filters()
+    key = (normalize_query(request.query), request.n_results, json.dumps(filters, sort_keys=True))
+
+    try:
+        result = await query_flights.do(
+            key,
+            lambda: query_executor.run(answer_query_with_context, request.query, request.n_results, filters)
+        )
+    except OverloadedError as e:
+        hot_logger.warning(f"Query rejected, executor saturated: {str(e)}")
+        raise HTTPException(status_code=429, detail="Too many concurrent queries, please retry")
+    except Exception as e:
+        logger.error(f"Error processing query: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error processing query")
+
+    # Coalesced callers share one result dict; give each its own timing
+    return {**result, "processing_time": time.perf_counter() - start_time}
+
+
+class BatchQueryRequest(RetrievalFilters):
+    queries: List[str] = Field(..., min_length=1)
+    n_results: int = Field(5, ge=1, le=50)
+
+
+@router.post("/query/batch")
+async def query_documents_batch(request: BatchQueryRequest, api_key: str = Depends(verify_api_key)) -> Dict[str, Any]:
+    """
+    Answer many queries with one embedding batch and one vector search.
+
+    Returns per-query answers and citations in request order.
+    """
+    if len(request.queries) > QUERY_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {QUERY_BATCH_MAX} queries per batch")
+
+    start_time = time.perf_counter()
+    try:
+        answers = await query_executor.run(
+            answer_queries_with_context, request.queries, request.n_results, request.to_filters()
+        )
+    except OverloadedError as e:
+        hot_logger.warning(f"Batch query rejected, executor saturated: {str(e)}")
+        raise HTTPException(status_code=429, detail="Too many concurrent queries, please retry")
+    except Exception as e:
+        logger.error(f"Error processing batch query: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error processing batch query")
+
+    return {
+        "results": [{"query": query, **answer} for query, answer in zip(request.queries, answers)],
+        "processing_time": time.perf_counter() - start_time
+    }
+
+
+def _sse(events: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    for event in events:
+        yield f"event: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+
+
+def _ndjson(events: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    for event in events:
+        yield json.dumps(event, default=str) + "\n"
+
+
+@router.post("/query/stream")
+async def stream_query(
+    request: QueryRequest,
+    format: str = "sse",
+    api_key: str = Depends(verify_api_key)
+) -> StreamingResponse:
+    """
+    Stream an answer: citations first, then answer tokens, then a summary with timings.
+
+    ``format=sse`` (default) sends server-sent events; ``format=ndjson``
+    sends one JSON object per line. Retrieval runs on the bounded query
+    executor like /query, so a saturated server answers 429 before the
+    stream starts. The token generator is synchronous, so Starlette
+    iterates it in its threadpool and the event loop never blocks.
+    """
+    if format not in ("sse", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'sse' or 'ndjson'")
+
+    start_time = time.perf_counter()
+    filters = request.to_filters()
+    try:
+        retrieved = await query_executor.run(retrieve_answer_context, request.query, request.n_results, filters)
+    except OverloadedError as e:
+        hot_logger.warning(f"Stream query rejected, executor saturated: {str(e)}")
+        raise HTTPException(status_code=429, detail="Too many concurrent queries, please retry")
+    except Exception as e:
+        logger.error(f"Error retrieving context for stream: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error processing query")
+
+    events = stream_answer_with_context(
+        request.query, request.n_results, filters, retrieved=retrieved, start_time=start_time
+    )
+    if format == "sse":
+        body, media_type = _sse(events), "text/event-stream"
+    else:
+        body, media_type = _ndjson(events), "application/x-ndjson"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/themes")
+async def list_themes(user_id: Optional[str] = None, api_key: str = Depends(verify_api_key)) -> Dict[str, Any]:
+    """
+    Themes of the user's collection with representative paragraphs and summaries.
+
+    Served from the theme engine's cache; only a collection changed since
+    the last call is re-clustered, incrementally. In a shared collection
+    the themes cover the user's own paragraphs only.
+    """
+    collection_name, where = retrieval_scope(user_id=user_id)
+    try:
+        themes = await query_executor.run(get_themes, collection_name, where)
+    except OverloadedError as e:
+        hot_logger.warning(f"Theme request rejected, executor saturated: {str(e)}")
+        raise HTTPException(status_code=429, detail="Too many concurrent queries, please retry")
+    except Exception as e:
+        logger.error(f"Error computing themes: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error computing themes")
+    return {"themes": themes}
@@ -0,0 +1,222 @@
+import os
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+CATALOG_DB_PATH = os.getenv("CATALOG_DB_PATH", "catalog.sqlite3")
+
+
+class DocumentCatalog:
+    """
+    Which chunks each indexed document owns, persisted in SQLite.
+
+    One row per document (collection, user, name) with its file details,
+    and one row per chunk with the chunk ID and a hash of the paragraph
+    text. Deleting a document is a lookup of its chunk IDs plus one
+    batched vector store delete, and re-ingesting a document diffs the new
+    paragraphs against its chunk rows (see vector_store.sync_document).
+
+    The vector store writes the catalog itself; WAL mode lets several
+    processes share the file. It also keeps each collection's write
+    version, bumped by every add or delete from any process, which the
+    per-process BM25 indexes compare against to notice they are stale.
+    """
+
+    def __init__(self, db_path: str = CATALOG_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS documents (
+                    collection TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    document_name TEXT NOT NULL,
+                    file_type TEXT,
+                    file_size INTEGER,
+                    page_count INTEGER,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (collection, user_id, document_name)
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chunks (
+                    collection TEXT NOT NULL,
+                    chunk_id TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    document_name TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    PRIMARY KEY (collection, chunk_id)
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_document ON chunks (collection, user_id, document_name)")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS collection_versions (
+                    collection TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL
+                )
+                """
+            )
+
+    def collection_version(self, collection: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version FROM collection_versions WHERE collection = ?", (collection,)
+            ).fetchone()
+        return row["version"] if row else 0
+
+    def bump_collection_version(self, collection: str) -> int:
+        """Increments the collection's write version and returns the new value."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO collection_versions (collection, version) VALUES (?, 1)
+                ON CONFLICT (collection) DO UPDATE SET version = version + 1
+                """,
+                (collection,)
+            )
+            # Same transaction, so this is our increment even with other writers
+            return self._conn.execute(
+                "SELECT version FROM collection_versions WHERE collection = ?", (collection,)
+            ).fetchone()["version"]
+
+    def _upsert_document(
+        self,
+        collection: str,
+        user_id: str,
+        document_name: str,
+        file_type: Optional[str],
+        file_size: Optional[int],
+        page_count: Optional[int]
+    ) -> None:
+        now = time.time()
+        self._conn.execute(
+            """
+            INSERT INTO documents (collection, user_id, document_name, file_type, file_size, page_count, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (collection, user_id, document_name) DO UPDATE SET
+                file_type = COALESCE(excluded.file_type, file_type),
+                file_size = COALESCE(excluded.file_size, file_size),
+                page_count = COALESCE(excluded.page_count, page_count),
+                updated_at = excluded.updated_at
+            """,
+            (collection, user_id, document_name, file_type, file_size, page_count, now, now)
+        )
+
+    def has_document(self, collection: str, user_id: str, document_name: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM documents WHERE collection = ? AND user_id = ? AND document_name = ?",
+                (collection, user_id, document_name)
+            ).fetchone()
+        return row is not None
+
+    def chunks(self, collection: str, user_id: str, document_name: str) -> Dict[str, str]:
+        """Chunk ID -> content hash of every chunk the document owns, in document order."""
+        with self._lock:
+            # Chunks are recorded in paragraph order, so rowid order is document order
+            rows = self._conn.execute(
+                "SELECT chunk_id, content_hash FROM chunks WHERE collection = ? AND user_id = ? AND document_name = ? ORDER BY rowid",
+                (collection, user_id, document_name)
+            ).fetchall()
+        return {row["chunk_id"]: row["content_hash"] for row in rows}
+
+    def add_chunks(
+        self,
+        collection: str,
+        user_id: str,
+        document_name: str,
+        chunk_ids: Sequence[str],
+        hashes: Sequence[str],
+        page_count: Optional[int] = None
+    ) -> None:
+        """Records chunks (with their content hashes) as belonging to the document, keeping the ones it already owns."""
+        with self._lock, self._conn:
+            self._upsert_document(collection, user_id, document_name, None, None, page_count)
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO chunks (collection, chunk_id, user_id, document_name, content_hash) VALUES (?, ?, ?, ?, ?)",
+                [(collection, chunk_id, user_id, document_name, h) for chunk_id, h in zip(chunk_ids, hashes)]
+            )
+
+    def replace_chunks(
+        self,
+        collection: str,
+        user_id: str,
+        document_name: str,
+        chunk_ids: Sequence[str],
+        hashes: Sequence[str],
+        file_type: Optional[str] = None,
+        file_size: Optional[int] = None,
+        page_count: Optional[int] = None
+    ) -> None:
+        """Makes ``chunk_ids`` the document's complete chunk list, in one transaction."""
+        with self._lock, self._conn:
+            self._upsert_document(collection, user_id, document_name, file_type, file_size, page_count)
+            self._conn.execute(
+                "DELETE FROM chunks WHERE collection = ? AND user_id = ? AND document_name = ?",
+                (collection, user_id, document_name)
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (collection, chunk_id, user_id, document_name, content_hash) VALUES (?, ?, ?, ?, ?)",
+                [(collection, chunk_id, user_id, document_name, h) for chunk_id, h in zip(chunk_ids, hashes)]
+            )
+
+    def remove_chunks(self, collection: str, chunk_ids: Sequence[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM chunks WHERE collection = ? AND chunk_id = ?",
+                [(collection, chunk_id) for chunk_id in chunk_ids]
+            )
+
+    def remove_document(self, collection: str, user_id: str, document_name: str) -> None:
+        with self._lock, self._conn:
+            for table in ("chunks", "documents"):
+                self._conn.execute(
+                    f"DELETE FROM {table} WHERE collection = ? AND user_id = ? AND document_name = ?",
+                    (collection, user_id, document_name)
+                )
+
+    def documents(self, collection: Optional[str] = None, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Catalogued documents with their chunk count, newest first; optionally filtered."""
+        clauses, params = [], []
+        if collection is not None:
+            clauses.append("d.collection = ?")
+            params.append(collection)
+        if user_id is not None:
+            clauses.append("d.user_id = ?")
+            params.append(user_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                SELECT d.*, (
+                    SELECT COUNT(*) FROM chunks c
+                    WHERE c.collection = d.collection AND c.user_id = d.user_id AND c.document_name = d.document_name
+                ) AS paragraphs
+                FROM documents d {where}
+                ORDER BY d.updated_at DESC
+                """,
+                params
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+_catalog: Optional[DocumentCatalog] = None
+_init_lock = threading.Lock()
+
+
+def get_catalog() -> DocumentCatalog:
+    global _catalog
+    with _init_lock:
+        if _catalog is None:
+            _catalog = DocumentCatalog()
+        return _catalog
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class OverloadedError(Exception):
+    """Raised when no execution slot frees up within the queue timeout."""
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical async calls into one computation.
+
+    The first caller for a key starts the computation as a task; callers
+    arriving while it runs await the same task and share its result or
+    exception. Each waiter is shielded, so one disconnecting client does
+    not cancel the work for the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+
+            def _forget(done: asyncio.Future) -> None:
+                if self._inflight.get(key) is done:
+                    del self._inflight[key]
+
+            task.add_done_callback(_forget)
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+        }
+
+
+class BoundedExecutor:
+    """
+    Runs blocking functions off the event loop with a cap on work in flight.
+
+    At most ``max_in_flight`` calls hold a slot at once and run on a
+    ``max_workers`` thread pool. A caller that cannot get a slot within
+    ``queue_timeout`` seconds gets OverloadedError instead of queueing
+    without bound, which keeps tail latency bounded under bursts.
+    """
+
+    def __init__(self, max_workers: int, max_in_flight: int, queue_timeout: float, name: str = "bounded"):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self.rejected = 0
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise OverloadedError(f"No execution slot free within {self.queue_timeout}s")
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "rejected": self.rejected,
+        }
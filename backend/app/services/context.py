@@ -0,0 +1,128 @@
+import os
+import math
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.embedding import embed_query
+
+logger = logging.getLogger(__name__)
+
+# Approximate prompt tokens available for retrieved context
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+# Cosine similarity above which a chunk counts as a near-duplicate of one already chosen
+CONTEXT_DUPLICATE_THRESHOLD = float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", "0.92"))
+# MMR trade-off: 1.0 ranks purely by relevance, lower values favour diversity
+CONTEXT_MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+
+# Tokens for the "[n] ... Source: ..." framing format_context adds per chunk
+_CHUNK_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English text)."""
+    return max(1, math.ceil(len(text) / 4))
+
+
+def _mmr_order(
+    query_vector: np.ndarray,
+    chunk_vectors: np.ndarray,
+    mmr_lambda: float,
+    duplicate_threshold: float
+) -> List[int]:
+    """
+    Maximal marginal relevance order of the chunks, near-duplicates dropped.
+
+    Vectors are unit-normalized, so similarities are dot products; the
+    running max similarity to the chosen set is updated with one
+    matrix-vector product per pick.
+    """
+    relevance = chunk_vectors @ query_vector
+    max_similarity = np.full(len(chunk_vectors), -np.inf, dtype=np.float32)
+    available = np.ones(len(chunk_vectors), dtype=bool)
+    order: List[int] = []
+
+    while available.any():
+        redundancy = np.where(np.isfinite(max_similarity), max_similarity, 0.0)
+        scores = mmr_lambda * relevance - (1 - mmr_lambda) * redundancy
+        scores[~available] = -np.inf
+        pick = int(np.argmax(scores))
+        order.append(pick)
+        available[pick] = False
+        np.maximum(max_similarity, chunk_vectors @ chunk_vectors[pick], out=max_similarity)
+        available &= max_similarity < duplicate_threshold
+    return order
+
+
+def pack_context(
+    user_query: str,
+    context_chunks: List[str],
+    sources: List[Dict[str, Any]],
+    chunk_vectors: Optional[Sequence[Any]] = None,
+    token_budget: Optional[int] = None,
+    duplicate_threshold: float = CONTEXT_DUPLICATE_THRESHOLD,
+    mmr_lambda: float = CONTEXT_MMR_LAMBDA
+) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    Select and order retrieved chunks to fit a token budget.
+
+    Chunks are ranked by MMR against the query embedding, near-duplicates
+    (cosine similarity above ``duplicate_threshold`` to a chosen chunk) are
+    dropped, and chunks are packed in that order until the budget is spent.
+    The packed chunks are returned most relevant first.
+
+    Chunks are compared using the embeddings stored with them in the index
+    (returned by retrieval), so only the query is embedded here, and that
+    comes from the query embedding cache. Without chunk embeddings (e.g.
+    theme summaries), chunks keep their retrieval order and are only packed.
+
+    Args:
+        user_query: The query the context is for
+        context_chunks: Retrieved chunk texts, best first
+        sources: Metadata aligned with ``context_chunks``
+        chunk_vectors: Stored embeddings aligned with ``context_chunks``;
+            None (or any missing vector) skips MMR and de-duplication
+        token_budget: Approximate tokens available, defaults to CONTEXT_TOKEN_BUDGET
+
+    Returns:
+        Tuple[List[str], List[Dict]]: The packed chunks and their sources.
+    """
+    budget = CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget
+    if not context_chunks:
+        return [], []
+
+    order = list(range(len(context_chunks)))
+    relevance: Optional[np.ndarray] = None
+    if len(context_chunks) > 1 and chunk_vectors is not None and all(v is not None for v in chunk_vectors):
+        matrix = np.asarray(np.stack(chunk_vectors), dtype=np.float32)
+        # Similarities below are dot products, so make sure rows are unit length
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms > 0, norms, 1.0)
+        query_vector = embed_query(user_query)
+        relevance = matrix @ query_vector
+        order = _mmr_order(query_vector, matrix, mmr_lambda, duplicate_threshold)
+
+    chosen: List[int] = []
+    remaining = budget
+    for index in order:
+        cost = estimate_tokens(context_chunks[index]) + _CHUNK_OVERHEAD_TOKENS
+        if cost <= remaining:
+            chosen.append(index)
+            remaining -= cost
+
+    packed_chunks = [context_chunks[index] for index in chosen]
+    if not chosen:
+        # Even the best chunk is over budget: send a truncated copy of it
+        index = order[0]
+        chosen = [index]
+        packed_chunks = [context_chunks[index][:max(0, budget - _CHUNK_OVERHEAD_TOKENS) * 4]]
+    elif relevance is not None:
+        by_relevance = sorted(range(len(chosen)), key=lambda i: -relevance[chosen[i]])
+        chosen = [chosen[i] for i in by_relevance]
+        packed_chunks = [packed_chunks[i] for i in by_relevance]
+
+    logger.debug(
+        f"Packed {len(chosen)}/{len(context_chunks)} chunks into {budget - remaining}/{budget} tokens"
+    )
+    return packed_chunks, [sources[index] for index in chosen]
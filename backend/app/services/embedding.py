@@ -1,39 +1,270 @@
-from typing import List
+import os
+import re
+import zlib
 import logging
+import time
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 import numpy as np
 
+from app.core.resources import registry
+from app.core.metrics import metrics
+from app.services.cache import LRUCache
+
 # Initialize logger
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
+
+# Embedding backend: "sentence-transformers" (default) or "hashing" for offline use
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence-transformers")
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_DIMENSION = 384  # all-MiniLM-L6-v2
+
+# Memoized query embeddings; a TTL of 0 keeps entries until they are evicted
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+QUERY_EMBEDDING_CACHE_TTL = float(os.getenv("QUERY_EMBEDDING_CACHE_TTL", "0"))
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# One observation per backend.encode call of up to batch_size texts
+EMBED_BATCH_SECONDS = metrics.histogram("embedding_batch_seconds", "Time to encode one embedding batch", ["backend"])
+
+
+class SentenceTransformerBackend:
+    """Batched inference with a SentenceTransformer model, loaded on first use."""
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, device: str = "cpu"):
+        self.model_name = model_name
+        self.device = device
+        self.name = f"sentence-transformers/{model_name}"
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name, device=self.device)
+        return self._model
+
+    @property
+    def dimension(self) -> int:
+        return self._load().get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return self._load().encode(
+            texts,
+            batch_size=len(texts),
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+
+
+@lru_cache(maxsize=1 << 16)
+def _hash_slot(feature: str, dimension: int) -> Tuple[int, float]:
+    h = zlib.crc32(feature.encode("utf-8"))
+    return h % dimension, (1.0 if h & 0x80000000 else -1.0)
+
+
+class HashingBackend:
+    """
+    Deterministic feature-hashing embedder for tests and offline benchmarks.
+
+    Word unigrams and bigrams are hashed (crc32, so stable across processes)
+    into signed buckets. Texts sharing words get similar vectors, which is
+    enough to exercise retrieval without downloading a model.
+    """
+
+    def __init__(self, dimension: int = EMBEDDING_DIMENSION):
+        self.dimension = dimension
+        self.name = f"hashing-{dimension}"
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        rows: List[int] = []
+        cols: List[int] = []
+        signs: List[float] = []
+        for row, text in enumerate(texts):
+            tokens = _TOKEN_RE.findall(text.lower())
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            for feature in features:
+                col, sign = _hash_slot(feature, self.dimension)
+                rows.append(row)
+                cols.append(col)
+                signs.append(sign)
+
+        out = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        np.add.at(out, (rows, cols), signs)
+        return out
+
+
+class EmbeddingEngine:
+    """
+    Batched, vectorized embedding shared by ingestion and query.
+
+    Texts are encoded ``batch_size`` at a time into one preallocated
+    C-contiguous float32 matrix, then L2-normalized in a single vectorized
+    pass.
+    """
+
+    def __init__(self, backend, batch_size: int = EMBEDDING_BATCH_SIZE):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.backend = backend
+        self.batch_size = batch_size
+
+    @property
+    def name(self) -> str:
+        return self.backend.name
+
+    @property
+    def dimension(self) -> int:
+        return self.backend.dimension
+
+    def embed(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """Returns an (n, dimension) float32 matrix of unit-length embeddings."""
+        batch_size = batch_size or self.batch_size
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+
+        out: Optional[np.ndarray] = None
+        for start in range(0, len(texts), batch_size):
+            with EMBED_BATCH_SECONDS.time(backend=self.name):
+                batch = np.asarray(self.backend.encode(texts[start:start + batch_size]), dtype=np.float32)
+            if out is None:
+                out = np.empty((len(texts), batch.shape[1]), dtype=np.float32)
+            out[start:start + len(batch)] = batch
+
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self.embed([text])[0]
+
+
+def create_backend(name: str = EMBEDDING_BACKEND):
+    if name == "sentence-transformers":
+        return SentenceTransformerBackend()
+    if name == "hashing":
+        return HashingBackend()
+    raise ValueError(f"Unknown embedding backend: {name}")
+
+
+registry.register("embedding_engine", lambda: EmbeddingEngine(create_backend()))
+
+
+def get_embedding_engine() -> EmbeddingEngine:
+    """Return the process-wide embedding engine, creating it on first use."""
+    return registry.get("embedding_engine")
+
+
+def normalize_query(text: str) -> str:
+    """Case- and whitespace-insensitive form of a query, used as a cache key."""
+    return " ".join(text.split()).lower()
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU of normalized query text -> embedding vector.
+
+    The Streamlit frontend resubmits identical queries on every rerun, so
+    most query embeddings are repeats. Entries are keyed by the engine name
+    too, so switching backends never serves vectors from another model.
+    """
+
+    def __init__(self, maxsize: int = QUERY_EMBEDDING_CACHE_SIZE, ttl: float = QUERY_EMBEDDING_CACHE_TTL):
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._embed_time = 0.0
+        self._embeds = 0
+
+    def get(self, text: str, engine: Optional[EmbeddingEngine] = None) -> np.ndarray:
+        engine = engine or get_embedding_engine()
+        key = (engine.name, normalize_query(text))
+        vector = self._cache.get(key)
+        if vector is not None:
+            return vector
+
+        start = time.perf_counter()
+        vector = engine.embed_query(key[1])
+        elapsed = time.perf_counter() - start
+        # Cached vectors are shared between callers, so make them read-only
+        vector.setflags(write=False)
+        self._cache.put(key, vector)
+        with self._lock:
+            self._embed_time += elapsed
+            self._embeds += 1
+        return vector
+
+    def get_many(self, texts: List[str], engine: Optional[EmbeddingEngine] = None) -> np.ndarray:
+        """Embeddings of many queries as one matrix; all cache misses are embedded in a single batch."""
+        engine = engine or get_embedding_engine()
+        keys = [(engine.name, normalize_query(text)) for text in texts]
+        vectors: List[Optional[np.ndarray]] = [self._cache.get(key) for key in keys]
+        missing = sorted({key[1] for key, vector in zip(keys, vectors) if vector is None})
+
+        if missing:
+            start = time.perf_counter()
+            matrix = engine.embed(missing)
+            elapsed = time.perf_counter() - start
+            embedded = {}
+            for text, row in zip(missing, matrix):
+                row.setflags(write=False)
+                self._cache.put((engine.name, text), row)
+                embedded[text] = row
+            with self._lock:
+                self._embed_time += elapsed
+                self._embeds += len(missing)
+            vectors = [embedded[key[1]] if vector is None else vector for key, vector in zip(keys, vectors)]
+
+        if not vectors:
+            return np.empty((0, engine.dimension), dtype=np.float32)
+        return np.ascontiguousarray(np.stack(vectors), dtype=np.float32)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._cache.stats()
+        with self._lock:
+            mean_embed_time = self._embed_time / self._embeds if self._embeds else 0.0
+        stats["mean_embed_time"] = mean_embed_time
+        stats["saved_time"] = stats["hits"] * mean_embed_time
+        return stats
+
+
+query_embedding_cache = QueryEmbeddingCache()
+
+
+def embed_query(text: str) -> np.ndarray:
+    """Embedding of a search query, served from the query embedding cache when possible."""
+    return query_embedding_cache.get(text)
+
+
+def embed_queries(texts: List[str]) -> np.ndarray:
+    """Embeddings of many search queries as one float32 matrix, using the query embedding cache."""
+    return query_embedding_cache.get_many(texts)
+
 
 def generate_embeddings(texts: List[str]) -> List[List[float]]:
     """
-    Generate simple embeddings for a list of text strings.
-    This is a placeholder implementation that returns random vectors.
-    In a production environment, this should be replaced with a proper embedding model.
+    Generate embeddings for a list of text strings with the shared engine.
 
     Args:
         texts (List[str]): The list of text chunks or queries.
 
     Returns:
-        List[List[float]]: List of vector embeddings.
+        List[List[float]]: List of unit-length vector embeddings. Use
+        get_embedding_engine().embed() to get the float32 matrix directly.
     """
     if not texts:
         logger.warning("Empty text list provided for embedding generation.")
         return []
 
     try:
-        # Generate random embeddings for now
-        # In production, replace this with a proper embedding model
-        embeddings = []
-        for _ in texts:
-            # Generate a random vector of length 384 (same as MiniLM)
-            embedding = np.random.randn(384).tolist()
-            # Normalize the vector
-            norm = np.linalg.norm(embedding)
-            normalized_embedding = [x/norm for x in embedding]
-            embeddings.append(normalized_embedding)
-        return embeddings
+        return get_embedding_engine().embed(texts).tolist()
     except Exception as e:
         logger.error("Failed to generate embeddings", exc_info=True)
         raise RuntimeError("Embedding generation failed.") from e
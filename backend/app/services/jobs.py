@@ -0,0 +1,391 @@
+import os
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "jobs.sqlite3")
+# "inprocess" needs no broker; other backends can be added with register_job_backend
+JOB_QUEUE_BACKEND = os.getenv("JOB_QUEUE_BACKEND", "inprocess")
+# Upload batches ingested at the same time; each batch fans out to the parser pool
+JOB_BATCH_CONCURRENCY = int(os.getenv("JOB_BATCH_CONCURRENCY", "1"))
+# Seconds a worker's claim on its jobs lasts without a heartbeat; expired claims are taken over by another worker
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+
+# Job states: queued -> processing -> success | empty | failed
+ACTIVE_STATES = ("queued", "processing")
+FINAL_STATES = ("success", "empty", "failed")
+
+_JOB_COLUMNS = [
+    "job_id", "batch_id", "user_id", "filename", "file_path", "file_type",
+    "file_size", "status", "message", "paragraphs", "created_at", "updated_at",
+]
+
+
+class JobStore:
+    """
+    Persistent job table in SQLite, one row per uploaded file.
+
+    Rows survive restarts, so status polling keeps working and unfinished
+    jobs can be picked up again after a crash. Each active job is owned by
+    the worker running it (``owner``) for as long as that worker keeps
+    renewing its lease; only jobs nobody holds or whose lease expired can
+    be claimed by another worker.
+    """
+
+    def __init__(self, db_path: str = JOBS_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    batch_id TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    file_type TEXT,
+                    file_size INTEGER,
+                    status TEXT NOT NULL,
+                    message TEXT,
+                    paragraphs INTEGER DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    owner TEXT,
+                    lease_expires REAL
+                )
+                """
+            )
+            # Job tables created before leases existed
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for column, column_type in (("owner", "TEXT"), ("lease_expires", "REAL")):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_batch ON jobs (batch_id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+
+    def create(self, jobs: List[Dict[str, Any]]) -> None:
+        now = time.time()
+        rows = [
+            (
+                job["job_id"], job["batch_id"], job["user_id"], job["filename"], job["file_path"],
+                job.get("file_type"), job.get("file_size"), job.get("status", "queued"),
+                job.get("message"), 0, now, now,
+            )
+            for job in jobs
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT INTO jobs ({', '.join(_JOB_COLUMNS)}) VALUES ({', '.join('?' * len(_JOB_COLUMNS))})",
+                rows
+            )
+
+    def update(self, job_id: str, status: str, message: Optional[str] = None, paragraphs: Optional[int] = None) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, message = COALESCE(?, message), "
+                "paragraphs = COALESCE(?, paragraphs), updated_at = ? WHERE job_id = ?",
+                (status, message, paragraphs, time.time(), job_id)
+            )
+
+    def claim(self, owner: str, lease_seconds: float, job_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Takes over active jobs that no worker holds or whose lease has
+        expired (optionally only among ``job_ids``) and returns them.
+
+        Selection and update run in one write transaction, so two workers
+        never claim the same job.
+        """
+        now = time.time()
+        sql = (
+            f"SELECT job_id FROM jobs WHERE status IN ({', '.join('?' * len(ACTIVE_STATES))}) "
+            "AND (owner IS NULL OR lease_expires IS NULL OR lease_expires < ?)"
+        )
+        params: List[Any] = [*ACTIVE_STATES, now]
+        if job_ids is not None:
+            if not job_ids:
+                return []
+            sql += f" AND job_id IN ({', '.join('?' * len(job_ids))})"
+            params.extend(job_ids)
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                claimed = [row["job_id"] for row in self._conn.execute(sql, params)]
+                self._conn.executemany(
+                    "UPDATE jobs SET owner = ?, lease_expires = ?, updated_at = ? WHERE job_id = ?",
+                    [(owner, now + lease_seconds, now, job_id) for job_id in claimed]
+                )
+                rows = self._conn.execute(
+                    f"SELECT * FROM jobs WHERE job_id IN ({', '.join('?' * len(claimed))}) ORDER BY rowid", claimed
+                ).fetchall() if claimed else []
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [dict(row) for row in rows]
+
+    def renew(self, owner: str, lease_seconds: float) -> int:
+        """Extends the lease on every active job ``owner`` holds; returns how many."""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                f"UPDATE jobs SET lease_expires = ? WHERE owner = ? AND status IN ({', '.join('?' * len(ACTIVE_STATES))})",
+                (time.time() + lease_seconds, owner, *ACTIVE_STATES)
+            ).rowcount
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def batch(self, batch_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE batch_id = ? ORDER BY rowid", (batch_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def by_status(self, statuses: tuple) -> List[Dict[str, Any]]:
+        placeholders = ", ".join("?" * len(statuses))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM jobs WHERE status IN ({placeholders}) ORDER BY rowid", statuses
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+def summarize_batch(batch_id: str, jobs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Batch-level progress over its per-file jobs."""
+    counts = {state: 0 for state in ACTIVE_STATES + FINAL_STATES}
+    for job in jobs:
+        counts[job["status"]] = counts.get(job["status"], 0) + 1
+    done = sum(counts[state] for state in FINAL_STATES)
+    return {
+        "batch_id": batch_id,
+        "status": "completed" if jobs and done == len(jobs) else "processing",
+        "total": len(jobs),
+        "completed": done,
+        "counts": counts,
+        "progress": done / len(jobs) if jobs else 0.0,
+        "jobs": jobs,
+    }
+
+
+class JobQueue(ABC):
+    """Interface for ingestion queue backends."""
+
+    @abstractmethod
+    def submit(self, batch_id: str, jobs: List[Dict[str, Any]]) -> None:
+        """Queues one upload batch for ingestion."""
+
+    def shutdown(self) -> None:
+        pass
+
+
+class InProcessJobQueue(JobQueue):
+    """
+    Runs ingestion batches on a local thread pool, no broker required.
+
+    Each batch goes through ingestion.pipeline.ingest_files, which parses
+    files in its process pool and indexes them as they finish; job rows are
+    updated per file as results arrive.
+
+    Jobs are claimed in the job store before they run, and a heartbeat
+    thread renews the claims every third of JOB_LEASE_SECONDS. The same
+    thread takes over jobs whose lease expired, i.e. whose worker died;
+    this also runs once when the queue is built, which the API does at
+    startup (see start_job_queue). Jobs still held by a live worker are
+    left alone, so several API workers can share one job store.
+
+    An uploaded file is deleted once its job reaches a final state, and
+    the batch directory once it is empty.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        max_batches: int = JOB_BATCH_CONCURRENCY,
+        lease_seconds: float = JOB_LEASE_SECONDS
+    ):
+        self.store = store
+        self.lease_seconds = lease_seconds
+        # Per instance, not per module, so forked workers never share an ID
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_batches), thread_name_prefix="ingestion-job")
+        self._stop = threading.Event()
+        self._recover()
+        self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="ingestion-job-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def submit(self, batch_id: str, jobs: List[Dict[str, Any]]) -> None:
+        claimed = self.store.claim(self.worker_id, self.lease_seconds, [job["job_id"] for job in jobs])
+        if claimed:
+            self._executor.submit(self._run_batch, batch_id, claimed)
+
+    def _run_batch(self, batch_id: str, jobs: List[Dict[str, Any]]) -> None:
+        # Imported here so the API process only loads the parser stack when ingesting
+        from app.ingestion.pipeline import ingest_files
+
+        by_name = {job["filename"]: job["job_id"] for job in jobs}
+        for job in jobs:
+            self.store.update(job["job_id"], "processing", "Parsing")
+
+        def on_result(result: Dict[str, Any]) -> None:
+            if self._stop.is_set():
+                # Shutting down (parses get cancelled): leave the job active so its lease expires and it is rerun
+                return
+            job_id = by_name.get(result["filename"])
+            if job_id:
+                self.store.update(job_id, result["status"], result["message"], result["paragraphs"])
+
+        try:
+            ingest_files(
+                [(job["file_path"], job["filename"]) for job in jobs],
+                user_id=jobs[0]["user_id"],
+                on_result=on_result
+            )
+        except Exception as e:
+            logger.exception(f"Ingestion batch {batch_id} failed: {e}")
+            if self._stop.is_set():
+                return
+            for job in jobs:
+                current = self.store.get(job["job_id"])
+                if current and current["status"] in ACTIVE_STATES:
+                    self.store.update(job["job_id"], "failed", f"Batch failed: {e}")
+        finally:
+            self._remove_uploads(jobs)
+
+    def _remove_uploads(self, jobs: List[Dict[str, Any]]) -> None:
+        for job in jobs:
+            current = self.store.get(job["job_id"])
+            if current is None or current["status"] not in FINAL_STATES:
+                continue
+            try:
+                os.remove(job["file_path"])
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not remove upload {job['file_path']}: {e}")
+        for directory in {os.path.dirname(job["file_path"]) for job in jobs}:
+            try:
+                os.rmdir(directory)
+            except OSError:
+                # Other jobs of the batch (possibly on another worker) still hold files
+                pass
+
+    def _recover(self) -> None:
+        """Claims and resubmits jobs whose worker stopped renewing its lease."""
+        batches: Dict[str, List[Dict[str, Any]]] = {}
+        for job in self.store.claim(self.worker_id, self.lease_seconds):
+            if os.path.exists(job["file_path"]):
+                self.store.update(job["job_id"], "queued", "Requeued after its worker stopped")
+                batches.setdefault(job["batch_id"], []).append(job)
+            else:
+                self.store.update(job["job_id"], "failed", "Uploaded file missing after its worker stopped")
+        for batch_id, jobs in batches.items():
+            logger.info(f"Resubmitting {len(jobs)} unfinished jobs of batch {batch_id}")
+            self._executor.submit(self._run_batch, batch_id, jobs)
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                self.store.renew(self.worker_id, self.lease_seconds)
+                self._recover()
+            except Exception as e:
+                logger.error(f"Job lease heartbeat failed: {str(e)}")
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        self._executor.shutdown(wait=False)
+
+
+JOB_QUEUE_BACKENDS: Dict[str, Callable[[JobStore], JobQueue]] = {
+    "inprocess": InProcessJobQueue,
+}
+
+
+def register_job_backend(name: str, factory: Callable[[JobStore], JobQueue]) -> None:
+    """Makes a queue backend (e.g. Celery/Redis) selectable via JOB_QUEUE_BACKEND."""
+    JOB_QUEUE_BACKENDS[name] = factory
+
+
+_job_store: Optional[JobStore] = None
+_job_queue: Optional[JobQueue] = None
+_init_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    global _job_store
+    with _init_lock:
+        if _job_store is None:
+            _job_store = JobStore()
+        return _job_store
+
+
+def get_job_queue() -> JobQueue:
+    global _job_queue
+    store = get_job_store()
+    with _init_lock:
+        if _job_queue is None:
+            if JOB_QUEUE_BACKEND not in JOB_QUEUE_BACKENDS:
+                raise ValueError(f"Unknown job queue backend: {JOB_QUEUE_BACKEND}")
+            _job_queue = JOB_QUEUE_BACKENDS[JOB_QUEUE_BACKEND](store)
+        return _job_queue
+
+
+def start_job_queue() -> JobQueue:
+    """
+    Builds the configured queue, taking over jobs whose worker died (their
+    lease expired). Called from the API's startup hook so recovery doesn't
+    wait for the next upload.
+    """
+    return get_job_queue()
+
+
+def stop_job_queue() -> None:
+    """Stops the queue, if one was started; called from the API's shutdown hook."""
+    global _job_queue
+    with _init_lock:
+        job_queue, _job_queue = _job_queue, None
+    if job_queue is not None:
+        job_queue.shutdown()
+
+
+def enqueue_files(files: List[Dict[str, Any]], user_id: str, batch_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Records one job per file and queues them as one batch.
+
+    Args:
+        files: Dicts with filename, file_path, file_type and file_size
+        batch_id: ID for the batch, generated when not given
+
+    Returns:
+        Dict: batch_id and the created jobs.
+    """
+    batch_id = batch_id or uuid.uuid4().hex
+    jobs = [
+        {
+            "job_id": uuid.uuid4().hex,
+            "batch_id": batch_id,
+            "user_id": user_id,
+            "status": "queued",
+            "message": "Queued for ingestion",
+            **f,
+        }
+        for f in files
+    ]
+    get_job_store().create(jobs)
+    get_job_queue().submit(batch_id, jobs)
+    logger.info(f"Queued batch {batch_id} with {len(jobs)} files for {user_id}")
+    return {"batch_id": batch_id, "jobs": jobs}
@@ -0,0 +1,265 @@
+import os
+import re
+import gzip
+import json
+import math
+import time
+import atexit
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", ".lexical")
+# Minimum seconds between index snapshots written to disk
+LEXICAL_INDEX_SAVE_INTERVAL = float(os.getenv("LEXICAL_INDEX_SAVE_INTERVAL", "10"))
+
+# Keeps clause numbers ("4.2.1"), codes ("art-5") and acronyms as single terms
+_TERM_RE = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TERM_RE.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Incrementally maintained BM25 inverted index over paragraph text.
+
+    Documents are keyed by their vector store chunk ID. Postings map each
+    term to {internal doc number: term frequency}, so adds and deletes only
+    touch the terms of the affected paragraph. Snapshots are written to a
+    gzip-compressed JSON file at most every ``save_interval`` seconds and on
+    exit.
+
+    ``collection_version`` is the collection write version (see
+    DocumentCatalog.collection_version) the index reflects; the vector
+    store compares it with the shared one to decide when to rebuild.
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75,
+                 save_interval: float = LEXICAL_INDEX_SAVE_INTERVAL):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.save_interval = save_interval
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._doc_terms: Dict[int, Dict[str, int]] = {}
+        self._doc_lengths: Dict[int, int] = {}
+        self._ids: Dict[str, int] = {}
+        self._names: Dict[int, str] = {}
+        self._next_id = 0
+        self._total_length = 0
+        self._dirty = False
+        self._last_save = 0.0
+        self.collection_version: Optional[int] = None
+        if path and os.path.exists(path):
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._ids
+
+    def add(self, doc_id: str, text: str) -> None:
+        self.add_many([doc_id], [text])
+
+    def add_many(self, doc_ids: Iterable[str], texts: Iterable[str]) -> None:
+        with self._lock:
+            for doc_id, text in zip(doc_ids, texts):
+                if doc_id in self._ids:
+                    self._remove(doc_id)
+                self._insert(doc_id, Counter(tokenize(text)))
+            self._dirty = True
+        self.maybe_save()
+
+    def remove_many(self, doc_ids: Iterable[str]) -> None:
+        with self._lock:
+            for doc_id in doc_ids:
+                if doc_id in self._ids:
+                    self._remove(doc_id)
+                    self._dirty = True
+        self.maybe_save()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._doc_lengths.clear()
+            self._ids.clear()
+            self._names.clear()
+            self._next_id = 0
+            self._total_length = 0
+            self._dirty = True
+
+    def set_collection_version(self, version: Optional[int]) -> None:
+        with self._lock:
+            self.collection_version = version
+            self._dirty = True
+
+    def replace(self, other: "BM25Index") -> None:
+        """Takes over the documents of ``other`` (e.g. a rebuilt index) in one step."""
+        with self._lock, other._lock:
+            self._postings = other._postings
+            self._doc_terms = other._doc_terms
+            self._doc_lengths = other._doc_lengths
+            self._ids = other._ids
+            self._names = other._names
+            self._next_id = other._next_id
+            self._total_length = other._total_length
+            self._dirty = True
+
+    def _insert(self, doc_id: str, term_counts: Dict[str, int]) -> None:
+        number = self._next_id
+        self._next_id += 1
+        self._ids[doc_id] = number
+        self._names[number] = doc_id
+        self._doc_terms[number] = dict(term_counts)
+        length = sum(term_counts.values())
+        self._doc_lengths[number] = length
+        self._total_length += length
+        for term, tf in term_counts.items():
+            self._postings.setdefault(term, {})[number] = tf
+
+    def _remove(self, doc_id: str) -> None:
+        number = self._ids.pop(doc_id)
+        del self._names[number]
+        self._total_length -= self._doc_lengths.pop(number)
+        for term in self._doc_terms.pop(number):
+            postings = self._postings[term]
+            del postings[number]
+            if not postings:
+                del self._postings[term]
+
+    def search(self, query: str, k: int = 10, allowed: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Top ``k`` documents by BM25 score for the query terms.
+
+        Args:
+            allowed: Optional set of doc IDs to restrict the search to
+
+        Returns:
+            List[Tuple[str, float]]: (doc_id, score), best first.
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            n_docs = len(self._ids)
+            if not n_docs or not terms:
+                return []
+            avg_length = self._total_length / n_docs
+            scores: Dict[int, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for number, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[number] / avg_length)
+                    scores[number] = scores.get(number, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            results = []
+            for number, score in ranked:
+                doc_id = self._names[number]
+                if allowed is not None and doc_id not in allowed:
+                    continue
+                results.append((doc_id, score))
+                if len(results) >= k:
+                    break
+            return results
+
+    def maybe_save(self) -> None:
+        if self.path and self._dirty and time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
+
+    def save(self) -> None:
+        """Write a compact snapshot: doc numbers are renumbered densely and postings flattened."""
+        if not self.path:
+            return
+        with self._lock:
+            renumber = {number: i for i, number in enumerate(sorted(self._names))}
+            snapshot = {
+                "version": 1,
+                "collection_version": self.collection_version,
+                "docs": [self._names[number] for number in sorted(self._names)],
+                "postings": {
+                    term: [value for number, tf in postings.items() for value in (renumber[number], tf)]
+                    for term, postings in self._postings.items()
+                },
+            }
+            self._dirty = False
+            self._last_save = time.monotonic()
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    def _load(self) -> None:
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable lexical index {self.path}: {e}")
+            return
+
+        doc_terms: Dict[int, Dict[str, int]] = {number: {} for number in range(len(snapshot["docs"]))}
+        for term, flat in snapshot["postings"].items():
+            postings = dict(zip(flat[0::2], flat[1::2]))
+            self._postings[term] = postings
+            for number, tf in postings.items():
+                doc_terms[number][term] = tf
+        for number, doc_id in enumerate(snapshot["docs"]):
+            self._ids[doc_id] = number
+            self._names[number] = doc_id
+            self._doc_terms[number] = doc_terms[number]
+            self._doc_lengths[number] = sum(doc_terms[number].values())
+        self._total_length = sum(self._doc_lengths.values())
+        self._next_id = len(snapshot["docs"])
+        self.collection_version = snapshot.get("collection_version")
+        self._last_save = time.monotonic()
+
+
+_indexes: Dict[str, BM25Index] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_lexical_index(collection_name: str = "theme_docs") -> BM25Index:
+    """Process-wide BM25 index for a collection, loaded from disk on first use."""
+    index = _indexes.get(collection_name)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(collection_name)
+            if index is None:
+                path = os.path.join(LEXICAL_INDEX_DIR, f"{collection_name}.json.gz")
+                index = BM25Index(path)
+                _indexes[collection_name] = index
+    return index
+
+
+@atexit.register
+def _save_indexes() -> None:
+    for index in list(_indexes.values()):
+        if index._dirty:
+            try:
+                index.save()
+            except OSError as e:
+                logger.error(f"Failed to save lexical index {index.path}: {e}")
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Fuse several best-first rankings of doc IDs with reciprocal rank fusion.
+
+    Each document scores sum(1 / (k + rank)) over the rankings it appears in.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -1,9 +1,48 @@
+import re
+import time
 import logging
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterator
 import json
 
+from app.core.metrics import metrics
+
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
+
+# Streaming calls are timed from the call to the last token
+LLM_SECONDS = metrics.histogram("llm_seconds", "LLM call duration", ["mode"])
+
+# A token of the placeholder backend: a word with its trailing whitespace
+_TOKEN_RE = re.compile(r"\s*\S+\s*")
+
+def classify_query(user_prompt: str) -> str:
+    """Query type used to shape the response."""
+    prompt = user_prompt.lower()
+    if "theme" in prompt:
+        return "THEME_SEARCH"
+    elif "file" in prompt or "document" in prompt:
+        return "FILE_SEARCH"
+    return "CONTENT_SEARCH"
+
+def _build_response(user_prompt: str, context: str) -> Dict[str, Any]:
+    query_type = classify_query(user_prompt)
+    if query_type == "THEME_SEARCH":
+        return {
+            "query_type": query_type,
+            # Theme context is already one short summary per theme
+            "answer": f"Based on the provided documents, here are the main themes:\n\n{context}",
+            "citations": ["(doc_1, 1)", "(doc_2, 1)"]
+        }
+    elif query_type == "FILE_SEARCH":
+        return {
+            "query_type": query_type,
+            "answer": "The information can be found in the following documents:\n\n" + context,
+            "citations": ["(doc_1, 1)"]
+        }
+    return {
+        "query_type": query_type,
+        "answer": "Here's what I found in the documents:\n\n" + context,
+        "citations": ["(doc_1, 1)", "(doc_2, 1)"]
+    }
 
 def query_llm(
     user_prompt: str,
@@ -14,6 +53,9 @@ def query_llm(
 ) -> str:
     """
     Simple LLM handler that returns a formatted response based on the context.
+
+    The context is used as given; callers size it with
+    context.pack_context rather than having it truncated here.
     
     Args:
         user_prompt: The user's query
@@ -26,28 +68,36 @@ def query_llm(
         str: The formatted response
     """
     try:
-        # Format the response based on the query type
-        if "theme" in user_prompt.lower():
-            response = {
-                "query_type": "THEME_SEARCH",
-                "answer": f"Based on the provided documents, here are the main themes:\n\n{context[:500]}...",
-                "citations": ["(doc_1, 1)", "(doc_2, 1)"]
-            }
-        elif "file" in user_prompt.lower() or "document" in user_prompt.lower():
-            response = {
-                "query_type": "FILE_SEARCH",
-                "answer": "The information can be found in the following documents:\n\n" + context[:500] + "...",
-                "citations": ["(doc_1, 1)"]
-            }
-        else:
-            response = {
-                "query_type": "CONTENT_SEARCH",
-                "answer": "Here's what I found in the documents:\n\n" + context[:500] + "...",
-                "citations": ["(doc_1, 1)", "(doc_2, 1)"]
-            }
-        
-        return json.dumps(response)
+        with LLM_SECONDS.time(mode="complete"):
+            # Format the response based on the query type
+            response = _build_response(user_prompt, context)
+            return json.dumps(response)
         
     except Exception as e:
         logger.error(f"Error in query_llm: {str(e)}", exc_info=True)
         raise
+
+def stream_llm(
+    user_prompt: str,
+    context: str = "",
+    system_prompt: Optional[str] = None,
+    temperature: float = 0.7,
+    max_tokens: Optional[int] = None
+) -> Iterator[str]:
+    """
+    Streaming counterpart of query_llm: yields answer tokens as they are produced.
+
+    The placeholder backend yields the same answer as query_llm one word
+    (plus trailing whitespace) at a time; a real model backend should yield
+    its decoded tokens here.
+    """
+    start = time.perf_counter()
+    try:
+        answer = _build_response(user_prompt, context)["answer"]
+        for match in _TOKEN_RE.finditer(answer):
+            yield match.group(0)
+    except Exception as e:
+        logger.error(f"Error in stream_llm: {str(e)}", exc_info=True)
+        raise
+    finally:
+        LLM_SECONDS.observe(time.perf_counter() - start, mode="stream")
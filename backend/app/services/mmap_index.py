@@ -0,0 +1,646 @@
+import os
+import json
+import shutil
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", ".vector_index")
+# Rows scored per matrix product in exact search; bounds temporary memory
+VECTOR_INDEX_BLOCK_ROWS = int(os.getenv("VECTOR_INDEX_BLOCK_ROWS", "65536"))
+# IVF partitions; 0 disables IVF and every query is an exact scan
+VECTOR_INDEX_IVF_LISTS = int(os.getenv("VECTOR_INDEX_IVF_LISTS", "0"))
+# Partitions searched per query when IVF is on
+VECTOR_INDEX_IVF_PROBES = int(os.getenv("VECTOR_INDEX_IVF_PROBES", "8"))
+# Collections smaller than this are always scanned exactly
+VECTOR_INDEX_IVF_MIN_ROWS = int(os.getenv("VECTOR_INDEX_IVF_MIN_ROWS", "50000"))
+# Rewrite the vector file once deleted rows are more than this share of it
+VECTOR_INDEX_COMPACT_RATIO = 0.5
+
+_OPERATORS = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+def _where_sql(where: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """Translate a Chroma ``where`` clause into SQL over the JSON metadata column."""
+    clauses: List[str] = []
+    params: List[Any] = []
+    for key, value in where.items():
+        if key in ("$and", "$or"):
+            parts = [_where_sql(clause) for clause in value]
+            joiner = " AND " if key == "$and" else " OR "
+            clauses.append("(" + joiner.join(sql for sql, _ in parts) + ")")
+            for _, part_params in parts:
+                params.extend(part_params)
+            continue
+
+        operations = value if isinstance(value, dict) else {"$eq": value}
+        for operator, operand in operations.items():
+            field = "json_extract(metadata, ?)"
+            params.append(f'$."{key}"')
+            if operator in ("$in", "$nin"):
+                negate = "NOT " if operator == "$nin" else ""
+                clauses.append(f"{field} {negate}IN ({', '.join('?' * len(operand))})")
+                params.extend(operand)
+            elif operator in _OPERATORS:
+                clauses.append(f"{field} {_OPERATORS[operator]} ?")
+                params.append(operand)
+            else:
+                raise ValueError(f"Unsupported where operator: {operator}")
+    return " AND ".join(clauses) or "1", params
+
+
+def _top_k(distances: np.ndarray, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Per query (axis 0), the ``k`` smallest distances and their rows."""
+    if distances.shape[1] > k:
+        keep = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        distances = np.take_along_axis(distances, keep, axis=1)
+        rows = np.take_along_axis(rows, keep, axis=1)
+    return distances, rows
+
+
+class MmapCollection:
+    """
+    Vector collection stored as a flat float32 file plus a SQLite side table.
+
+    Vectors are appended to ``vectors.<epoch>.f32`` and read through a
+    read-only ``np.memmap``, so every worker process on the host shares one
+    page-cache copy instead of holding its own index in RAM. IDs, documents
+    and JSON metadata live in ``meta.sqlite3``; ``where`` clauses run there
+    as SQL. Writers serialize on a SQLite write transaction and bump a
+    generation counter, which readers check before each operation to pick
+    up other processes' changes: rows appended since they last looked and
+    entries of the deletion log. The operation's own side-table reads run
+    in that same read transaction, so they never see rows the loaded
+    vectors don't cover. Adding an ID that is already stored is a no-op,
+    as in Chroma.
+
+    Search is an exact blocked matrix product (squared L2, like Chroma's
+    default space). With VECTOR_INDEX_IVF_LISTS set, collections above
+    VECTOR_INDEX_IVF_MIN_ROWS are partitioned by k-means centroids and only
+    the nearest VECTOR_INDEX_IVF_PROBES partitions are scanned.
+
+    Implements the subset of the Chroma collection API used by
+    vector_store: add, get, query, update, delete and count.
+    """
+
+    def __init__(self, path: str, name: str, embedding_function: Optional[Callable] = None):
+        self.path = path
+        self.name = name
+        self._embedding_function = embedding_function
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(path, "meta.sqlite3"), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rows (row INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, document TEXT, metadata TEXT)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value)")
+        # Rows deleted since the last compaction, so readers can catch up without rescanning ``rows``
+        self._conn.execute("CREATE TABLE IF NOT EXISTS deletions (seq INTEGER PRIMARY KEY AUTOINCREMENT, row INTEGER NOT NULL)")
+
+        self._generation: Optional[int] = None
+        self._dimension = 0
+        self._epoch = 0
+        self._file_rows = 0
+        self._matrix: Optional[np.ndarray] = None
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._ids: Dict[int, str] = {}
+        self._deletion_seq = 0
+        self._ivf: Optional[Dict[str, np.ndarray]] = None
+
+    # -- shared state -------------------------------------------------------
+
+    def _info(self, key: str, default: int = 0) -> int:
+        row = self._conn.execute("SELECT value FROM info WHERE key = ?", (key,)).fetchone()
+        return int(row[0]) if row else default
+
+    def _set_info(self, key: str, value: int) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO info (key, value) VALUES (?, ?)", (key, value))
+
+    def _vectors_path(self, epoch: int) -> str:
+        return os.path.join(self.path, f"vectors.{epoch}.f32")
+
+    def _refresh(self) -> None:
+        """
+        Re-read the shared state if another writer (or this one) changed it.
+
+        Within an epoch only the change is read: rows appended past the
+        last seen end of the file and the deletion log entries since the
+        last seen sequence number. A compaction (new epoch) or a recreated
+        collection reloads everything.
+        """
+        generation = self._info("generation")
+        if generation == self._generation:
+            return
+
+        # One read transaction, so rows, deletions and info are from the same snapshot
+        own_transaction = not self._conn.in_transaction
+        if own_transaction:
+            self._conn.execute("BEGIN")
+        try:
+            generation = self._info("generation")
+            epoch = self._info("epoch")
+            dimension = self._info("dimension")
+            file_rows = self._info("file_rows")
+            reload = epoch != self._epoch or dimension != self._dimension or file_rows < self._file_rows
+            if reload:
+                # Compacted or recreated: start over
+                self._matrix, self._norms, self._ivf = None, np.zeros(0, dtype=np.float32), None
+                self._file_rows = 0
+                self._ids = {}
+                self._alive = np.zeros(0, dtype=bool)
+                self._deletion_seq = 0
+            self._epoch, self._dimension = epoch, dimension
+
+            if file_rows and dimension and (self._matrix is None or file_rows != self._file_rows):
+                self._matrix = np.memmap(self._vectors_path(epoch), dtype=np.float32, mode="r", shape=(file_rows, dimension))
+                new_rows = self._matrix[self._file_rows:file_rows]
+                self._norms = np.concatenate([self._norms, np.einsum("ij,ij->i", new_rows, new_rows)])
+
+            added = self._conn.execute(
+                "SELECT row, id FROM rows WHERE row >= ? AND row < ?", (self._file_rows, file_rows)
+            ).fetchall()
+            deleted = self._conn.execute(
+                "SELECT seq, row FROM deletions WHERE seq > ? ORDER BY seq", (self._deletion_seq,)
+            ).fetchall()
+        finally:
+            if own_transaction:
+                self._conn.execute("COMMIT")
+
+        self._alive = np.concatenate([self._alive, np.zeros(file_rows - self._file_rows, dtype=bool)])
+        self._file_rows = file_rows
+        for row, doc_id in added:
+            self._ids[row] = doc_id
+            self._alive[row] = True
+        for seq, row in deleted:
+            # A full reload already reflects the log; the pop is then a no-op
+            if self._ids.pop(row, None) is not None:
+                self._alive[row] = False
+            self._deletion_seq = seq
+        if self._ivf is not None:
+            self._extend_ivf()
+        self._generation = generation
+
+    @contextmanager
+    def _snapshot(self) -> Iterator[None]:
+        """
+        Refresh, then keep reading in the same SQLite read transaction.
+
+        Row numbers from the side table then always match the loaded
+        vectors, even if another process appends or compacts meanwhile.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._refresh()
+                yield
+            finally:
+                self._conn.execute("COMMIT")
+
+    # -- Chroma collection API ----------------------------------------------
+
+    def count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._ids)
+
+    def add(
+        self,
+        ids: List[str],
+        documents: Optional[List[str]] = None,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        embeddings: Optional[Any] = None
+    ) -> None:
+        if embeddings is None:
+            if self._embedding_function is None:
+                raise ValueError("embeddings are required when the collection has no embedding function")
+            embeddings = self._embedding_function(documents)
+        matrix = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+        if matrix.ndim != 2 or len(matrix) != len(ids):
+            raise ValueError("embeddings must be one vector per id")
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [None] * len(ids)
+
+        with self._lock:
+            # BEGIN IMMEDIATE takes the database write lock: one writer across all processes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Like Chroma, IDs that are already stored (or repeated in this call) are skipped;
+                # checked under the write lock, so concurrent writers of the same chunks can't collide
+                existing = self._stored_ids(ids)
+                keep = []
+                for i, doc_id in enumerate(ids):
+                    if doc_id not in existing:
+                        existing.add(doc_id)
+                        keep.append(i)
+                if len(keep) < len(ids):
+                    logger.debug(f"Skipping {len(ids) - len(keep)} existing IDs in {self.name}")
+                    if not keep:
+                        self._conn.execute("COMMIT")
+                        return
+                    ids = [ids[i] for i in keep]
+                    documents = [documents[i] for i in keep]
+                    metadatas = [metadatas[i] for i in keep]
+                    matrix = matrix[keep]
+
+                dimension = self._info("dimension") or matrix.shape[1]
+                if matrix.shape[1] != dimension:
+                    raise ValueError(f"Embedding dimension {matrix.shape[1]} does not match collection dimension {dimension}")
+                start = self._info("file_rows")
+                # Write at the committed end, so a crashed write's leftovers are overwritten
+                vectors_path = self._vectors_path(self._info("epoch"))
+                with open(vectors_path, "r+b" if os.path.exists(vectors_path) else "w+b") as f:
+                    f.seek(start * dimension * 4)
+                    f.write(matrix.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._conn.executemany(
+                    "INSERT INTO rows (row, id, document, metadata) VALUES (?, ?, ?, ?)",
+                    [
+                        (start + i, doc_id, document, json.dumps(metadata) if metadata is not None else None)
+                        for i, (doc_id, document, metadata) in enumerate(zip(ids, documents, metadatas))
+                    ]
+                )
+                self._set_info("dimension", dimension)
+                self._set_info("file_rows", start + len(ids))
+                self._set_info("generation", self._info("generation") + 1)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _stored_ids(self, ids: List[str]) -> set:
+        found = set()
+        # Stay under SQLite's bound parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            found.update(doc_id for doc_id, in self._conn.execute(
+                f"SELECT id FROM rows WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+            ))
+        return found
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        include: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None
+    ) -> Dict[str, Any]:
+        include = ["documents", "metadatas"] if include is None else include
+        sql = "SELECT row, id, document, metadata FROM rows WHERE 1"
+        params: List[Any] = []
+        if ids is not None:
+            if not ids:
+                return {"ids": [], **{field: [] for field in include}}
+            sql += f" AND id IN ({', '.join('?' * len(ids))})"
+            params.extend(ids)
+        if where:
+            where_sql, where_params = _where_sql(where)
+            sql += f" AND {where_sql}"
+            params.extend(where_params)
+        sql += " ORDER BY row"
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([-1 if limit is None else limit, offset or 0])
+
+        with self._snapshot():
+            found = self._conn.execute(sql, params).fetchall()
+            result: Dict[str, Any] = {"ids": [doc_id for _, doc_id, _, _ in found]}
+            if "documents" in include:
+                result["documents"] = [document for _, _, document, _ in found]
+            if "metadatas" in include:
+                result["metadatas"] = [json.loads(metadata) if metadata else None for _, _, _, metadata in found]
+            if "embeddings" in include:
+                rows = [row for row, _, _, _ in found]
+                result["embeddings"] = np.array(self._matrix[rows]) if rows else np.zeros((0, self._dimension), dtype=np.float32)
+            return result
+
+    def update(
+        self,
+        ids: List[str],
+        embeddings: Optional[Any] = None,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        documents: Optional[List[str]] = None
+    ) -> None:
+        """Replace the metadata and/or documents of stored rows; unknown IDs are ignored."""
+        if embeddings is not None:
+            raise ValueError("Updating embeddings is not supported; delete and re-add the rows")
+        assignments, columns = [], []
+        if documents is not None:
+            assignments.append("document = ?")
+            columns.append(documents)
+        if metadatas is not None:
+            assignments.append("metadata = ?")
+            columns.append([json.dumps(metadata) if metadata is not None else None for metadata in metadatas])
+        if not assignments or not ids:
+            return
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Row numbers and vectors are unchanged, so readers need no refresh
+                self._conn.executemany(
+                    f"UPDATE rows SET {', '.join(assignments)} WHERE id = ?",
+                    [(*values, doc_id) for doc_id, *values in zip(ids, *columns)]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None) -> None:
+        condition, params = "1", []
+        if ids is not None:
+            if not ids:
+                return
+            condition += f" AND id IN ({', '.join('?' * len(ids))})"
+            params.extend(ids)
+        if where:
+            where_sql, where_params = _where_sql(where)
+            condition += f" AND {where_sql}"
+            params.extend(where_params)
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(f"INSERT INTO deletions (row) SELECT row FROM rows WHERE {condition}", params)
+                deleted = self._conn.execute(f"DELETE FROM rows WHERE {condition}", params).rowcount
+                if deleted:
+                    self._set_info("generation", self._info("generation") + 1)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._refresh()
+            if len(self._ids) < self._file_rows * (1 - VECTOR_INDEX_COMPACT_RATIO):
+                self.compact()
+
+    def query(
+        self,
+        query_embeddings: Optional[Any] = None,
+        query_texts: Optional[List[str]] = None,
+        n_results: int = 10,
+        where: Optional[Dict[str, Any]] = None,
+        include: Optional[List[str]] = None
+    ) -> Dict[str, List[List[Any]]]:
+        if query_embeddings is None:
+            if self._embedding_function is None:
+                raise ValueError("query_embeddings are required when the collection has no embedding function")
+            query_embeddings = self._embedding_function(query_texts)
+        queries = np.ascontiguousarray(np.asarray(query_embeddings, dtype=np.float32))
+        include = ["documents", "metadatas", "distances"] if include is None else include
+
+        with self._snapshot():
+            candidates = self._where_rows(where) if where else None
+            distances, rows = self._search(queries, n_results, candidates)
+            found_rows = sorted({int(row) for row in rows.ravel() if row >= 0})
+            details = self._details(found_rows, include)
+            # Resolved under the lock: a compaction renumbers rows
+            found_ids = {row: self._ids[row] for row in found_rows}
+            vectors = dict(zip(found_rows, np.array(self._matrix[found_rows]))) if "embeddings" in include and found_rows else {}
+
+        result: Dict[str, List[List[Any]]] = {"ids": []}
+        for field in ("documents", "metadatas", "distances", "embeddings"):
+            if field in include:
+                result[field] = []
+        for query_distances, query_rows in zip(distances, rows):
+            hits = [(d, int(r)) for d, r in zip(query_distances, query_rows) if r >= 0]
+            result["ids"].append([found_ids[r] for _, r in hits])
+            if "documents" in result:
+                result["documents"].append([details[r][0] for _, r in hits])
+            if "metadatas" in result:
+                result["metadatas"].append([details[r][1] for _, r in hits])
+            if "distances" in result:
+                result["distances"].append([float(d) for d, _ in hits])
+            if "embeddings" in result:
+                result["embeddings"].append([vectors[r] for _, r in hits])
+        return result
+
+    # -- search ---------------------------------------------------------------
+
+    def _where_rows(self, where: Dict[str, Any]) -> np.ndarray:
+        where_sql, params = _where_sql(where)
+        found = self._conn.execute(f"SELECT row FROM rows WHERE {where_sql}", params).fetchall()
+        return np.array(sorted(row for row, in found), dtype=np.int64)
+
+    def _details(self, rows: List[int], include: List[str]) -> Dict[int, Tuple[Optional[str], Optional[Dict[str, Any]]]]:
+        if not rows or not ({"documents", "metadatas"} & set(include)):
+            return {row: (None, None) for row in rows}
+        found = self._conn.execute(
+            f"SELECT row, document, metadata FROM rows WHERE row IN ({', '.join('?' * len(rows))})", rows
+        ).fetchall()
+        return {row: (document, json.loads(metadata) if metadata else None) for row, document, metadata in found}
+
+    def _search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        candidates: Optional[np.ndarray]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """k nearest alive rows per query; missing hits have row -1."""
+        m = len(queries)
+        best_distances = np.full((m, 0), np.inf, dtype=np.float32)
+        best_rows = np.full((m, 0), -1, dtype=np.int64)
+        if self._matrix is None or not self._ids or k < 1:
+            return best_distances, best_rows
+        if queries.shape[1] != self._dimension:
+            raise ValueError(f"Query dimension {queries.shape[1]} does not match collection dimension {self._dimension}")
+
+        query_norms = np.einsum("ij,ij->i", queries, queries)
+        for block, block_rows in self._candidate_blocks(queries, k, candidates):
+            distances = self._norms[block_rows][None, :] - 2.0 * (queries @ block.T) + query_norms[:, None]
+            distances[:, ~self._alive[block_rows]] = np.inf
+            best_distances, best_rows = _top_k(
+                np.concatenate([best_distances, distances], axis=1),
+                np.concatenate([best_rows, np.broadcast_to(block_rows, distances.shape)], axis=1),
+                k
+            )
+
+        order = np.argsort(best_distances, axis=1)
+        best_distances = np.take_along_axis(best_distances, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        best_rows[~np.isfinite(best_distances)] = -1
+        return best_distances, best_rows
+
+    def _candidate_blocks(self, queries: np.ndarray, k: int, candidates: Optional[np.ndarray]):
+        """
+        (vectors, row numbers) blocks to scan: every row, the ``where``
+        matches, or the rows of the probed IVF lists. Full scans slice the
+        memmap without copying; candidate subsets are gathered per block.
+        """
+        ivf = self._get_ivf()
+        if ivf is not None:
+            probes = min(VECTOR_INDEX_IVF_PROBES, len(ivf["centroids"]))
+            nearest_lists = np.argsort(-(queries @ ivf["centroids"].T), axis=1)[:, :probes]
+            probed = np.unique(np.concatenate([ivf["lists"][i] for i in np.unique(nearest_lists)]))
+            if candidates is not None:
+                probed = np.intersect1d(probed, candidates, assume_unique=True)
+            # Too few hits in the probed lists: fall back to an exact scan
+            if np.count_nonzero(self._alive[probed]) >= k:
+                candidates = probed
+
+        if candidates is None:
+            for start in range(0, self._file_rows, VECTOR_INDEX_BLOCK_ROWS):
+                end = min(start + VECTOR_INDEX_BLOCK_ROWS, self._file_rows)
+                yield self._matrix[start:end], np.arange(start, end, dtype=np.int64)
+        else:
+            for start in range(0, len(candidates), VECTOR_INDEX_BLOCK_ROWS):
+                rows = candidates[start:start + VECTOR_INDEX_BLOCK_ROWS]
+                yield self._matrix[rows], rows
+
+    # -- IVF ------------------------------------------------------------------
+
+    def _get_ivf(self) -> Optional[Dict[str, np.ndarray]]:
+        if VECTOR_INDEX_IVF_LISTS < 1 or len(self._ids) < VECTOR_INDEX_IVF_MIN_ROWS:
+            return None
+        trained_rows = int(self._ivf["trained_rows"]) if self._ivf is not None else 0
+        # Retrain once the collection has grown well past the training set
+        if self._ivf is None or len(self._ids) > 4 * trained_rows:
+            self._ivf = self._load_or_train_ivf()
+        return self._ivf
+
+    def _load_or_train_ivf(self) -> Dict[str, np.ndarray]:
+        ivf_path = os.path.join(self.path, f"ivf.{self._epoch}.npz")
+        centroids = None
+        trained_rows = 0
+        try:
+            with np.load(ivf_path) as saved:
+                if int(saved["trained_rows"]) * 4 >= len(self._ids) and saved["centroids"].shape[1] == self._dimension:
+                    centroids, trained_rows = saved["centroids"], int(saved["trained_rows"])
+        except (OSError, ValueError, KeyError):
+            pass
+
+        if centroids is None:
+            centroids = self._train_centroids()
+            trained_rows = len(self._ids)
+            tmp_path = f"{ivf_path}.{os.getpid()}.tmp.npz"
+            np.savez(tmp_path, centroids=centroids, trained_rows=np.array(trained_rows))
+            os.replace(tmp_path, ivf_path)
+            logger.info(f"Trained {len(centroids)} IVF lists for {self.name} on {trained_rows} rows")
+
+        self._ivf = {"centroids": centroids, "trained_rows": np.array(trained_rows), "lists": [], "assigned": np.array(0)}
+        self._extend_ivf()
+        return self._ivf
+
+    def _train_centroids(self, iterations: int = 10, sample_size: int = 100000) -> np.ndarray:
+        """Lloyd's k-means on a sample of alive rows (dot-product assignment)."""
+        rng = np.random.default_rng(0)
+        alive_rows = np.flatnonzero(self._alive)
+        sample = np.sort(rng.choice(alive_rows, size=min(sample_size, len(alive_rows)), replace=False))
+        data = np.asarray(self._matrix[sample])
+        lists = min(VECTOR_INDEX_IVF_LISTS, len(data))
+        centroids = data[rng.choice(len(data), size=lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, data)
+            counts = np.bincount(assignment, minlength=lists)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+        return centroids
+
+    def _extend_ivf(self) -> None:
+        """Assign rows written since the last assignment to their nearest IVF list."""
+        ivf = self._ivf
+        start = int(ivf["assigned"])
+        lists = ivf["lists"] or [np.zeros(0, dtype=np.int64) for _ in range(len(ivf["centroids"]))]
+        if start < self._file_rows:
+            new_lists: List[List[np.ndarray]] = [[] for _ in lists]
+            for block_start in range(start, self._file_rows, VECTOR_INDEX_BLOCK_ROWS):
+                block_end = min(block_start + VECTOR_INDEX_BLOCK_ROWS, self._file_rows)
+                assignment = np.argmax(self._matrix[block_start:block_end] @ ivf["centroids"].T, axis=1)
+                order = np.argsort(assignment, kind="stable")
+                bounds = np.searchsorted(assignment[order], np.arange(len(lists) + 1))
+                for i in range(len(lists)):
+                    new_lists[i].append(block_start + order[bounds[i]:bounds[i + 1]])
+            lists = [np.concatenate([lists[i]] + new_lists[i]) for i in range(len(lists))]
+        ivf["lists"] = lists
+        ivf["assigned"] = np.array(self._file_rows)
+
+    # -- maintenance ------------------------------------------------------------
+
+    def compact(self) -> None:
+        """Rewrite the vector file without deleted rows, under a new epoch."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._generation = None
+                self._refresh()
+                rows = self._conn.execute("SELECT row, id, document, metadata FROM rows ORDER BY row").fetchall()
+                epoch = self._epoch + 1
+                with open(self._vectors_path(epoch), "wb") as f:
+                    for start in range(0, len(rows), VECTOR_INDEX_BLOCK_ROWS):
+                        block = [row for row, _, _, _ in rows[start:start + VECTOR_INDEX_BLOCK_ROWS]]
+                        f.write(np.ascontiguousarray(self._matrix[block]).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._conn.execute("DELETE FROM rows")
+                # Readers reload everything on an epoch change, so the log starts over
+                self._conn.execute("DELETE FROM deletions")
+                self._conn.executemany(
+                    "INSERT INTO rows (row, id, document, metadata) VALUES (?, ?, ?, ?)",
+                    [(i, doc_id, document, metadata) for i, (_, doc_id, document, metadata) in enumerate(rows)]
+                )
+                self._set_info("epoch", epoch)
+                self._set_info("file_rows", len(rows))
+                self._set_info("generation", self._info("generation") + 1)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+            old_epoch = self._epoch
+            self._refresh()
+            for path in (self._vectors_path(old_epoch), os.path.join(self.path, f"ivf.{old_epoch}.npz")):
+                try:
+                    os.remove(path)
+                except OSError:
+                    # Still mapped by another process (Windows) or never written
+                    pass
+            logger.info(f"Compacted {self.name} to {len(rows)} rows")
+
+    def close(self) -> None:
+        with self._lock:
+            self._matrix = None
+            self._conn.close()
+
+
+class MmapIndexClient:
+    """
+    Minimal stand-in for a Chroma client over MmapCollection directories,
+    one per collection under ``root``.
+    """
+
+    def __init__(self, root: str = VECTOR_INDEX_DIR):
+        self.root = root
+        self._collections: Dict[str, MmapCollection] = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def get_or_create_collection(
+        self,
+        name: str,
+        embedding_function: Optional[Callable[[Sequence[str]], Any]] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> MmapCollection:
+        with self._lock:
+            collection = self._collections.get(name)
+            if collection is None:
+                collection = MmapCollection(os.path.join(self.root, name), name, embedding_function)
+                self._collections[name] = collection
+            return collection
+
+    def delete_collection(self, name: str) -> None:
+        with self._lock:
+            collection = self._collections.pop(name, None)
+            if collection is not None:
+                collection.close()
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
@@ -1,34 +1,103 @@
 from app.services.embedding import generate_embeddings
-from app.services.vector_store import get_chroma_collection, query_vector_store
-from app.services.llm_handler import query_llm
+from app.services.vector_store import get_chroma_collection, search_vector_store, search_vector_store_batch, retrieval_scope
+from app.services.llm_handler import query_llm, stream_llm, classify_query
+from app.services.themes import get_themes
+from app.services.context import pack_context
+from app.core.metrics import metrics
+from app.core.logging_config import RateLimitedLogger
 
+import time
 import logging
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Iterator, Optional
 from datetime import datetime
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+# Per-query messages, at most one per call site every HOT_PATH_LOG_INTERVAL seconds
+hot_logger = RateLimitedLogger(logger)
 
+# Packing retrieved chunks into the token budget, then formatting them for the prompt
+CONTEXT_SECONDS = metrics.histogram("context_assembly_seconds", "Time to assemble retrieved context for the prompt", ["step"])
 
-def retrieve_context(user_query: str, n_results: int = 5) -> Tuple[List[str], List[Dict[str, Any]]]:
-    """Retrieve relevant context from the vector store."""
+
+def retrieve_context(
+    user_query: str,
+    n_results: int = 5,
+    filters: Optional[Dict[str, Any]] = None
+) -> Tuple[List[str], List[Dict[str, Any]], List[Any]]:
+    """
+    Retrieve relevant context from the vector store (hybrid BM25 + dense by default, see RETRIEVAL_MODE).
+
+    Args:
+        filters: Optional user_id, document_names and page_range, applied
+            inside the vector store (see vector_store.retrieval_scope)
+
+    Returns:
+        Tuple: chunk texts, their metadata and their stored embeddings.
+    """
     try:
-        logger.info(f"Retrieving context for query: {user_query}")
-        results = query_vector_store(user_query, n_results)
+        logger.debug(f"Retrieving context for query: {user_query}")
+        collection_name, where = retrieval_scope(**(filters or {}))
+        results = search_vector_store(user_query, n_results, collection_name, where)
         
         # Extract text and metadata from results
         context_chunks = [result['text'] for result in results]
         sources = [result['metadata'] for result in results]
+        chunk_vectors = [result['embedding'] for result in results]
         
-        logger.info(f"Retrieved {len(context_chunks)} context chunks")
-        return context_chunks, sources
+        hot_logger.info(f"Retrieved {len(context_chunks)} context chunks")
+        return context_chunks, sources, chunk_vectors
         
     except Exception as e:
         logger.error(f"Error in retrieving context: {str(e)}", exc_info=True)
         raise
 
 
+def retrieve_theme_context(
+    user_query: str,
+    n_results: int = 5,
+    filters: Optional[Dict[str, Any]] = None
+) -> Tuple[List[str], List[Dict[str, Any]], Optional[List[Any]]]:
+    """
+    Context for theme queries: one chunk per precomputed theme of the collection.
+
+    Themes are maintained by the theme engine as the collection changes, so
+    this does no search. Themes cover the user's paragraphs of a collection;
+    filters that narrow it further (document set or pages) fall back to
+    regular retrieval. Theme summaries have no stored embeddings, so None
+    is returned in their place.
+    """
+    filters = filters or {}
+    if filters.get("document_names") or filters.get("page_range"):
+        return retrieve_context(user_query, n_results, filters)
+
+    collection_name, where = retrieval_scope(**filters)
+    themes = get_themes(collection_name, where)
+    context_chunks = [
+        f"Theme: {theme['label']} ({theme['size']} paragraphs across {len(theme['documents'])} documents)\n{theme['summary']}"
+        for theme in themes
+    ]
+    sources = [
+        theme["representatives"][0]["metadata"] if theme["representatives"] else {"filename": ", ".join(theme["documents"])}
+        for theme in themes
+    ]
+    hot_logger.info(f"Retrieved {len(themes)} precomputed themes from {collection_name}")
+    return context_chunks, sources, None
+
+
+def retrieve_answer_context(
+    user_query: str,
+    n_results: int,
+    filters: Optional[Dict[str, Any]]
+) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Retrieve context for the query type, then pack it into the prompt's token budget."""
+    if classify_query(user_query) == "THEME_SEARCH":
+        context_chunks, sources, chunk_vectors = retrieve_theme_context(user_query, n_results, filters)
+    else:
+        context_chunks, sources, chunk_vectors = retrieve_context(user_query, n_results, filters)
+    with CONTEXT_SECONDS.time(step="pack"):
+        return pack_context(user_query, context_chunks, sources, chunk_vectors)
+
+
 def format_sources(sources: list[tuple[str, str]]) -> str:
     """
     Create a formatted string of sources for citation display.
@@ -39,37 +108,171 @@ def format_sources(sources: list[tuple[str, str]]) -> str:
     return "Sources:\n" + "\n".join(citations)
 
 
-def answer_query_with_context(user_query: str, n_results: int = 5) -> Dict[str, Any]:
+def format_context(context_chunks: List[str], sources: List[Dict[str, Any]]) -> str:
+    """Number the retrieved chunks and attach their source for the LLM prompt."""
+    return "\n\n".join([
+        f"[{i+1}] {chunk}\nSource: {source['filename']}"
+        for i, (chunk, source) in enumerate(zip(context_chunks, sources))
+    ])
+
+
+def _build_answer(context_chunks: List[str], sources: List[Dict[str, Any]]) -> Dict[str, Any]:
+    if not context_chunks:
+        return {
+            "query_type": "error",
+            "answer": "No relevant context found to answer your query.",
+            "citations": [],
+            "processing_time": 0.0,
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    # Format context for LLM
+    with CONTEXT_SECONDS.time(step="format"):
+        formatted_context = format_context(context_chunks, sources)
+    
+    # TODO: Replace with actual LLM call
+    # For now, return a simple response
+    return {
+        "query_type": "theme_analysis",
+        "answer": f"Based on the provided context, here's what I found:\n\n{formatted_context}",
+        "citations": [f"Source: {source['filename']}" for source in sources],
+        "processing_time": 0.0,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+def answer_query_with_context(
+    user_query: str,
+    n_results: int = 5,
+    filters: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
     """Answer a query using the retrieved context."""
     try:
         # Retrieve relevant context
-        context_chunks, sources = retrieve_context(user_query, n_results)
+        context_chunks, sources = retrieve_answer_context(user_query, n_results, filters)
+        return _build_answer(context_chunks, sources)
         
+    except Exception as e:
+        logger.error(f"Error in answer_query_with_context: {str(e)}", exc_info=True)
+        raise
+
+
+def answer_queries_with_context(
+    user_queries: List[str],
+    n_results: int = 5,
+    filters: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Answer many queries with a single vector search.
+
+    Used for theme analysis, which runs a fixed set of questions against
+    the corpus. Retrieval uses the same mode as answer_query_with_context
+    (see RETRIEVAL_MODE). Returns one answer (with citations) per query,
+    in order.
+    """
+    try:
+        start_time = time.perf_counter()
+        collection_name, where = retrieval_scope(**(filters or {}))
+        batch_results = search_vector_store_batch(user_queries, n_results, collection_name, where)
+        hot_logger.info(f"Retrieved context for {len(user_queries)} queries in one search")
+
+        answers = []
+        for user_query, results in zip(user_queries, batch_results):
+            with CONTEXT_SECONDS.time(step="pack"):
+                packed = pack_context(
+                    user_query,
+                    [result['text'] for result in results],
+                    [result['metadata'] for result in results],
+                    [result['embedding'] for result in results]
+                )
+            answers.append(_build_answer(*packed))
+
+        # The search is shared, so each answer reports the per-query share of it
+        per_query_time = (time.perf_counter() - start_time) / max(1, len(user_queries))
+        for answer in answers:
+            answer["processing_time"] = per_query_time
+        return answers
+
+    except Exception as e:
+        logger.error(f"Error in answer_queries_with_context: {str(e)}", exc_info=True)
+        raise
+
+
+def stream_answer_with_context(
+    user_query: str,
+    n_results: int = 5,
+    filters: Optional[Dict[str, Any]] = None,
+    retrieved: Optional[Tuple[List[str], List[Dict[str, Any]]]] = None,
+    start_time: Optional[float] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming variant of answer_query_with_context.
+
+    Yields events in order: one "citations" event as soon as retrieval is
+    done, a "token" event per answer token from the LLM backend, then a
+    "done" event with timings. Errors are reported as an "error" event.
+
+    Args:
+        retrieved: Packed context from retrieve_answer_context when the
+            caller already ran retrieval (e.g. on the query executor)
+        start_time: perf_counter() at the start of the request, so the
+            reported timings include retrieval done by the caller
+    """
+    if start_time is None:
+        start_time = time.perf_counter()
+    try:
+        if retrieved is None:
+            retrieved = retrieve_answer_context(user_query, n_results, filters)
+        context_chunks, sources = retrieved
+        retrieval_time = time.perf_counter() - start_time
+
+        yield {
+            "event": "citations",
+            "data": {
+                "citations": [f"Source: {source['filename']}" for source in sources],
+                "sources": sources,
+                "retrieval_time": retrieval_time
+            }
+        }
+
         if not context_chunks:
-            return {
-                "query_type": "error",
-                "answer": "No relevant context found to answer your query.",
-                "citations": [],
-                "processing_time": 0.0,
+            yield {"event": "token", "data": {"text": "No relevant context found to answer your query."}}
+            yield {
+                "event": "done",
+                "data": {
+                    "query_type": "error",
+                    "retrieval_time": retrieval_time,
+                    "generation_time": 0.0,
+                    "processing_time": time.perf_counter() - start_time,
+                    "timestamp": datetime.now().isoformat()
+                }
+            }
+            return
+
+        with CONTEXT_SECONDS.time(step="format"):
+            formatted_context = format_context(context_chunks, sources)
+        generation_start = time.perf_counter()
+        first_token_time = None
+        tokens = 0
+        for token in stream_llm(user_query, formatted_context):
+            if first_token_time is None:
+                first_token_time = time.perf_counter() - start_time
+            tokens += 1
+            yield {"event": "token", "data": {"text": token}}
+
+        yield {
+            "event": "done",
+            "data": {
+                "query_type": classify_query(user_query),
+                "tokens": tokens,
+                "retrieval_time": retrieval_time,
+                "time_to_first_token": first_token_time,
+                "generation_time": time.perf_counter() - generation_start,
+                "processing_time": time.perf_counter() - start_time,
                 "timestamp": datetime.now().isoformat()
             }
-        
-        # Format context for LLM
-        formatted_context = "\n\n".join([
-            f"[{i+1}] {chunk}\nSource: {source['filename']}"
-            for i, (chunk, source) in enumerate(zip(context_chunks, sources))
-        ])
-        
-        # TODO: Replace with actual LLM call
-        # For now, return a simple response
-        return {
-            "query_type": "theme_analysis",
-            "answer": f"Based on the provided context, here's what I found:\n\n{formatted_context}",
-            "citations": [f"Source: {source['filename']}" for source in sources],
-            "processing_time": 0.0,
-            "timestamp": datetime.now().isoformat()
         }
-        
+
     except Exception as e:
-        logger.error(f"Error in answer_query_with_context: {str(e)}", exc_info=True)
-        raise
+        logger.error(f"Error in stream_answer_with_context: {str(e)}", exc_info=True)
+        yield {"event": "error", "data": {"detail": "Error generating answer"}}
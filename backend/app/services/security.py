@@ -4,8 +4,12 @@ from fastapi import HTTPException, Security
 from fastapi.security import APIKeyHeader
 from typing import Optional
 
+from app.core.logging_config import RateLimitedLogger
+
 # Configure logging
 logger = logging.getLogger(__name__)
+# Bad keys can arrive in floods; log a sample with the suppressed count
+hot_logger = RateLimitedLogger(logger)
 
 # Get API key from environment variable
 API_KEY = os.getenv("API_KEY", "development-key-123")
@@ -17,12 +21,14 @@ def verify_api_key(api_key: str = Security(API_KEY_HEADER)) -> str:
     """Verify the API key."""
     try:
         if api_key != API_KEY:
-            logger.warning(f"Invalid API key attempt: {api_key}")
+            hot_logger.warning("Invalid API key attempt")
             raise HTTPException(
                 status_code=401,
                 detail="Invalid API key"
             )
         return api_key
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error verifying API key: {str(e)}")
         raise HTTPException(
@@ -1,5 +1,7 @@
-from query_llm import answer_query_with_context
-from vector_store import add_to_vector_store
+# Run from the backend directory: python -m app.services.test_llm
+from app.ingestion.paragraphs import ParagraphBatch
+from app.services.query_llm import answer_query_with_context
+from app.services.vector_store import add_many
 
 # Add test documents about climate policy
 test_docs = [
@@ -9,12 +11,14 @@ test_docs = [
     "International cooperation is essential for effective climate action.",
     "Regular monitoring and reporting will ensure policy effectiveness."
 ]
-test_ids = [f"climate_policy_para{i+1}" for i in range(len(test_docs))]
+paragraphs = ParagraphBatch("climate_policy.pdf", "debug_user")
+for page, text in enumerate(test_docs, start=1):
+    paragraphs.append(text, page)
 
 # Add documents to vector store
-add_to_vector_store(test_docs, test_ids)
+add_many(paragraphs)
 
 # Now query the LLM
 response = answer_query_with_context("What are the key takeaways from the climate policy?")
 print(response["answer"])
-print(response["formatted_sources"])
+print("\n".join(response["citations"]))
@@ -0,0 +1,318 @@
+import os
+import re
+import json
+import logging
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.services.vector_store import get_chroma_collection, get_collection_count, get_collection_version
+from app.services.lexical_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Target number of themes per collection (fewer when there are fewer paragraphs)
+THEME_CLUSTERS = int(os.getenv("THEME_CLUSTERS", "8"))
+# Paragraphs per mini-batch k-means step
+THEME_BATCH_SIZE = int(os.getenv("THEME_BATCH_SIZE", "256"))
+# Passes over the data for a full fit; incremental updates make one pass over new rows
+THEME_FIT_EPOCHS = int(os.getenv("THEME_FIT_EPOCHS", "5"))
+# Paragraphs closest to each centroid kept as the theme's representatives
+THEME_REPRESENTATIVES = int(os.getenv("THEME_REPRESENTATIVES", "3"))
+# Page size when pulling embeddings out of the collection
+THEME_FETCH_BATCH_SIZE = 1000
+
+_STOPWORDS = {
+    "the", "and", "for", "are", "was", "were", "with", "that", "this", "from", "have", "has", "had",
+    "not", "but", "all", "any", "can", "may", "shall", "will", "such", "their", "there", "which",
+    "who", "whom", "been", "being", "into", "its", "our", "your", "they", "them", "these", "those",
+    "than", "then", "also", "other", "each", "per", "under", "upon", "where", "when", "what", "only",
+}
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def _first_sentence(text: str, limit: int = 200) -> str:
+    sentence = _SENTENCE_RE.split(text.strip(), maxsplit=1)[0]
+    return sentence if len(sentence) <= limit else sentence[:limit].rsplit(" ", 1)[0] + "..."
+
+
+class ThemeEngine:
+    """
+    Mini-batch k-means over a collection's stored embeddings.
+
+    ``where`` restricts the engine to matching rows (e.g. one user's
+    paragraphs in a shared collection), so themes never mix in text the
+    caller could not retrieve.
+    Embeddings are held as one float32 matrix (unit-normalized rows, so the
+    nearest centroid is an argmax of a matrix product). On refresh the
+    engine diffs the collection's IDs against the rows it holds: new rows
+    are fetched and folded into the centroids with one mini-batch pass,
+    removed rows are subtracted from their centroid's running mean. Only
+    themes whose membership changed get their representatives and summary
+    recomputed; everything else is served from cache.
+    """
+
+    def __init__(
+        self,
+        collection_name: str = "theme_docs",
+        where: Optional[Dict[str, Any]] = None,
+        n_clusters: int = THEME_CLUSTERS,
+        seed: int = 0
+    ):
+        self.collection_name = collection_name
+        self.where = where
+        self.n_clusters = n_clusters
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._documents: List[str] = []
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._centroids = np.zeros((0, 0), dtype=np.float32)
+        self._counts = np.zeros(0, dtype=np.float64)
+        self._assignments = np.zeros(0, dtype=np.int64)
+        self._themes: Dict[int, Dict[str, Any]] = {}
+        self._dirty: Set[int] = set()
+        self._version: Optional[int] = None
+        self._count: Optional[int] = None
+
+    def themes(self) -> List[Dict[str, Any]]:
+        """
+        Current themes, largest first.
+
+        Each theme has theme_id, label, keywords, size, documents,
+        representatives (id, text, metadata, similarity) and summary.
+        """
+        with self._lock:
+            self._refresh()
+            return sorted(self._themes.values(), key=lambda theme: theme["size"], reverse=True)
+
+    def _refresh(self) -> None:
+        version = get_collection_version(self.collection_name)
+        count = get_collection_count(self.collection_name)
+        if version == self._version and count == self._count:
+            return
+
+        collection = get_chroma_collection(self.collection_name)
+        stored = self._fetch(collection, include=[])["ids"]
+        stored_set = set(stored)
+        removed = [doc_id for doc_id in self._ids if doc_id not in stored_set]
+        added = [doc_id for doc_id in stored if doc_id not in self._rows]
+
+        if removed:
+            self._remove(removed)
+        if added:
+            embeddings, documents = self._fetch_embeddings(collection, added)
+            self._add(added, embeddings, documents)
+        if removed or added:
+            self._build_themes(collection)
+            logger.info(
+                f"Themes for {self.collection_name}: +{len(added)} -{len(removed)} paragraphs, "
+                f"{len(self._centroids)} clusters, {len(self._dirty)} summaries refreshed"
+            )
+        self._dirty.clear()
+        self._version = version
+        self._count = count
+
+    def _fetch(self, collection, include: List[str], ids: Optional[List[str]] = None) -> Dict[str, List[Any]]:
+        out: Dict[str, List[Any]] = {"ids": [], **{field: [] for field in include}}
+        if ids is None:
+            offset = 0
+            while True:
+                page = collection.get(where=self.where, include=include, limit=THEME_FETCH_BATCH_SIZE, offset=offset)
+                for field in out:
+                    out[field].extend(page[field])
+                if len(page["ids"]) < THEME_FETCH_BATCH_SIZE:
+                    return out
+                offset += THEME_FETCH_BATCH_SIZE
+        for start in range(0, len(ids), THEME_FETCH_BATCH_SIZE):
+            page = collection.get(ids=ids[start:start + THEME_FETCH_BATCH_SIZE], include=include)
+            for field in out:
+                out[field].extend(page[field])
+        return out
+
+    def _fetch_embeddings(self, collection, ids: List[str]):
+        """Unit-normalized float32 embeddings and document names of ``ids``, in order."""
+        fetched = self._fetch(collection, include=["embeddings", "metadatas"], ids=ids)
+        # get() does not promise input order
+        position = {doc_id: i for i, doc_id in enumerate(fetched["ids"])}
+        order = [position[doc_id] for doc_id in ids]
+        matrix = np.asarray(fetched["embeddings"], dtype=np.float32)[order]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.maximum(norms, 1e-12, out=norms)
+        documents = [(fetched["metadatas"][i] or {}).get("filename", "") for i in order]
+        return np.ascontiguousarray(matrix / norms), documents
+
+    def _add(self, ids: List[str], embeddings: np.ndarray, documents: List[str]) -> None:
+        start = len(self._ids)
+        self._ids.extend(ids)
+        self._documents.extend(documents)
+        self._rows.update({doc_id: start + i for i, doc_id in enumerate(ids)})
+        self._matrix = embeddings if start == 0 else np.concatenate([self._matrix, embeddings])
+
+        target = min(self.n_clusters, len(self._ids))
+        if len(self._centroids) < target:
+            # Too few clusters so far (small or empty corpus): refit from scratch
+            self._fit(target)
+            return
+
+        old = self._assignments
+        self._partial_fit(self._matrix[start:])
+        self._reassign(old)
+
+    def _remove(self, ids: List[str]) -> None:
+        rows = np.array([self._rows[doc_id] for doc_id in ids], dtype=np.int64)
+        if len(self._centroids):
+            clusters = self._assignments[rows]
+            sums = np.zeros_like(self._centroids)
+            np.add.at(sums, clusters, self._matrix[rows])
+            removed = np.bincount(clusters, minlength=len(self._centroids)).astype(np.float64)
+            remaining = self._counts - removed
+            alive = remaining > 0
+            # Running mean with the removed rows taken back out
+            self._centroids[alive] = (
+                (self._centroids[alive] * self._counts[alive, None] - sums[alive]) / remaining[alive, None]
+            ).astype(np.float32)
+            self._counts = np.maximum(remaining, 0)
+            self._dirty.update(int(c) for c in np.unique(clusters))
+
+        keep = np.ones(len(self._ids), dtype=bool)
+        keep[rows] = False
+        self._matrix = np.ascontiguousarray(self._matrix[keep])
+        self._ids = [doc_id for doc_id, kept in zip(self._ids, keep) if kept]
+        self._documents = [name for name, kept in zip(self._documents, keep) if kept]
+        self._rows = {doc_id: i for i, doc_id in enumerate(self._ids)}
+        if len(self._assignments):
+            self._assignments = self._assignments[keep]
+
+        if not self._ids:
+            self._centroids = np.zeros((0, 0), dtype=np.float32)
+            self._counts = np.zeros(0, dtype=np.float64)
+            self._themes.clear()
+        elif (self._counts == 0).any():
+            # A theme lost all its paragraphs; refit so the cluster count holds
+            self._fit(min(self.n_clusters, len(self._ids)))
+
+    def _fit(self, k: int) -> None:
+        """Full fit: k-means++ seeding, then THEME_FIT_EPOCHS mini-batch passes."""
+        n = len(self._ids)
+        centroids = np.empty((k, self._matrix.shape[1]), dtype=np.float32)
+        centroids[0] = self._matrix[self._rng.integers(n)]
+        closest = 1.0 - self._matrix @ centroids[0]
+        for i in range(1, k):
+            weights = np.maximum(closest, 0)
+            total = weights.sum()
+            pick = self._rng.choice(n, p=weights / total) if total > 0 else self._rng.integers(n)
+            centroids[i] = self._matrix[pick]
+            np.minimum(closest, 1.0 - self._matrix @ centroids[i], out=closest)
+
+        self._centroids = centroids
+        self._counts = np.zeros(k, dtype=np.float64)
+        for _ in range(THEME_FIT_EPOCHS):
+            self._partial_fit(self._matrix[self._rng.permutation(n)])
+        self._reassign(None)
+
+    def _partial_fit(self, rows: np.ndarray) -> None:
+        """Mini-batch k-means step (per-center learning rate 1 / count) over ``rows``."""
+        for start in range(0, len(rows), THEME_BATCH_SIZE):
+            batch = rows[start:start + THEME_BATCH_SIZE]
+            nearest = np.argmax(batch @ self._centroids.T, axis=1)
+            sums = np.zeros_like(self._centroids)
+            np.add.at(sums, nearest, batch)
+            hits = np.bincount(nearest, minlength=len(self._centroids)).astype(np.float64)
+            self._counts += hits
+            moved = hits > 0
+            self._centroids[moved] += (
+                (sums[moved] - hits[moved, None] * self._centroids[moved]) / self._counts[moved, None]
+            ).astype(np.float32)
+
+    def _reassign(self, old: Optional[np.ndarray]) -> None:
+        """Assign every row to its nearest centroid and mark themes whose membership changed."""
+        self._assignments = np.argmax(self._matrix @ self._centroids.T, axis=1)
+        self._counts = np.bincount(self._assignments, minlength=len(self._centroids)).astype(np.float64)
+        if old is None or len(old) == 0:
+            self._themes.clear()
+            self._dirty.update(range(len(self._centroids)))
+            return
+        changed = self._assignments[:len(old)] != old
+        self._dirty.update(int(c) for c in np.unique(self._assignments[:len(old)][changed]))
+        self._dirty.update(int(c) for c in np.unique(old[changed]))
+        self._dirty.update(int(c) for c in np.unique(self._assignments[len(old):]))
+
+    def _build_themes(self, collection) -> None:
+        for cluster in sorted(self._dirty):
+            members = np.flatnonzero(self._assignments == cluster)
+            if len(members) == 0:
+                self._themes.pop(cluster, None)
+                continue
+
+            similarity = self._matrix[members] @ self._centroids[cluster] / max(
+                float(np.linalg.norm(self._centroids[cluster])), 1e-12
+            )
+            # Keywords come from a wider sample than the representatives shown
+            order = np.argsort(-similarity)[:max(THEME_REPRESENTATIVES, 20)]
+            top, top_similarity = members[order], similarity[order]
+            fetched = self._fetch(collection, include=["documents", "metadatas"], ids=[self._ids[i] for i in top])
+            by_id = {
+                doc_id: (text, metadata)
+                for doc_id, text, metadata in zip(fetched["ids"], fetched["documents"], fetched["metadatas"])
+            }
+
+            terms = Counter(
+                term
+                for doc_id in by_id
+                for term in tokenize(by_id[doc_id][0])
+                if len(term) > 2 and term not in _STOPWORDS and not term.isdigit()
+            )
+            keywords = [term for term, _ in terms.most_common(5)]
+            representatives = []
+            for rank, row in enumerate(top[:THEME_REPRESENTATIVES]):
+                doc_id = self._ids[row]
+                if doc_id not in by_id:
+                    continue
+                text, metadata = by_id[doc_id]
+                representatives.append({
+                    "id": doc_id,
+                    "text": text,
+                    "metadata": metadata,
+                    "similarity": float(top_similarity[rank]),
+                })
+
+            documents = sorted({self._documents[i] for i in members})
+            self._themes[cluster] = {
+                "theme_id": cluster,
+                "label": ", ".join(keywords[:3]) or f"Theme {cluster + 1}",
+                "keywords": keywords,
+                "size": int(len(members)),
+                "documents": documents,
+                "representatives": representatives,
+                "summary": " ".join(_first_sentence(rep["text"]) for rep in representatives),
+            }
+
+
+_engines: Dict[Tuple[str, Optional[str]], ThemeEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_theme_engine(collection_name: str = "theme_docs", where: Optional[Dict[str, Any]] = None) -> ThemeEngine:
+    """Process-wide theme engine for a collection, one per ``where`` filter."""
+    key = (collection_name, json.dumps(where, sort_keys=True) if where else None)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = ThemeEngine(collection_name, where)
+            _engines[key] = engine
+        return engine
+
+
+def get_themes(collection_name: str = "theme_docs", where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Cached themes of a collection, refreshed incrementally if it changed since the last call.
+
+    Pass the ``where`` clause of the caller's retrieval scope (see
+    vector_store.retrieval_scope) so a shared collection only yields the
+    caller's paragraphs.
+    """
+    return get_theme_engine(collection_name, where).themes()
@@ -1,68 +1,408 @@
 import os
+import re
+import json
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional
-import chromadb
-from chromadb.config import Settings
-from chromadb.utils import embedding_functions
-import time
+import threading
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import numpy as np
+
+from app.core.resources import registry
+from app.core.metrics import metrics
+from app.services.embedding import get_embedding_engine, embed_query, embed_queries, normalize_query
+from app.services.cache import LRUCache
+from app.services.lexical_index import BM25Index, get_lexical_index, reciprocal_rank_fusion
+from app.services.catalog import get_catalog
+from app.ingestion.paragraphs import ParagraphBatch
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Index time only; query embedding and BM25 scoring are timed separately
+VECTOR_STORE_SECONDS = metrics.histogram("vector_store_seconds", "Vector store operation duration", ["operation"])
+
 # Configure ChromaDB client
 CHROMA_DB_DIR = ".chroma"
-os.makedirs(CHROMA_DB_DIR, exist_ok=True)
-
-# Initialize ChromaDB client
-client = chromadb.Client(
-    Settings(
-        persist_directory=CHROMA_DB_DIR,
-        anonymized_telemetry=False,
-        allow_reset=True
-    )
-)
 
-# Initialize embedding function
-try:
-    embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-        model_name="all-MiniLM-L6-v2",
-        device="cpu"
+# "chroma" (default) or "mmap" for the shared memory-mapped index; more via register_index_backend
+VECTOR_INDEX_BACKEND = os.getenv("VECTOR_INDEX_BACKEND", "chroma")
+
+def _create_chroma_client():
+    # chromadb is imported here so importing this module stays cheap
+    import chromadb
+    from chromadb.config import Settings
+
+    os.makedirs(CHROMA_DB_DIR, exist_ok=True)
+    return chromadb.Client(
+        Settings(
+            persist_directory=CHROMA_DB_DIR,
+            anonymized_telemetry=False,
+            allow_reset=True
+        )
     )
-except Exception as e:
-    logger.error(f"Error initializing embedding function: {str(e)}")
-    embedding_function = None
 
-def get_chroma_collection(collection_name: str = "theme_docs"):
-    """Get or create a ChromaDB collection."""
+def _create_mmap_client():
+    from app.services.mmap_index import MmapIndexClient
+    return MmapIndexClient()
+
+INDEX_BACKENDS: Dict[str, Any] = {
+    "chroma": _create_chroma_client,
+    "mmap": _create_mmap_client,
+}
+
+def register_index_backend(name: str, factory) -> None:
+    """
+    Makes an index backend selectable via VECTOR_INDEX_BACKEND.
+
+    The factory returns a client with get_or_create_collection and
+    delete_collection; its collections implement the Chroma methods used
+    here (add, get, query, update, delete, count).
+    """
+    INDEX_BACKENDS[name] = factory
+
+def _create_client():
+    if VECTOR_INDEX_BACKEND not in INDEX_BACKENDS:
+        raise ValueError(f"Unknown vector index backend: {VECTOR_INDEX_BACKEND}")
+    return INDEX_BACKENDS[VECTOR_INDEX_BACKEND]()
+
+class EngineEmbeddingFunction:
+    """
+    Chroma embedding function backed by the shared EmbeddingEngine, so
+    ingestion, Chroma-side embedding and queries all use the same model.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        return self.engine.embed(list(input)).tolist()
+
+def _create_embedding_function():
     try:
-        # Try to get existing collection
-        collection = client.get_collection(
-            name=collection_name,
-            embedding_function=embedding_function
-        )
-        logger.info(f"Retrieved existing collection: {collection_name}")
-        return collection
+        engine = get_embedding_engine()
+        # Embed once so the model is actually loaded by warmup
+        engine.embed(["warmup"])
+        return EngineEmbeddingFunction(engine)
     except Exception as e:
-        # If collection doesn't exist or has issues, create new one
+        logger.error(f"Error initializing embedding function: {str(e)}")
+        return None
+
+registry.register("chroma_client", _create_client)
+registry.register("embedding_function", _create_embedding_function)
+
+def get_client():
+    """Return the process-wide vector index client (ChromaDB unless VECTOR_INDEX_BACKEND says otherwise)."""
+    return registry.get("chroma_client")
+
+def get_embedding_function():
+    """Return the Chroma embedding function (None if the embedding model failed to load)."""
+    return registry.get("embedding_function")
+
+# Default number of paragraphs embedded and written per collection.add call
+ADD_BATCH_SIZE = int(os.getenv("VECTOR_STORE_ADD_BATCH_SIZE", "256"))
+
+# Bounded cache of formatted query results, see query_vector_store
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "512"))
+retrieval_cache = LRUCache(maxsize=RETRIEVAL_CACHE_SIZE)
+
+# "hybrid" fuses BM25 and dense rankings, "dense" or "lexical" use one of them
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+# Candidates taken from each ranking per requested result before fusion
+HYBRID_CANDIDATE_FACTOR = int(os.getenv("HYBRID_CANDIDATE_FACTOR", "2"))
+# Page size used when rebuilding the lexical index from a collection
+LEXICAL_REBUILD_BATCH_SIZE = 1000
+
+# Give each user their own collection instead of sharing DEFAULT_COLLECTION
+COLLECTION_PER_TENANT = os.getenv("COLLECTION_PER_TENANT", "false").lower() in ("1", "true", "yes")
+DEFAULT_COLLECTION = "theme_docs"
+# Characters of the sanitized user ID kept in a tenant collection name (at most 48 characters in all)
+_TENANT_NAME_CHARS = 24
+
+# Paragraph fields that are not stored as Chroma metadata
+_NON_METADATA_FIELDS = {"text", "paragraph_id"}
+
+# Process-wide collection handles and document counts, keyed by collection name
+_collections: Dict[str, Any] = {}
+_collection_counts: Dict[str, int] = {}
+_collections_lock = threading.Lock()
+
+# Bumped on every write through this module; cached query results are tagged with it
+_collection_versions: Dict[str, int] = {}
+
+# Per-collection locks for lexical index writes and rebuilds, so a rebuild never holds _collections_lock
+_lexical_locks: Dict[str, threading.Lock] = {}
+
+def collection_for(user_id: Optional[str] = None) -> str:
+    """
+    Collection holding a user's paragraphs.
+
+    With COLLECTION_PER_TENANT each user gets ``theme_docs_<user>_<hash>``
+    so search cost scales with their corpus alone; otherwise everyone
+    shares DEFAULT_COLLECTION and is separated by ``user_id`` filters.
+    """
+    if not COLLECTION_PER_TENANT or not user_id:
+        return DEFAULT_COLLECTION
+    # Chroma names allow [a-zA-Z0-9._-], 3-63 characters, and must start and end
+    # alphanumeric. The user part is sanitized and clamped for readability; the
+    # hash suffix keeps names unique and always ends them with a hex digit.
+    tenant = re.sub(r"[^a-zA-Z0-9_-]", "_", user_id)[:_TENANT_NAME_CHARS]
+    digest = hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:12]
+    return f"{DEFAULT_COLLECTION}_{tenant}_{digest}"
+
+def build_where(
+    user_id: Optional[str] = None,
+    document_names: Optional[Sequence[str]] = None,
+    page_range: Optional[Tuple[Optional[int], Optional[int]]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Build a Chroma ``where`` clause from retrieval filters.
+
+    Args:
+        user_id: Only paragraphs owned by this user
+        document_names: Only paragraphs from these documents
+        page_range: Inclusive (first, last) page bounds; either may be None
+
+    Returns:
+        Optional[Dict]: The clause, or None when no filter is set.
+    """
+    clauses: List[Dict[str, Any]] = []
+    if user_id:
+        clauses.append({"user_id": user_id})
+    if document_names:
+        names = list(document_names)
+        clauses.append({"document_name": names[0]} if len(names) == 1 else {"document_name": {"$in": names}})
+    if page_range:
+        first, last = page_range
+        if first is not None:
+            clauses.append({"page": {"$gte": first}})
+        if last is not None:
+            clauses.append({"page": {"$lte": last}})
+
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+def retrieval_scope(
+    user_id: Optional[str] = None,
+    document_names: Optional[Sequence[str]] = None,
+    page_range: Optional[Tuple[Optional[int], Optional[int]]] = None
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Collection and ``where`` clause for a filtered query.
+
+    When collections are sharded per tenant the user's own collection is
+    searched and the user filter is left out, since every row matches it.
+    """
+    collection_name = collection_for(user_id)
+    if collection_name != DEFAULT_COLLECTION:
+        user_id = None
+    return collection_name, build_where(user_id, document_names, page_range)
+
+def get_chroma_collection(collection_name: str = "theme_docs"):
+    """
+    Get or create a ChromaDB collection.
+
+    Handles are cached per collection name, so the hot path is a dict
+    lookup. A missing collection is created with get_or_create_collection;
+    existing data is never dropped here.
+    """
+    collection = _collections.get(collection_name)
+    if collection is not None:
+        return collection
+
+    with _collections_lock:
+        collection = _collections.get(collection_name)
+        if collection is not None:
+            return collection
         try:
-            # Delete existing collection if it exists
-            try:
-                client.delete_collection(collection_name)
-                logger.info(f"Deleted existing collection: {collection_name}")
-            except:
-                pass
-            
-            # Create new collection
-            collection = client.create_collection(
+            collection = get_client().get_or_create_collection(
                 name=collection_name,
-                embedding_function=embedding_function
+                embedding_function=get_embedding_function()
             )
-            logger.info(f"Created new collection: {collection_name}")
-            return collection
+            _collection_counts[collection_name] = collection.count()
+            _collections[collection_name] = collection
+            logger.info(f"Opened collection {collection_name} with {_collection_counts[collection_name]} documents")
         except Exception as e:
-            logger.error(f"Error creating collection: {str(e)}")
+            logger.error(f"Error opening collection {collection_name}: {str(e)}")
             raise
 
+    # Outside _collections_lock: a rebuild only holds up users of this collection's lexical index
+    _sync_lexical_index(collection, collection_name)
+    return collection
+
+def _lexical_lock(collection_name: str) -> threading.Lock:
+    lock = _lexical_locks.get(collection_name)
+    if lock is None:
+        with _collections_lock:
+            lock = _lexical_locks.setdefault(collection_name, threading.Lock())
+    return lock
+
+def _sync_lexical_index(collection, collection_name: str) -> None:
+    """
+    Rebuild the collection's BM25 index from stored paragraphs unless it
+    reflects the collection's current write version.
+
+    The version lives in the catalog and is bumped by every write from any
+    process, so an index that is missing, was saved by an older version or
+    has fallen behind another worker's writes is rebuilt; this process's
+    own writes keep the index current (see _record_write). The rebuild
+    fills a fresh index and swaps it in, so searches keep using the old
+    one until it is done.
+    """
+    index = get_lexical_index(collection_name)
+    catalog = get_catalog()
+    if index.collection_version == catalog.collection_version(collection_name):
+        return
+
+    with _lexical_lock(collection_name):
+        # Read before paging, so writes landing during the rebuild leave the index marked stale
+        version = catalog.collection_version(collection_name)
+        if index.collection_version == version:
+            return
+        count = collection.count()
+        logger.info(
+            f"Rebuilding lexical index for {collection_name}: index at version "
+            f"{index.collection_version}, collection at {version} with {count} documents"
+        )
+        rebuilt = BM25Index()
+        for offset in range(0, count, LEXICAL_REBUILD_BATCH_SIZE):
+            page = collection.get(include=["documents"], limit=LEXICAL_REBUILD_BATCH_SIZE, offset=offset)
+            rebuilt.add_many(page["ids"], page["documents"])
+        index.replace(rebuilt)
+        index.set_collection_version(version)
+        index.save()
+
+    # The collection changed outside this process: refresh its count and retire cached results
+    with _collections_lock:
+        if collection_name in _collection_counts:
+            _collection_counts[collection_name] = count
+        _collection_versions[collection_name] = _collection_versions.get(collection_name, 0) + 1
+
+def _record_write(collection_name: str) -> None:
+    """
+    Bump the collection's shared write version after a write through this
+    module. The local BM25 index moves along with it when it was current
+    before the write; otherwise another process wrote in between and the
+    index stays marked stale. Called with the collection's lexical lock held.
+    """
+    version = get_catalog().bump_collection_version(collection_name)
+    index = get_lexical_index(collection_name)
+    if index.collection_version == version - 1:
+        index.set_collection_version(version)
+
+def invalidate_collection(collection_name: Optional[str] = None) -> None:
+    """
+    Drop cached collection handles (all of them when no name is given).
+
+    The next get_chroma_collection call reopens the collection and re-reads
+    its count. Called after failed operations and whenever a collection is
+    deleted or reset outside this module.
+    """
+    with _collections_lock:
+        if collection_name is None:
+            _collections.clear()
+            _collection_counts.clear()
+            for name in _collection_versions:
+                _collection_versions[name] += 1
+        else:
+            _collections.pop(collection_name, None)
+            _collection_counts.pop(collection_name, None)
+            _collection_versions[collection_name] = _collection_versions.get(collection_name, 0) + 1
+
+def get_collection_count(collection_name: str = "theme_docs") -> int:
+    """Number of documents in the collection, kept current by writes through this module."""
+    get_chroma_collection(collection_name)
+    return _collection_counts.get(collection_name, 0)
+
+def get_collection_stats() -> Dict[str, Dict[str, Any]]:
+    """Document counts of every collection opened by this process."""
+    with _collections_lock:
+        return {name: {"documents": count} for name, count in _collection_counts.items()}
+
+def get_collection_version(collection_name: str = "theme_docs") -> int:
+    """Write version of the collection in this process; changes after every add or delete."""
+    return _collection_versions.get(collection_name, 0)
+
+def _adjust_count(collection_name: str, delta: int) -> None:
+    with _collections_lock:
+        _collection_versions[collection_name] = _collection_versions.get(collection_name, 0) + 1
+        if collection_name in _collection_counts:
+            _collection_counts[collection_name] = max(0, _collection_counts[collection_name] + delta)
+
+def _existing_ids(collection, ids: List[str]) -> set:
+    return set(collection.get(ids=ids, include=[])["ids"])
+
+def _add_new(
+    collection,
+    collection_name: str,
+    ids: List[str],
+    documents: List[str],
+    metadatas: List[Dict[str, Any]],
+    embeddings: Optional[Any] = None
+) -> int:
+    """
+    Add only the IDs not already stored, keeping re-ingestion idempotent
+    and the cached document count exact. Returns the number added.
+    """
+    existing = _existing_ids(collection, ids)
+    if existing:
+        keep = [i for i, doc_id in enumerate(ids) if doc_id not in existing]
+        ids = [ids[i] for i in keep]
+        documents = [documents[i] for i in keep]
+        metadatas = [metadatas[i] for i in keep]
+        if embeddings is not None:
+            embeddings = [embeddings[i] for i in keep]
+    if not ids:
+        return 0
+    if embeddings is not None:
+        embeddings = np.asarray(embeddings, dtype=np.float32).tolist()
+
+    with VECTOR_STORE_SECONDS.time(operation="add"):
+        collection.add(
+            documents=documents,
+            metadatas=metadatas,
+            ids=ids,
+            embeddings=embeddings
+        )
+    with _lexical_lock(collection_name):
+        with VECTOR_STORE_SECONDS.time(operation="lexical_add"):
+            get_lexical_index(collection_name).add_many(ids, documents)
+        _record_write(collection_name)
+    _adjust_count(collection_name, len(ids))
+    return len(ids)
+
+def make_chunk_id(
+    document_name: str,
+    page: Any,
+    ordinal: int,
+    text: str,
+    user_id: str = ""
+) -> str:
+    """
+    Build a stable chunk ID from the document, page, paragraph position and content.
+
+    The same paragraph of the same document always maps to the same ID, so
+    re-ingesting a file is idempotent and chunks written in the same second
+    no longer collide.
+    """
+    key = "\x1f".join([str(user_id or ""), str(document_name or ""), str(page), str(ordinal), text])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+def content_hash(text: str) -> str:
+    """Hash of a paragraph's text alone, used to find paragraphs that moved between ingestions."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+def _paragraph_metadata(paragraph: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a parsed paragraph dict into Chroma-compatible metadata."""
+    metadata = {
+        key: value
+        for key, value in paragraph.items()
+        if key not in _NON_METADATA_FIELDS and value is not None
+    }
+    # answer_query_with_context cites sources by filename
+    metadata.setdefault("filename", paragraph.get("document_name", ""))
+    return metadata
+
 def add_to_vector_store(
     text: str,
     metadata: Dict[str, str],
@@ -72,31 +412,455 @@ def add_to_vector_store(
     try:
         collection = get_chroma_collection(collection_name)
         
-        # Generate a unique ID for the document
-        doc_id = f"{metadata.get('filename', '')}_{int(time.time())}"
+        # Generate a stable ID for the document
+        doc_id = make_chunk_id(
+            metadata.get("filename", ""),
+            metadata.get("page", 0),
+            0,
+            text
+        )
         
         # Add document to collection
-        collection.add(
-            documents=[text],
-            metadatas=[metadata],
-            ids=[doc_id]
+        _add_new(collection, collection_name, [doc_id], [text], [metadata])
+        get_catalog().add_chunks(
+            collection_name,
+            metadata.get("user_id", ""),
+            metadata.get("filename", ""),
+            [doc_id],
+            [content_hash(text)]
         )
-        logger.info(f"Added document to collection: {doc_id}")
+        logger.debug(f"Added document to collection: {doc_id}")
     except Exception as e:
+        invalidate_collection(collection_name)
         logger.error(f"Error adding to vector store: {str(e)}")
         raise
 
+def embed_texts(texts: List[str], batch_size: Optional[int] = None) -> Optional[np.ndarray]:
+    """
+    Embed texts with the shared embedding engine.
+
+    Returns a float32 matrix, or None when no embedding function could be
+    loaded, in which case Chroma embeds on write.
+    """
+    embedding_function = get_embedding_function()
+    if embedding_function is None:
+        return None
+    return embedding_function.engine.embed(texts, batch_size)
+
+def _batch_rows(batch: ParagraphBatch):
+    """IDs, texts and metadata of a ParagraphBatch; the texts list is used as is."""
+    ids: List[str] = []
+    ordinals: Dict[int, int] = {}
+    for text, page in zip(batch.texts, batch.pages):
+        ordinal = ordinals.get(page, 0)
+        ordinals[page] = ordinal + 1
+        ids.append(make_chunk_id(batch.document_name, page, ordinal, text, batch.user_id))
+    metadatas = [batch.metadata(i) for i in range(len(batch))]
+    return ids, batch.texts, metadatas
+
+def _dict_rows(paragraphs: List[Dict[str, Any]], embeddings: Optional[Any]):
+    """IDs, texts, metadata and aligned embeddings of paragraph dicts, skipping empty text."""
+    texts: List[str] = []
+    metadatas: List[Dict[str, Any]] = []
+    ids: List[str] = []
+    vectors: List[Any] = []
+    ordinals: Dict[tuple, int] = {}
+
+    for position, paragraph in enumerate(paragraphs):
+        text = (paragraph.get("text") or "").strip()
+        if not text:
+            continue
+        if embeddings is not None:
+            vectors.append(embeddings[position])
+        page = paragraph.get("page", 0)
+        key = (paragraph.get("user_id"), paragraph.get("document_name"), page)
+        ordinal = ordinals.get(key, 0)
+        ordinals[key] = ordinal + 1
+
+        ids.append(make_chunk_id(
+            paragraph.get("document_name", ""),
+            page,
+            ordinal,
+            text,
+            paragraph.get("user_id", "")
+        ))
+        texts.append(text)
+        metadatas.append(_paragraph_metadata(paragraph))
+    return ids, texts, metadatas, vectors if embeddings is not None else None
+
+def add_many(
+    paragraphs: Any,
+    collection_name: str = "theme_docs",
+    batch_size: int = ADD_BATCH_SIZE,
+    embeddings: Optional[Any] = None
+) -> List[str]:
+    """
+    Bulk-insert parsed paragraphs into the vector store.
+
+    Paragraphs are embedded and written in batches of ``batch_size``, so a
+    whole upload takes a handful of collection.add calls instead of one per
+    paragraph.
+
+    Args:
+        paragraphs: A ParagraphBatch as produced by ingestion.manager.process_file,
+            or a list of paragraph dicts
+        collection_name: Target collection
+        batch_size: Number of paragraphs embedded and written per call
+        embeddings: Precomputed embeddings (list of vectors or float32
+            matrix) aligned with ``paragraphs``, e.g. from the ingestion
+            cache; skips embedding when given
+
+    Returns:
+        List[str]: The chunk IDs written, in input order.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    if embeddings is not None and len(embeddings) != len(paragraphs):
+        raise ValueError("embeddings must align with paragraphs")
+
+    if isinstance(paragraphs, ParagraphBatch):
+        # Batches hold no empty paragraphs, so embeddings already line up
+        ids, texts, metadatas = _batch_rows(paragraphs)
+        vectors = embeddings
+    else:
+        ids, texts, metadatas, vectors = _dict_rows(paragraphs, embeddings)
+
+    if not ids:
+        return []
+
+    try:
+        _write_rows(collection_name, ids, texts, metadatas, vectors, batch_size)
+        _catalog_rows(collection_name, ids, texts, metadatas)
+        logger.info(f"Added {len(ids)} paragraphs to collection {collection_name} in {(len(ids) + batch_size - 1) // batch_size} batches")
+        return ids
+    except Exception as e:
+        invalidate_collection(collection_name)
+        logger.error(f"Error bulk adding to vector store: {str(e)}")
+        raise
+
+def _write_rows(
+    collection_name: str,
+    ids: List[str],
+    texts: List[str],
+    metadatas: List[Dict[str, Any]],
+    vectors: Optional[Any],
+    batch_size: int
+) -> None:
+    """Embed (unless ``vectors`` is given) and add rows ``batch_size`` at a time."""
+    collection = get_chroma_collection(collection_name)
+    for start in range(0, len(ids), batch_size):
+        end = start + batch_size
+        batch_texts = texts[start:end]
+        if vectors is not None:
+            batch_embeddings = vectors[start:end]
+        else:
+            batch_embeddings = embed_texts(batch_texts, batch_size)
+        _add_new(
+            collection,
+            collection_name,
+            ids[start:end],
+            batch_texts,
+            metadatas[start:end],
+            batch_embeddings
+        )
+
+def _catalog_rows(collection_name: str, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]) -> None:
+    """Record added chunks in the document catalog, grouped by owning document."""
+    documents: Dict[tuple, Dict[str, Any]] = {}
+    for chunk_id, text, metadata in zip(ids, texts, metadatas):
+        key = (metadata.get("user_id", ""), metadata.get("document_name", ""))
+        document = documents.setdefault(key, {"chunk_ids": [], "hashes": [], "page_count": None})
+        document["chunk_ids"].append(chunk_id)
+        document["hashes"].append(content_hash(text))
+        page = metadata.get("page")
+        if isinstance(page, int) and page > (document["page_count"] or 0):
+            document["page_count"] = page
+    catalog = get_catalog()
+    for (user_id, document_name), document in documents.items():
+        catalog.add_chunks(collection_name, user_id, document_name, **document)
+
+def _stored_chunks(collection, document_name: str, user_id: str) -> Dict[str, str]:
+    """
+    Chunk ID -> content hash of a document, read from the collection.
+
+    Used for documents indexed before the catalog existed; costs one
+    filtered get instead of a catalog lookup.
+    """
+    found = collection.get(
+        where={"$and": [{"document_name": document_name}, {"user_id": user_id}]},
+        include=["documents"]
+    )
+    return {chunk_id: content_hash(text or "") for chunk_id, text in zip(found["ids"], found["documents"])}
+
+def _document_chunks(collection_name: str, document_name: str, user_id: str) -> Dict[str, str]:
+    catalog = get_catalog()
+    if catalog.has_document(collection_name, user_id, document_name):
+        return catalog.chunks(collection_name, user_id, document_name)
+    return _stored_chunks(get_chroma_collection(collection_name), document_name, user_id)
+
+def _reusable_embeddings(collection, previous: Dict[str, str], wanted: set) -> Dict[str, Any]:
+    """Stored embeddings of previous chunks whose text hash is in ``wanted``, keyed by hash."""
+    by_hash = {}
+    for chunk_id, h in previous.items():
+        if h in wanted:
+            by_hash.setdefault(h, chunk_id)
+    if not by_hash:
+        return {}
+    found = collection.get(ids=list(by_hash.values()), include=["embeddings"])
+    hash_of = {chunk_id: h for h, chunk_id in by_hash.items()}
+    return {hash_of[chunk_id]: vector for chunk_id, vector in zip(found["ids"], found["embeddings"])}
+
+def _match_previous(ids: List[str], hashes: List[str], previous: Dict[str, str]) -> Tuple[List[int], List[int]]:
+    """
+    Give paragraphs whose text the document already had the ID of a stored chunk.
+
+    Diffs on (content hash, occurrence): the k-th paragraph with a given text
+    takes the k-th previous chunk with that text, in document order, so
+    inserting or moving paragraphs keeps the IDs of unchanged text. ``ids``
+    is updated in place; returns the kept and the new positions.
+    """
+    by_hash: Dict[str, List[str]] = {}
+    for chunk_id, h in previous.items():
+        by_hash.setdefault(h, []).append(chunk_id)
+
+    kept, new_positions = [], []
+    occurrences: Dict[str, int] = {}
+    for i, h in enumerate(hashes):
+        k = occurrences.get(h, 0)
+        occurrences[h] = k + 1
+        candidates = by_hash.get(h, [])
+        if k < len(candidates):
+            ids[i] = candidates[k]
+            kept.append(i)
+        else:
+            new_positions.append(i)
+
+    # A new paragraph's positional ID may already belong to a kept chunk that moved
+    taken = {ids[i] for i in kept}
+    for i in new_positions:
+        n = 0
+        while ids[i] in taken:
+            n += 1
+            ids[i] = hashlib.sha256(f"{ids[i]}\x1f{n}".encode("utf-8")).hexdigest()[:32]
+        taken.add(ids[i])
+    return kept, new_positions
+
+def _update_metadatas(
+    collection_name: str,
+    ids: List[str],
+    metadatas: List[Dict[str, Any]]
+) -> int:
+    """Rewrite the metadata of stored chunks where it differs; returns the number updated."""
+    if not ids:
+        return 0
+    collection = get_chroma_collection(collection_name)
+    found = collection.get(ids=ids, include=["metadatas"])
+    stored = dict(zip(found["ids"], found["metadatas"]))
+    changed = [(chunk_id, metadata) for chunk_id, metadata in zip(ids, metadatas) if stored.get(chunk_id) != metadata]
+    if changed:
+        with VECTOR_STORE_SECONDS.time(operation="update"):
+            collection.update(ids=[c[0] for c in changed], metadatas=[c[1] for c in changed])
+        # Cached results carry the old page and position
+        _adjust_count(collection_name, 0)
+    return len(changed)
+
+def sync_document(
+    paragraphs: ParagraphBatch,
+    collection_name: Optional[str] = None,
+    embeddings: Optional[Any] = None,
+    batch_size: int = ADD_BATCH_SIZE,
+    file_type: Optional[str] = None,
+    file_size: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Make the vector store hold exactly ``paragraphs`` for their document.
+
+    The new parse is diffed against the chunks the catalog records for the
+    document on (content hash, occurrence), see _match_previous. Chunks of
+    unchanged text keep their IDs, text and embedding; if the paragraph
+    moved, only its page and position metadata are updated. New text is
+    written and chunks that are gone are removed with one batched delete.
+    Repeated copies of text the document already had reuse the stored
+    embedding, so only changed text is embedded.
+
+    Args:
+        paragraphs: The document's complete parse
+        collection_name: Target collection, defaults to the owner's (see collection_for)
+        embeddings: Precomputed embeddings aligned with ``paragraphs``
+        batch_size: Number of paragraphs embedded and written per call
+        file_type: Stored in the catalog for document listings
+        file_size: Stored in the catalog for document listings
+
+    Returns:
+        Dict: chunk_ids (in paragraph order), added, removed, unchanged,
+        updated (unchanged chunks whose metadata was rewritten), embedded
+        (paragraphs embedded by this call) and embeddings (the full aligned
+        matrix when every paragraph was embedded here, else None).
+    """
+    if embeddings is not None and len(embeddings) != len(paragraphs):
+        raise ValueError("embeddings must align with paragraphs")
+    collection_name = collection_name or collection_for(paragraphs.user_id)
+    document_name, user_id = paragraphs.document_name, paragraphs.user_id
+
+    try:
+        ids, texts, metadatas = _batch_rows(paragraphs)
+        hashes = [content_hash(text) for text in texts]
+        previous = _document_chunks(collection_name, document_name, user_id)
+
+        kept, new_positions = _match_previous(ids, hashes, previous)
+        current = set(ids)
+        removed = [chunk_id for chunk_id in previous if chunk_id not in current]
+
+        embedded = 0
+        new_vectors = None
+        if new_positions:
+            if embeddings is not None:
+                new_vectors = [embeddings[i] for i in new_positions]
+            elif get_embedding_function() is not None:
+                reused = _reusable_embeddings(
+                    get_chroma_collection(collection_name),
+                    previous,
+                    {hashes[i] for i in new_positions}
+                )
+                missing = [i for i in new_positions if hashes[i] not in reused]
+                fresh = embed_texts([texts[i] for i in missing], batch_size) if missing else None
+                fresh_by_position = dict(zip(missing, fresh)) if fresh is not None else {}
+                new_vectors = [
+                    fresh_by_position[i] if i in fresh_by_position else reused[hashes[i]]
+                    for i in new_positions
+                ]
+                embedded = len(missing)
+
+            _write_rows(
+                collection_name,
+                [ids[i] for i in new_positions],
+                [texts[i] for i in new_positions],
+                [metadatas[i] for i in new_positions],
+                new_vectors,
+                batch_size
+            )
+
+        updated = _update_metadatas(collection_name, [ids[i] for i in kept], [metadatas[i] for i in kept])
+
+        # Removed after the new chunks are in, so the document stays searchable throughout
+        if removed:
+            delete_from_vector_store(removed, collection_name)
+
+        get_catalog().replace_chunks(
+            collection_name,
+            user_id,
+            document_name,
+            ids,
+            hashes,
+            file_type=file_type,
+            file_size=file_size,
+            page_count=max(paragraphs.pages) if len(paragraphs) else None
+        )
+        logger.info(
+            f"Synced {document_name} in {collection_name}: +{len(new_positions)} -{len(removed)} "
+            f"={len(kept)} ({updated} moved) paragraphs, {embedded} embedded"
+        )
+        return {
+            "chunk_ids": ids,
+            "added": len(new_positions),
+            "removed": len(removed),
+            "unchanged": len(kept),
+            "updated": updated,
+            "embedded": embedded,
+            "embeddings": np.asarray(new_vectors, dtype=np.float32) if new_vectors is not None and embedded == len(ids) else None,
+        }
+    except Exception as e:
+        invalidate_collection(collection_name)
+        logger.error(f"Error syncing document {document_name}: {str(e)}")
+        raise
+
+def delete_document(
+    document_name: str,
+    user_id: str = "",
+    collection_name: Optional[str] = None
+) -> int:
+    """
+    Remove every chunk of a document with one batched delete.
+
+    Chunk IDs come from the catalog (or, for documents indexed before it
+    existed, one filtered get). Returns the number of chunks removed.
+    """
+    collection_name = collection_name or collection_for(user_id)
+    chunk_ids = list(_document_chunks(collection_name, document_name, user_id))
+    if chunk_ids:
+        delete_from_vector_store(chunk_ids, collection_name)
+    get_catalog().remove_document(collection_name, user_id, document_name)
+    logger.info(f"Deleted document {document_name} ({len(chunk_ids)} chunks) from {collection_name}")
+    return len(chunk_ids)
+
+def _retrieval_cache_key(
+    collection_name: str,
+    version: int,
+    query: str,
+    n_results: int,
+    where: Optional[Dict[str, Any]]
+) -> tuple:
+    return (
+        collection_name,
+        version,
+        normalize_query(query),
+        n_results,
+        json.dumps(where, sort_keys=True, default=str) if where else None
+    )
+
+# Fields requested from collection.query; stored embeddings let context packing skip re-embedding chunks
+_QUERY_INCLUDE = ["documents", "metadatas", "distances", "embeddings"]
+
+def _format_results(results: Dict[str, Any], index: int) -> List[Dict[str, Any]]:
+    """
+    Format the results of the ``index``-th query of a collection.query
+    response. Each result carries its stored ``embedding`` (float32) when
+    the response includes embeddings, else None.
+    """
+    distances = results.get("distances")
+    embeddings = results.get("embeddings")
+    return [
+        {
+            "id": results["ids"][index][i],
+            "text": results["documents"][index][i],
+            "metadata": results["metadatas"][index][i],
+            "distance": distances[index][i] if distances else None,
+            "embedding": np.asarray(embeddings[index][i], dtype=np.float32) if embeddings is not None else None
+        }
+        for i in range(len(results["documents"][index]))
+    ]
+
+def _copy_results(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Cached results are shared; callers get their own dicts (embeddings stay shared and are never modified)
+    return [{**result, "metadata": dict(result["metadata"])} for result in results]
+
 def query_vector_store(
     query: str,
     n_results: int = 5,
-    collection_name: str = "theme_docs"
+    collection_name: str = "theme_docs",
+    where: Optional[Dict[str, Any]] = None
 ) -> List[Dict[str, Any]]:
-    """Query the vector store."""
+    """
+    Query the vector store.
+
+    Each result has the chunk's id, text, metadata, distance and stored
+    embedding. Results are cached per (collection, write version, normalized query,
+    n_results, where). Every add or delete through this module bumps the
+    collection's version, so a cached result is only served while nothing
+    has been written since it was computed. Writes made by other processes
+    are not seen by this cache.
+    """
     try:
+        version = get_collection_version(collection_name)
+        cache_key = _retrieval_cache_key(collection_name, version, query, n_results, where)
+        cached = retrieval_cache.get(cache_key)
+        if cached is not None:
+            return _copy_results(cached)
+
         collection = get_chroma_collection(collection_name)
         
         # Get actual number of documents
-        doc_count = collection.count()
+        doc_count = get_collection_count(collection_name)
         if doc_count == 0:
             return []
         
@@ -105,26 +869,256 @@ def query_vector_store(
         if n_results < 1:
             n_results = 1
         
-        # Query collection
-        results = collection.query(
-            query_texts=[query],
-            n_results=n_results
-        )
+        query_kwargs: Dict[str, Any] = {"n_results": n_results, "include": _QUERY_INCLUDE}
+        if where:
+            query_kwargs["where"] = where
+        
+        # Query collection by embedding; repeated queries skip the model
+        if get_embedding_function() is not None:
+            query_kwargs["query_embeddings"] = [embed_query(query).tolist()]
+        else:
+            query_kwargs["query_texts"] = [query]
+        with VECTOR_STORE_SECONDS.time(operation="query"):
+            results = collection.query(**query_kwargs)
         
         # Format results
-        formatted_results = []
-        for i in range(len(results["documents"][0])):
-            formatted_results.append({
-                "text": results["documents"][0][i],
-                "metadata": results["metadatas"][0][i],
-                "distance": results["distances"][0][i] if "distances" in results else None
-            })
+        formatted_results = _format_results(results, 0)
         
-        return formatted_results
+        # Don't cache if a write landed while the query was running
+        if get_collection_version(collection_name) == version:
+            retrieval_cache.put(cache_key, formatted_results)
+        return _copy_results(formatted_results)
     except Exception as e:
+        invalidate_collection(collection_name)
         logger.error(f"Error querying vector store: {str(e)}")
         raise
 
+def query_vector_store_batch(
+    queries: List[str],
+    n_results: int = 5,
+    collection_name: str = "theme_docs",
+    where: Optional[Dict[str, Any]] = None
+) -> List[List[Dict[str, Any]]]:
+    """
+    Query the vector store with many queries at once.
+
+    Queries already in the retrieval cache are served from it; the rest
+    are embedded as one matrix and searched with a single multi-query
+    collection.query call.
+
+    Returns:
+        List[List[Dict]]: Formatted results per query, in input order.
+    """
+    try:
+        version = get_collection_version(collection_name)
+        keys = [_retrieval_cache_key(collection_name, version, q, n_results, where) for q in queries]
+        batch_results: List[Optional[List[Dict[str, Any]]]] = [retrieval_cache.get(key) for key in keys]
+
+        # Identical queries in one batch are searched once
+        pending: Dict[tuple, List[int]] = {}
+        for i, (key, cached) in enumerate(zip(keys, batch_results)):
+            if cached is None:
+                pending.setdefault(key, []).append(i)
+
+        if pending:
+            doc_count = get_collection_count(collection_name)
+            if doc_count == 0:
+                return [[] for _ in queries]
+
+            collection = get_chroma_collection(collection_name)
+            query_kwargs: Dict[str, Any] = {"n_results": max(1, min(n_results, doc_count)), "include": _QUERY_INCLUDE}
+            if where:
+                query_kwargs["where"] = where
+
+            pending_queries = [queries[positions[0]] for positions in pending.values()]
+            if get_embedding_function() is not None:
+                query_kwargs["query_embeddings"] = embed_queries(pending_queries).tolist()
+            else:
+                query_kwargs["query_texts"] = pending_queries
+            with VECTOR_STORE_SECONDS.time(operation="query_batch"):
+                results = collection.query(**query_kwargs)
+
+            cacheable = get_collection_version(collection_name) == version
+            for index, (key, positions) in enumerate(pending.items()):
+                formatted = _format_results(results, index)
+                if cacheable:
+                    retrieval_cache.put(key, formatted)
+                for position in positions:
+                    batch_results[position] = formatted
+
+        return [_copy_results(results) for results in batch_results]
+    except Exception as e:
+        invalidate_collection(collection_name)
+        logger.error(f"Error batch querying vector store: {str(e)}")
+        raise
+
+def _lexical_results(
+    collection,
+    hits: List[tuple],
+    where: Optional[Dict[str, Any]]
+) -> Dict[str, Dict[str, Any]]:
+    """Fetch text, metadata and stored embeddings of BM25 hits, dropping those that fail ``where``."""
+    if not hits:
+        return {}
+    get_kwargs: Dict[str, Any] = {"ids": [doc_id for doc_id, _ in hits], "include": ["documents", "metadatas", "embeddings"]}
+    if where:
+        get_kwargs["where"] = where
+    found = collection.get(**get_kwargs)
+    scores = dict(hits)
+    embeddings = found.get("embeddings")
+    if embeddings is None:
+        embeddings = [None] * len(found["ids"])
+    return {
+        doc_id: {
+            "id": doc_id,
+            "text": text,
+            "metadata": metadata,
+            "distance": None,
+            "bm25": scores[doc_id],
+            "embedding": np.asarray(embedding, dtype=np.float32) if embedding is not None else None
+        }
+        for doc_id, text, metadata, embedding in zip(found["ids"], found["documents"], found["metadatas"], embeddings)
+    }
+
+def _fuse_rankings(
+    collection,
+    collection_name: str,
+    query: str,
+    n_results: int,
+    where: Optional[Dict[str, Any]],
+    dense: Optional[List[Dict[str, Any]]]
+) -> List[Dict[str, Any]]:
+    """
+    Fuse the query's BM25 ranking with its dense results (None in "lexical"
+    mode) using reciprocal rank fusion.
+    """
+    candidates = n_results * HYBRID_CANDIDATE_FACTOR
+    with VECTOR_STORE_SECONDS.time(operation="lexical_search"):
+        # Filtered-out hits are dropped after the fetch, so look further down the ranking
+        lexical_hits = get_lexical_index(collection_name).search(query, candidates * 4 if where else candidates)
+        by_id = _lexical_results(collection, lexical_hits, where)
+    lexical_ranking = [doc_id for doc_id, _ in lexical_hits if doc_id in by_id][:candidates]
+
+    rankings = [lexical_ranking]
+    if dense is not None:
+        for result in dense:
+            entry = by_id.setdefault(result["id"], {**result, "bm25": None})
+            entry["distance"] = result["distance"]
+            if entry["embedding"] is None:
+                entry["embedding"] = result["embedding"]
+        rankings.append([result["id"] for result in dense])
+
+    return [
+        {**by_id[doc_id], "score": score}
+        for doc_id, score in reciprocal_rank_fusion(rankings)[:n_results]
+    ]
+
+def search_vector_store(
+    query: str,
+    n_results: int = 5,
+    collection_name: str = "theme_docs",
+    where: Optional[Dict[str, Any]] = None,
+    mode: str = RETRIEVAL_MODE
+) -> List[Dict[str, Any]]:
+    """
+    Retrieve paragraphs with BM25, dense search or both.
+
+    In "hybrid" mode the top ``n_results * HYBRID_CANDIDATE_FACTOR`` hits of
+    the BM25 index and of the dense search are fused with reciprocal rank
+    fusion, so exact terms (clause numbers, names, acronyms) rank well
+    without over-fetching dense candidates. "lexical" skips the embedding
+    model and vector search entirely. Results carry the fused ``score`` and
+    the stored ``embedding``; dense hits keep their ``distance`` and BM25
+    hits their ``bm25`` score.
+    """
+    if mode == "dense":
+        return query_vector_store(query, n_results, collection_name, where)
+    if mode not in ("hybrid", "lexical"):
+        raise ValueError(f"Unknown retrieval mode: {mode}")
+
+    try:
+        collection = get_chroma_collection(collection_name)
+        # Catches up with other processes' writes; retires cached results when it rebuilds
+        _sync_lexical_index(collection, collection_name)
+
+        version = get_collection_version(collection_name)
+        cache_key = (mode,) + _retrieval_cache_key(collection_name, version, query, n_results, where)
+        cached = retrieval_cache.get(cache_key)
+        if cached is not None:
+            return _copy_results(cached)
+
+        dense = None
+        if mode == "hybrid":
+            dense = query_vector_store(query, n_results * HYBRID_CANDIDATE_FACTOR, collection_name, where)
+        formatted_results = _fuse_rankings(collection, collection_name, query, n_results, where, dense)
+
+        if get_collection_version(collection_name) == version:
+            retrieval_cache.put(cache_key, formatted_results)
+        return _copy_results(formatted_results)
+    except Exception as e:
+        invalidate_collection(collection_name)
+        logger.error(f"Error searching vector store: {str(e)}")
+        raise
+
+def search_vector_store_batch(
+    queries: List[str],
+    n_results: int = 5,
+    collection_name: str = "theme_docs",
+    where: Optional[Dict[str, Any]] = None,
+    mode: str = RETRIEVAL_MODE
+) -> List[List[Dict[str, Any]]]:
+    """
+    Batch counterpart of search_vector_store, with the same retrieval modes.
+
+    The dense candidates of all uncached queries come from one
+    query_vector_store_batch call; each query's BM25 ranking is then fused
+    with its own dense candidates, so a batch returns what the same queries
+    sent one by one would.
+
+    Returns:
+        List[List[Dict]]: Results per query, in input order.
+    """
+    if mode == "dense":
+        return query_vector_store_batch(queries, n_results, collection_name, where)
+    if mode not in ("hybrid", "lexical"):
+        raise ValueError(f"Unknown retrieval mode: {mode}")
+
+    try:
+        collection = get_chroma_collection(collection_name)
+        _sync_lexical_index(collection, collection_name)
+
+        version = get_collection_version(collection_name)
+        keys = [(mode,) + _retrieval_cache_key(collection_name, version, q, n_results, where) for q in queries]
+        batch_results: List[Optional[List[Dict[str, Any]]]] = [retrieval_cache.get(key) for key in keys]
+
+        # Identical queries in one batch are searched once
+        pending: Dict[tuple, List[int]] = {}
+        for i, (key, cached) in enumerate(zip(keys, batch_results)):
+            if cached is None:
+                pending.setdefault(key, []).append(i)
+
+        if pending:
+            pending_queries = [queries[positions[0]] for positions in pending.values()]
+            dense_batch: List[Optional[List[Dict[str, Any]]]] = [None] * len(pending_queries)
+            if mode == "hybrid":
+                dense_batch = query_vector_store_batch(
+                    pending_queries, n_results * HYBRID_CANDIDATE_FACTOR, collection_name, where
+                )
+
+            cacheable = get_collection_version(collection_name) == version
+            for query, dense, (key, positions) in zip(pending_queries, dense_batch, pending.items()):
+                formatted = _fuse_rankings(collection, collection_name, query, n_results, where, dense)
+                if cacheable:
+                    retrieval_cache.put(key, formatted)
+                for position in positions:
+                    batch_results[position] = formatted
+
+        return [_copy_results(results) for results in batch_results]
+    except Exception as e:
+        invalidate_collection(collection_name)
+        logger.error(f"Error batch searching vector store: {str(e)}")
+        raise
+
 def delete_from_vector_store(
     doc_ids: List[str],
     collection_name: str = "theme_docs"
@@ -132,8 +1126,17 @@ def delete_from_vector_store(
     """Delete documents from the vector store."""
     try:
         collection = get_chroma_collection(collection_name)
-        collection.delete(ids=doc_ids)
-        logger.info(f"Deleted documents from collection: {doc_ids}")
+        existing = _existing_ids(collection, doc_ids)
+        if existing:
+            with VECTOR_STORE_SECONDS.time(operation="delete"):
+                collection.delete(ids=list(existing))
+            with _lexical_lock(collection_name):
+                get_lexical_index(collection_name).remove_many(existing)
+                _record_write(collection_name)
+            _adjust_count(collection_name, -len(existing))
+        get_catalog().remove_chunks(collection_name, doc_ids)
+        logger.info(f"Deleted {len(existing)} documents from collection {collection_name}")
     except Exception as e:
+        invalidate_collection(collection_name)
         logger.error(f"Error deleting from vector store: {str(e)}")
         raise
\ No newline at end of file
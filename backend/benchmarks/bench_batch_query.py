@@ -0,0 +1,60 @@
+"""
+Per-query throughput of query_vector_store_batch against N sequential
+query_vector_store calls.
+
+Caches are cleared before each run so both paths pay for embedding and
+search. Run from the backend directory:
+    python -m benchmarks.bench_batch_query --paragraphs 5000 --queries 32
+"""
+import time
+import argparse
+
+from app.services.vector_store import (
+    add_many,
+    query_vector_store,
+    query_vector_store_batch,
+    retrieval_cache,
+)
+from app.services.embedding import query_embedding_cache
+from benchmarks.bench_vector_store import make_paragraphs, reset_collection
+
+COLLECTION = "bench_batch_query"
+
+
+def clear_caches() -> None:
+    retrieval_cache.clear()
+    query_embedding_cache.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--paragraphs", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=32)
+    parser.add_argument("--n-results", type=int, default=5)
+    args = parser.parse_args()
+
+    reset_collection(COLLECTION)
+    add_many(make_paragraphs(args.paragraphs, "bench_doc.pdf"), collection_name=COLLECTION)
+    queries = [f"What does policy clause {i} say about theme {i % 13}?" for i in range(args.queries)]
+
+    clear_caches()
+    start = time.perf_counter()
+    for query in queries:
+        query_vector_store(query, args.n_results, collection_name=COLLECTION)
+    sequential = time.perf_counter() - start
+
+    clear_caches()
+    start = time.perf_counter()
+    query_vector_store_batch(queries, args.n_results, collection_name=COLLECTION)
+    batched = time.perf_counter() - start
+
+    print(f"corpus: {args.paragraphs} paragraphs, queries: {len(queries)}")
+    print(f"sequential: {sequential * 1000 / len(queries):.2f} ms/query ({len(queries) / sequential:.1f} queries/s)")
+    print(f"batched:    {batched * 1000 / len(queries):.2f} ms/query ({len(queries) / batched:.1f} queries/s)")
+    print(f"speedup:    {sequential / batched:.1f}x")
+
+    reset_collection(COLLECTION)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Embedding throughput (texts/sec) of the shared EmbeddingEngine at several
+batch sizes.
+
+Run from the backend directory:
+    python -m benchmarks.bench_embedding --backend hashing --texts 5000
+    python -m benchmarks.bench_embedding --backend sentence-transformers --batch-sizes 1 16 64 256
+"""
+import time
+import argparse
+from typing import List
+
+from app.services.embedding import EmbeddingEngine, create_backend
+
+
+def make_texts(count: int) -> List[str]:
+    return [
+        f"Paragraph {i} discusses policy clause {i % 97}, its impact on theme {i % 13} "
+        f"and the obligations of party {i % 7} under section {i % 31}."
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backend", default="hashing", choices=["hashing", "sentence-transformers"])
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 64, 128, 256])
+    args = parser.parse_args()
+
+    texts = make_texts(args.texts)
+    backend = create_backend(args.backend)
+    # Load the model before timing
+    EmbeddingEngine(backend).embed(texts[:1])
+
+    print(f"backend: {backend.name}, texts: {len(texts)}")
+    for batch_size in args.batch_sizes:
+        engine = EmbeddingEngine(backend, batch_size=batch_size)
+        start = time.perf_counter()
+        matrix = engine.embed(texts)
+        elapsed = time.perf_counter() - start
+        print(f"batch_size={batch_size:>4}: {len(texts) / elapsed:>10.1f} texts/s  "
+              f"({matrix.shape[0]}x{matrix.shape[1]} {matrix.dtype})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Memory of parsed paragraphs as a list of dicts (the old parser output, with
+a uuid4 paragraph_id each) against a ParagraphBatch, plus the pickled size
+that crosses the ingestion process-pool boundary.
+
+Run from the backend directory:
+    python -m benchmarks.bench_paragraph_memory --paragraphs 100000
+"""
+import gc
+import uuid
+import pickle
+import argparse
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.ingestion.paragraphs import ParagraphBatch
+
+
+def make_texts(count: int) -> List[str]:
+    return [
+        f"Paragraph {i} OCR text discussing policy clause {i % 97} and its impact on theme {i % 13}."
+        for i in range(count)
+    ]
+
+
+def build_dicts(texts: List[str], document_name: str, user_id: str) -> List[Dict[str, Any]]:
+    """Paragraphs shaped like the parsers' former per-paragraph dict output."""
+    paragraphs = []
+    char_offset = 0
+    for i, text in enumerate(texts):
+        paragraphs.append({
+            "paragraph_id": str(uuid.uuid4()),
+            "text": text,
+            "page": i // 20 + 1,
+            "section": None,
+            "is_heading": False,
+            "document_name": document_name,
+            "user_id": user_id,
+            "char_start": char_offset,
+            "char_end": char_offset + len(text)
+        })
+        char_offset += len(text) + 2
+    return paragraphs
+
+
+def build_batch(texts: List[str], document_name: str, user_id: str) -> ParagraphBatch:
+    batch = ParagraphBatch(document_name, user_id)
+    char_offset = 0
+    for i, text in enumerate(texts):
+        batch.append(text, i // 20 + 1, char_start=char_offset, char_end=char_offset + len(text))
+        char_offset += len(text) + 2
+    return batch
+
+
+def measure(build: Callable[[], Any]) -> Tuple[Any, int]:
+    """Build the value and return it with the bytes it allocated (texts excluded, they are shared)."""
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--paragraphs", type=int, default=100000)
+    args = parser.parse_args()
+
+    texts = make_texts(args.paragraphs)
+    # f-strings with a runtime value are fresh objects, like parser output
+    document_name, user_id = "".join(["scanned_report", ".pdf"]), "".join(["default", "_user"])
+
+    dicts, dict_bytes = measure(lambda: build_dicts(texts, document_name, user_id))
+    batch, batch_bytes = measure(lambda: build_batch(texts, document_name, user_id))
+    dict_pickle = len(pickle.dumps(dicts, protocol=pickle.HIGHEST_PROTOCOL))
+    batch_pickle = len(pickle.dumps(batch, protocol=pickle.HIGHEST_PROTOCOL))
+
+    print(f"paragraphs: {args.paragraphs}")
+    print(f"dict list:       {dict_bytes / 2 ** 20:8.1f} MiB in memory, {dict_pickle / 2 ** 20:8.1f} MiB pickled")
+    print(f"ParagraphBatch:  {batch_bytes / 2 ** 20:8.1f} MiB in memory, {batch_pickle / 2 ** 20:8.1f} MiB pickled")
+    print(f"reduction:       {dict_bytes / batch_bytes:8.1f}x in memory, {dict_pickle / batch_pickle:8.1f}x pickled")
+
+
+if __name__ == "__main__":
+    main()
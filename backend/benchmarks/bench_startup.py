@@ -0,0 +1,72 @@
+"""
+Import-time and startup benchmark for the backend.
+
+Each run imports app.main in a fresh interpreter, so the numbers include
+everything a uvicorn worker start or reload pays before serving. With
+--warmup the script also times registry.warmup() per resource.
+
+Run from the backend directory:
+    python -m benchmarks.bench_startup --runs 5 --warmup
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+_IMPORT_SNIPPET = """
+import json, time
+start = time.perf_counter()
+import app.main
+import_time = time.perf_counter() - start
+result = {"import_time": import_time}
+if WARMUP:
+    from app.core.resources import registry
+    start = time.perf_counter()
+    status = registry.warmup()
+    result["warmup_time"] = time.perf_counter() - start
+    result["resources"] = {name: info.get("load_time") for name, info in status.items()}
+print(json.dumps(result))
+"""
+
+
+def run_once(warmup: bool) -> dict:
+    snippet = _IMPORT_SNIPPET.replace("WARMUP", "True" if warmup else "False")
+    env = dict(os.environ, WARMUP_ON_STARTUP="false")
+    output = subprocess.run(
+        [sys.executable, "-c", snippet],
+        check=True,
+        capture_output=True,
+        text=True,
+        env=env
+    ).stdout
+    # app.main logs to stdout as well; the result is the last line
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warmup", action="store_true", help="Also time loading every registered resource")
+    args = parser.parse_args()
+
+    runs = [run_once(args.warmup) for _ in range(args.runs)]
+    import_times = [r["import_time"] for r in runs]
+
+    print(f"import app.main: median {statistics.median(import_times) * 1000:.1f} ms, "
+          f"min {min(import_times) * 1000:.1f} ms over {args.runs} runs")
+
+    if args.warmup:
+        warmup_times = [r["warmup_time"] for r in runs]
+        print(f"registry.warmup(): median {statistics.median(warmup_times):.2f} s")
+        for name in runs[0]["resources"]:
+            loads = [r["resources"][name] for r in runs if r["resources"][name] is not None]
+            if loads:
+                print(f"  {name}: median {statistics.median(loads):.2f} s")
+            else:
+                print(f"  {name}: failed to load")
+
+
+if __name__ == "__main__":
+    main()
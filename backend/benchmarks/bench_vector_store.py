@@ -0,0 +1,76 @@
+"""
+Throughput comparison between per-paragraph add_to_vector_store calls and
+the batched add_many path.
+
+Run from the backend directory:
+    python -m benchmarks.bench_vector_store --paragraphs 2000 --batch-size 256
+"""
+import argparse
+import time
+from typing import List, Dict
+
+from app.services.vector_store import add_to_vector_store, add_many, get_client, invalidate_collection
+
+
+def make_paragraphs(count: int, document_name: str, user_id: str = "bench_user") -> List[Dict]:
+    """Build synthetic paragraphs shaped like ingestion.manager.process_file output."""
+    return [
+        {
+            "paragraph_id": f"{document_name}-{i}",
+            "text": f"Paragraph {i} of {document_name} discusses policy clause {i % 97} and its impact on theme {i % 13}.",
+            "page": i // 20 + 1,
+            "section": None,
+            "is_heading": False,
+            "document_name": document_name,
+            "user_id": user_id,
+        }
+        for i in range(count)
+    ]
+
+
+def reset_collection(collection_name: str) -> None:
+    try:
+        get_client().delete_collection(collection_name)
+    except Exception:
+        pass
+    invalidate_collection(collection_name)
+
+
+def bench_single(paragraphs: List[Dict], collection_name: str) -> float:
+    reset_collection(collection_name)
+    start = time.perf_counter()
+    for i, para in enumerate(paragraphs):
+        metadata = {"filename": para["document_name"], "page": para["page"], "paragraph": i}
+        add_to_vector_store(para["text"], metadata, collection_name=collection_name)
+    return time.perf_counter() - start
+
+
+def bench_batched(paragraphs: List[Dict], collection_name: str, batch_size: int) -> float:
+    reset_collection(collection_name)
+    start = time.perf_counter()
+    add_many(paragraphs, collection_name=collection_name, batch_size=batch_size)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--paragraphs", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    paragraphs = make_paragraphs(args.paragraphs, "bench_doc.pdf")
+
+    single = bench_single(paragraphs, "bench_single")
+    batched = bench_batched(paragraphs, "bench_batched", args.batch_size)
+
+    print(f"paragraphs:             {len(paragraphs)}")
+    print(f"add_to_vector_store:    {single:.2f}s ({len(paragraphs) / single:.1f} para/s)")
+    print(f"add_many (batch={args.batch_size}): {batched:.2f}s ({len(paragraphs) / batched:.1f} para/s)")
+    print(f"speedup:                {single / batched:.1f}x")
+
+    reset_collection("bench_single")
+    reset_collection("bench_batched")
+
+
+if __name__ == "__main__":
+    main()
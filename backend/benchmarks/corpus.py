@@ -0,0 +1,139 @@
+"""
+Deterministic synthetic corpus for the benchmark suite: text PDFs (PyMuPDF),
+DOCX files (python-docx) and rendered page images (Pillow), plus plain
+paragraph texts for the indexing and query benchmarks.
+
+The same seed always produces the same documents.
+"""
+import os
+import random
+from typing import Dict, List
+
+_SUBJECTS = [
+    "data retention", "employee onboarding", "vendor payments", "incident response", "travel expenses",
+    "access control", "customer refunds", "records management", "workplace safety", "procurement approvals",
+    "privacy notices", "contract renewals", "audit findings", "remote work", "equipment disposal",
+]
+_VERBS = ["requires", "limits", "describes", "extends", "replaces", "clarifies", "restricts", "defines"]
+_OBJECTS = [
+    "the approval workflow", "reporting obligations", "the review period", "penalties for breaches",
+    "exceptions for contractors", "the escalation path", "storage locations", "notification deadlines",
+]
+
+
+def make_paragraph_texts(count: int, seed: int = 0) -> List[str]:
+    """Policy-style paragraphs with clause numbers, so lexical and dense retrieval both have work to do."""
+    rng = random.Random(seed)
+    texts = []
+    for i in range(count):
+        subject = rng.choice(_SUBJECTS)
+        texts.append(
+            f"Clause {i % 40 + 1}.{i % 7 + 1} on {subject} {rng.choice(_VERBS)} {rng.choice(_OBJECTS)}. "
+            f"Section {rng.randint(1, 30)} {rng.choice(_VERBS)} {rng.choice(_OBJECTS)} for {subject} "
+            f"within {rng.randint(5, 90)} days of the request."
+        )
+    return texts
+
+
+def make_queries(count: int, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    return [
+        f"What does clause {rng.randint(1, 40)}.{rng.randint(1, 7)} say about {rng.choice(_SUBJECTS)}?"
+        for _ in range(count)
+    ]
+
+
+def write_pdf(path: str, pages: int, paragraphs_per_page: int, seed: int) -> None:
+    import fitz
+
+    texts = make_paragraph_texts(pages * paragraphs_per_page, seed)
+    doc = fitz.open()
+    for page_index in range(pages):
+        page = doc.new_page()
+        y = 72
+        for text in texts[page_index * paragraphs_per_page:(page_index + 1) * paragraphs_per_page]:
+            rect = fitz.Rect(72, y, page.rect.width - 72, y + 90)
+            page.insert_textbox(rect, text, fontsize=10)
+            y += 100
+    doc.save(path)
+    doc.close()
+
+
+def write_docx(path: str, pages: int, paragraphs_per_page: int, seed: int) -> None:
+    import docx
+    from docx.enum.text import WD_BREAK
+
+    texts = make_paragraph_texts(pages * paragraphs_per_page, seed)
+    document = docx.Document()
+    for page_index in range(pages):
+        document.add_heading(f"Part {page_index + 1}", level=2)
+        for text in texts[page_index * paragraphs_per_page:(page_index + 1) * paragraphs_per_page]:
+            document.add_paragraph(text)
+        if page_index < pages - 1:
+            document.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
+    document.save(path)
+
+
+def write_image(path: str, paragraphs: int, seed: int) -> None:
+    """One rendered page: black text on white at roughly 150 dpi letter size."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    try:
+        font = ImageFont.load_default(size=22)
+    except TypeError:
+        # Pillow < 10.1 has a single fixed-size bitmap font
+        font = ImageFont.load_default()
+
+    image = Image.new("L", (1275, 1650), color=255)
+    draw = ImageDraw.Draw(image)
+    y = 100
+    for text in make_paragraph_texts(paragraphs, seed):
+        words, line = text.split(), ""
+        for word in words:
+            candidate = f"{line} {word}".strip()
+            if draw.textlength(candidate, font=font) > 1075:
+                draw.text((100, y), line, fill=0, font=font)
+                y += 30
+                line = word
+            else:
+                line = candidate
+        draw.text((100, y), line, fill=0, font=font)
+        # Blank line between paragraphs, which the OCR parser splits on
+        y += 70
+    image.save(path)
+    image.close()
+
+
+def generate_corpus(
+    directory: str,
+    pdfs: int = 4,
+    docxs: int = 4,
+    images: int = 4,
+    pages: int = 5,
+    paragraphs_per_page: int = 6
+) -> Dict[str, List[Dict]]:
+    """
+    Write the synthetic files and describe them.
+
+    Returns:
+        Dict[str, List[Dict]]: Per file type ("pdf", "docx", "image"), one
+        dict per file with path and pages, or {"skipped": reason} entries
+        when the library that writes that type is not installed.
+    """
+    os.makedirs(directory, exist_ok=True)
+    corpus: Dict[str, List[Dict]] = {"pdf": [], "docx": [], "image": []}
+    writers = [
+        ("pdf", pdfs, ".pdf", lambda path, i: write_pdf(path, pages, paragraphs_per_page, seed=i), pages),
+        ("docx", docxs, ".docx", lambda path, i: write_docx(path, pages, paragraphs_per_page, seed=100 + i), pages),
+        ("image", images, ".png", lambda path, i: write_image(path, paragraphs_per_page, seed=200 + i), 1),
+    ]
+    for file_type, count, ext, writer, file_pages in writers:
+        for i in range(count):
+            path = os.path.join(directory, f"synthetic_{file_type}_{i}{ext}")
+            try:
+                writer(path, i)
+            except ImportError as e:
+                corpus[file_type] = [{"skipped": f"cannot generate {file_type}: {e}"}]
+                break
+            corpus[file_type].append({"path": path, "pages": file_pages})
+    return corpus
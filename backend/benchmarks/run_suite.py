@@ -0,0 +1,289 @@
+"""
+Offline benchmark suite for the ingestion and query hot paths.
+
+Generates a synthetic corpus (text PDFs, DOCX files, rendered images) and
+measures:
+  - pages/sec of each parser in app.ingestion
+  - paragraphs/sec through embedding and vector-store insertion
+  - p50/p95/p99 latency of answer_query_with_context as the corpus grows
+
+Everything runs locally: the deterministic hashing embedder is used unless
+--embedding-backend says otherwise, and indexes are written to a temporary
+directory. Results are written as JSON; pass --compare with an earlier
+result file to print per-metric changes.
+
+Run from the backend directory:
+    python -m benchmarks.run_suite
+    python -m benchmarks.run_suite --sizes 1000 10000 50000 --compare benchmarks/results/baseline.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.corpus import generate_corpus, make_paragraph_texts, make_queries
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+SCHEMA_VERSION = 1
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(__file__)
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    values = np.asarray(samples) * 1000
+    return {
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "mean_ms": float(values.mean()),
+    }
+
+
+def _parsers() -> Dict[str, Callable[[], Callable[[Dict], Any]]]:
+    """
+    Parser benchmarks by name. Each loader imports its parser and returns a
+    callable taking a corpus entry; imports happen here so a missing parser
+    library only skips that benchmark.
+    """
+    def docling_pdf():
+        from app.ingestion.pdf_parser import parse_pdf
+        return lambda f: parse_pdf(f["path"], os.path.basename(f["path"]), "bench_user")
+
+    def text_layer_pdf():
+        from app.ingestion.pdf_parser import parse_pdf_text_pages
+        return lambda f: parse_pdf_text_pages(
+            f["path"], os.path.basename(f["path"]), "bench_user", list(range(1, f["pages"] + 1))
+        )
+
+    def docx():
+        from app.ingestion.docs_parser import parse_docx
+        return lambda f: parse_docx(f["path"], os.path.basename(f["path"]), "bench_user")
+
+    def ocr_image():
+        from app.ingestion.ocr_parser import parse_ocr_file
+        from app.core.resources import registry
+        registry.get("tesseract")
+        return lambda f: parse_ocr_file(f["path"], os.path.basename(f["path"]), "bench_user")
+
+    def process_file_pdf():
+        from app.ingestion.manager import process_file
+        return lambda f: process_file(f["path"], os.path.basename(f["path"]), "bench_user")
+
+    return {
+        "pdf_docling": ("pdf", docling_pdf),
+        "pdf_text_layer": ("pdf", text_layer_pdf),
+        "pdf_process_file": ("pdf", process_file_pdf),
+        "docx_docling": ("docx", docx),
+        "image_ocr": ("image", ocr_image),
+    }
+
+
+def bench_parsers(corpus: Dict[str, List[Dict]]) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, (file_type, load) in _parsers().items():
+        files = corpus[file_type]
+        if not files or "skipped" in files[0]:
+            results[name] = {"skipped": files[0]["skipped"] if files else "no files"}
+            continue
+        try:
+            parse = load()
+        except Exception as e:
+            results[name] = {"skipped": f"{type(e).__name__}: {e}"}
+            continue
+
+        pages = paragraphs = 0
+        start = time.perf_counter()
+        for f in files:
+            paragraphs += len(parse(f))
+            pages += f["pages"]
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            "files": len(files),
+            "pages": pages,
+            "paragraphs": paragraphs,
+            "seconds": elapsed,
+            "pages_per_sec": pages / elapsed if elapsed else None,
+        }
+        print(f"  {name}: {results[name]['pages_per_sec']:.2f} pages/s ({paragraphs} paragraphs)")
+    return results
+
+
+def _make_batch(texts: List[str], document_name: str):
+    from app.ingestion.paragraphs import ParagraphBatch
+
+    batch = ParagraphBatch(document_name, "bench_user")
+    for i, text in enumerate(texts):
+        batch.append(text, i // 20 + 1)
+    return batch
+
+
+def bench_indexing(paragraphs: int, collection_name: str) -> Dict[str, Any]:
+    from app.services.vector_store import add_many, embed_texts
+
+    batch = _make_batch(make_paragraph_texts(paragraphs, seed=7), "indexing_bench.pdf")
+
+    start = time.perf_counter()
+    embeddings = embed_texts(batch.texts)
+    embed_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    add_many(batch, collection_name=collection_name, embeddings=embeddings)
+    insert_time = time.perf_counter() - start
+
+    return {
+        "paragraphs": paragraphs,
+        "embed_seconds": embed_time,
+        "insert_seconds": insert_time,
+        "embed_paragraphs_per_sec": paragraphs / embed_time,
+        "insert_paragraphs_per_sec": paragraphs / insert_time,
+        "total_paragraphs_per_sec": paragraphs / (embed_time + insert_time),
+    }
+
+
+def bench_query_latency(sizes: List[int], queries: int) -> List[Dict[str, Any]]:
+    """
+    Grow the default collection through ``sizes`` and time cold
+    answer_query_with_context calls (retrieval and query-embedding caches
+    cleared before each call) at every size.
+    """
+    from app.services.vector_store import add_many, retrieval_cache
+    from app.services.embedding import query_embedding_cache
+    from app.services.query_llm import answer_query_with_context
+
+    results = []
+    texts = make_paragraph_texts(max(sizes), seed=11)
+    indexed = 0
+    for size in sorted(sizes):
+        # Separate documents so paragraph ordinals (and chunk IDs) stay unique
+        add_many(_make_batch(texts[indexed:size], f"query_bench_{size}.pdf"))
+        indexed = size
+
+        samples = []
+        for query in make_queries(queries, seed=size):
+            retrieval_cache.clear()
+            query_embedding_cache.clear()
+            start = time.perf_counter()
+            answer_query_with_context(query, 5)
+            samples.append(time.perf_counter() - start)
+
+        results.append({"corpus_paragraphs": size, "queries": queries, **_percentiles(samples)})
+        print(f"  {size} paragraphs: p50 {results[-1]['p50_ms']:.2f} ms, p99 {results[-1]['p99_ms']:.2f} ms")
+    return results
+
+
+def _flatten(value: Any, prefix: str = "") -> Dict[str, float]:
+    """Numeric leaves keyed by dotted path; list items are keyed by their corpus size when present."""
+    flat: Dict[str, float] = {}
+    if isinstance(value, dict):
+        for key, item in value.items():
+            flat.update(_flatten(item, f"{prefix}{key}."))
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            label = item.get("corpus_paragraphs", i) if isinstance(item, dict) else i
+            flat.update(_flatten(item, f"{prefix}{label}."))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        flat[prefix.rstrip(".")] = float(value)
+    return flat
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> None:
+    before, after = _flatten(baseline["results"]), _flatten(current["results"])
+    print(f"\n{'metric':60} {'baseline':>12} {'current':>12} {'change':>8}")
+    for key in sorted(before.keys() & after.keys()):
+        old, new = before[key], after[key]
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"{key:60} {old:12.3f} {new:12.3f} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000],
+                        help="Corpus sizes (paragraphs) for the query latency benchmark")
+    parser.add_argument("--queries", type=int, default=200, help="Queries timed per corpus size")
+    parser.add_argument("--index-paragraphs", type=int, default=5000)
+    parser.add_argument("--files", type=int, default=4, help="Synthetic files per type")
+    parser.add_argument("--pages", type=int, default=5, help="Pages per synthetic PDF/DOCX")
+    parser.add_argument("--embedding-backend", default="hashing")
+    parser.add_argument("--index-backend", default="mmap", help="VECTOR_INDEX_BACKEND to benchmark")
+    parser.add_argument("--skip-parsers", action="store_true")
+    parser.add_argument("--output", help="Result file, defaults to benchmarks/results/<timestamp>.json")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_suite_")
+    # Must be set before app modules read their configuration at import time
+    os.environ["EMBEDDING_BACKEND"] = args.embedding_backend
+    os.environ["VECTOR_INDEX_BACKEND"] = args.index_backend
+    os.environ["VECTOR_INDEX_DIR"] = os.path.join(workdir, "vector_index")
+    os.environ["LEXICAL_INDEX_DIR"] = os.path.join(workdir, "lexical")
+    os.environ["CATALOG_DB_PATH"] = os.path.join(workdir, "catalog.sqlite3")
+    os.environ["INGESTION_CACHE_ENABLED"] = "false"
+    if args.index_backend == "chroma":
+        os.chdir(workdir)
+
+    started = datetime.now(timezone.utc)
+    report: Dict[str, Any] = {
+        "schema": SCHEMA_VERSION,
+        "timestamp": started.isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "git_commit": _git_commit(),
+        },
+        "config": vars(args),
+        "results": {},
+    }
+
+    try:
+        if not args.skip_parsers:
+            print("Parsers:")
+            corpus = generate_corpus(
+                os.path.join(workdir, "corpus"), pdfs=args.files, docxs=args.files,
+                images=args.files, pages=args.pages
+            )
+            report["results"]["parsers"] = bench_parsers(corpus)
+
+        print("Embedding + insertion:")
+        report["results"]["indexing"] = bench_indexing(args.index_paragraphs, "bench_indexing")
+        print(f"  {report['results']['indexing']['total_paragraphs_per_sec']:.0f} paragraphs/s")
+
+        print("answer_query_with_context latency:")
+        report["results"]["query_latency"] = bench_query_latency(args.sizes, args.queries)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    from app.services.embedding import get_embedding_engine
+    report["environment"]["embedding_model"] = get_embedding_engine().name
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{started.strftime('%Y%m%dT%H%M%SZ')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
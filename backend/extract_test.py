@@ -1,17 +1,19 @@
+import os
+import sys
+
 from app.ingestion.manager import process_file
 
-# Test any file you want
-test_file_path = "tests/test_files/Synopsis_Miscro-dopler_(1)[1].docx"  # or your .docx or .png
+# Test any file you want: python extract_test.py <path to .pdf/.docx/.png>
+test_file_path = sys.argv[1] if len(sys.argv) > 1 else "tests/test_files/Synopsis_Miscro-dopler_(1)[1].docx"
 user_id = "debug_user"
 
-result = process_file(test_file_path, user_id=user_id)
-
-print("\n==== METADATA ====")
-print(result["metadata"])
+paragraphs = process_file(test_file_path, os.path.basename(test_file_path), user_id)
 
-print("\n==== FILE SIZE ====")
-print(result["file_size"])
+print("\n==== DOCUMENT ====")
+print(f"{paragraphs.document_name}: {len(paragraphs)} paragraphs")
 
-print("\n==== TEXT WITH CITATIONS (first 10 paragraphs) ====")
-for item in result["text_with_citations"][:20]:
-    print(f"[Page {item['page']}, Paragraph {item['paragraph']}] {item['text']}")
+print("\n==== TEXT WITH CITATIONS (first 20 paragraphs) ====")
+for i, item in enumerate(paragraphs):
+    if i == 20:
+        break
+    print(f"[Page {item['page']}, Paragraph {i + 1}] {item['text']}")
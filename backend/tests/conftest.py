@@ -0,0 +1,38 @@
+import os
+import sys
+import uuid
+import tempfile
+
+import pytest
+
+# Run against the deterministic hashing embedder and throwaway index files.
+# Set before any app module is imported, since they read their configuration at import time.
+_workdir = tempfile.mkdtemp(prefix="backend_tests_")
+os.environ.setdefault("EMBEDDING_BACKEND", "hashing")
+os.environ.setdefault("LEXICAL_INDEX_DIR", os.path.join(_workdir, "lexical"))
+os.environ.setdefault("CATALOG_DB_PATH", os.path.join(_workdir, "catalog.sqlite3"))
+os.environ.setdefault("RETRIEVAL_CACHE_SIZE", "8")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def mmap_store(tmp_path):
+    """
+    Vector store on a fresh mmap index directory; yields a collection name
+    not used by any other test (the catalog and lexical indexes are shared
+    by the session).
+    """
+    from app.core.resources import registry
+    from app.services.mmap_index import MmapIndexClient
+    from app.services.vector_store import invalidate_collection, retrieval_cache
+
+    client = MmapIndexClient(str(tmp_path / "vector_index"))
+    registry.register("chroma_client", lambda: client)
+    registry.reset("chroma_client")
+    invalidate_collection()
+    retrieval_cache.clear()
+    yield f"test_{uuid.uuid4().hex[:12]}"
+    invalidate_collection()
+    retrieval_cache.clear()
+    registry.reset("chroma_client")
@@ -0,0 +1,86 @@
+import pytest
+
+from app.services import vector_store
+from app.services.lexical_index import BM25Index
+from app.services.query_llm import answer_queries_with_context, answer_query_with_context
+from app.services.vector_store import add_many, retrieval_cache, search_vector_store, search_vector_store_batch
+
+TEXTS = [
+    "clause 4.2.1 limits liability to the fees paid",
+    "the supplier indemnifies the customer against third party claims",
+    "either party may terminate for convenience with ninety days notice",
+    "fees are payable within thirty days of the invoice date",
+    "the agreement is governed by the laws of england",
+    "confidential information excludes public knowledge",
+]
+QUERIES = ["clause 4.2.1", "terminate for convenience", "invoice fees", "clause 4.2.1"]
+
+
+@pytest.fixture
+def corpus(mmap_store):
+    add_many(
+        [{"text": text, "page": i + 1, "document_name": "contract.pdf", "user_id": "tester"} for i, text in enumerate(TEXTS)],
+        collection_name=mmap_store,
+    )
+    return mmap_store
+
+
+def _ids(results):
+    return [result["id"] for result in results]
+
+
+@pytest.mark.parametrize("mode", ["hybrid", "lexical", "dense"])
+def test_batch_matches_one_by_one_search(corpus, mode):
+    expected = [_ids(search_vector_store(query, 3, corpus, mode=mode)) for query in QUERIES]
+    retrieval_cache.clear()
+
+    results = search_vector_store_batch(QUERIES, 3, corpus, mode=mode)
+
+    assert [_ids(query_results) for query_results in results] == expected
+    if mode != "dense":
+        assert all("score" in result for query_results in results for result in query_results)
+
+
+def test_hybrid_batch_runs_one_dense_search_for_unique_queries(corpus, monkeypatch):
+    calls = []
+    batch = vector_store.query_vector_store_batch
+
+    def counting_batch(queries, *args, **kwargs):
+        calls.append(list(queries))
+        return batch(queries, *args, **kwargs)
+
+    monkeypatch.setattr(vector_store, "query_vector_store_batch", counting_batch)
+
+    first = search_vector_store_batch(QUERIES, 3, corpus, mode="hybrid")
+    again = search_vector_store_batch(QUERIES, 3, corpus, mode="hybrid")
+
+    assert calls == [["clause 4.2.1", "terminate for convenience", "invoice fees"]]
+    assert [_ids(results) for results in again] == [_ids(results) for results in first]
+    assert first[0] is not first[3]
+
+
+def test_unknown_mode_is_rejected(corpus):
+    with pytest.raises(ValueError):
+        search_vector_store_batch(QUERIES, 3, corpus, mode="semantic")
+
+
+def test_batch_answers_use_the_same_retrieval_as_single_answers(corpus, monkeypatch):
+    monkeypatch.setattr(vector_store, "collection_for", lambda user_id=None: corpus)
+    filters = {"user_id": "tester"}
+    lexical_searches = []
+    search = BM25Index.search
+
+    def recording_search(self, query, *args, **kwargs):
+        lexical_searches.append(query)
+        return search(self, query, *args, **kwargs)
+
+    monkeypatch.setattr(BM25Index, "search", recording_search)
+
+    single = [answer_query_with_context(query, 3, filters)["answer"] for query in QUERIES]
+    retrieval_cache.clear()
+    lexical_searches.clear()
+    batch = [answer["answer"] for answer in answer_queries_with_context(QUERIES, 3, filters)]
+
+    assert batch == single
+    # Hybrid by default: BM25 is consulted once per unique query, as on the single path
+    assert lexical_searches == ["clause 4.2.1", "terminate for convenience", "invoice fees"]
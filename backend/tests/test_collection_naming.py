@@ -0,0 +1,54 @@
+import re
+
+import pytest
+
+from app.services import vector_store
+from app.services.vector_store import DEFAULT_COLLECTION, collection_for, retrieval_scope
+
+# Chroma's collection name rules
+CHROMA_NAME = re.compile(r"^[a-zA-Z0-9][a-zA-Z0-9._-]{1,61}[a-zA-Z0-9]$")
+
+
+@pytest.fixture
+def per_tenant(monkeypatch):
+    monkeypatch.setattr(vector_store, "COLLECTION_PER_TENANT", True)
+
+
+@pytest.mark.parametrize("user_id", [
+    "alice",
+    "a",
+    "bob_",
+    "carol-",
+    "dave.",
+    "user@example.com",
+    "ünïcødé",
+    "x" * 200,
+    "-" * 70,
+])
+def test_tenant_collection_names_are_valid_for_chroma(per_tenant, user_id):
+    name = collection_for(user_id)
+
+    assert CHROMA_NAME.match(name), name
+    assert ".." not in name
+
+
+def test_tenant_collection_names_are_distinct_and_stable(per_tenant):
+    # Sanitizing and clamping map these onto the same readable part
+    users = ["a.b", "a_b", "a b", "x" * 30, "x" * 31]
+    names = [collection_for(user_id) for user_id in users]
+
+    assert len(set(names)) == len(users)
+    assert names == [collection_for(user_id) for user_id in users]
+    assert collection_for("alice").startswith(f"{DEFAULT_COLLECTION}_alice_")
+
+
+def test_tenant_scope_drops_the_user_filter(per_tenant):
+    collection_name, where = retrieval_scope(user_id="alice", document_names=["a.pdf"])
+
+    assert collection_name == collection_for("alice")
+    assert where == {"document_name": "a.pdf"}
+
+
+def test_shared_collection_without_tenancy():
+    assert collection_for("alice") == DEFAULT_COLLECTION
+    assert retrieval_scope(user_id="alice") == (DEFAULT_COLLECTION, {"user_id": "alice"})
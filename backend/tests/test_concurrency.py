@@ -0,0 +1,176 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import query_router
+from app.services.concurrency import BoundedExecutor, OverloadedError, SingleFlight
+from app.services.security import verify_api_key
+from app.services.vector_store import add_many
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flights = SingleFlight()
+    runs = []
+
+    async def compute():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return {"answer": 42}
+
+    async def main():
+        return await asyncio.gather(*(flights.do("key", compute) for _ in range(5)))
+
+    results = asyncio.run(main())
+
+    assert len(runs) == 1
+    assert all(result is results[0] for result in results)
+    assert flights.stats() == {"calls": 5, "coalesced": 4, "in_flight": 0}
+
+
+def test_single_flight_propagates_errors_to_every_waiter():
+    flights = SingleFlight()
+    runs = []
+
+    async def fail():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(*(flights.do("key", fail) for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(main())
+
+    assert len(runs) == 1
+    assert all(isinstance(error, ValueError) and str(error) == "boom" for error in errors)
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_single_flight_runs_again_once_the_first_call_finished():
+    flights = SingleFlight()
+    runs = []
+
+    async def compute():
+        runs.append(1)
+        return len(runs)
+
+    async def main():
+        return [await flights.do("key", compute), await flights.do("key", compute), await flights.do("other", compute)]
+
+    assert asyncio.run(main()) == [1, 2, 3]
+
+
+def test_single_flight_keeps_computing_when_a_waiter_is_cancelled():
+    flights = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(flights.do("key", compute))
+        second = asyncio.ensure_future(flights.do("key", compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_bounded_executor_caps_work_in_flight():
+    executor = BoundedExecutor(max_workers=8, max_in_flight=2, queue_timeout=5, name="test")
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+
+    def work(i):
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(0.02)
+        with lock:
+            state["running"] -= 1
+        return i
+
+    async def main():
+        return await asyncio.gather(*(executor.run(work, i) for i in range(6)))
+
+    assert asyncio.run(main()) == list(range(6))
+    assert state["peak"] == 2
+    assert executor.stats() == {"max_in_flight": 2, "rejected": 0}
+
+
+def test_bounded_executor_rejects_when_no_slot_frees_up():
+    executor = BoundedExecutor(max_workers=2, max_in_flight=1, queue_timeout=0.05, name="test")
+    release = threading.Event()
+
+    async def main():
+        blocked = asyncio.ensure_future(executor.run(release.wait, 5))
+        await asyncio.sleep(0.01)
+        with pytest.raises(OverloadedError):
+            await executor.run(lambda: None)
+        release.set()
+        return await blocked
+
+    assert asyncio.run(main()) is True
+    assert executor.stats()["rejected"] == 1
+
+
+def test_bounded_executor_releases_the_slot_on_error():
+    executor = BoundedExecutor(max_workers=1, max_in_flight=1, queue_timeout=0.05, name="test")
+
+    def fail():
+        raise ValueError("boom")
+
+    async def main():
+        with pytest.raises(ValueError):
+            await executor.run(fail)
+        return await executor.run(lambda x: x * 2, 21)
+
+    assert asyncio.run(main()) == 42
+
+
+def _client():
+    app = FastAPI()
+    app.include_router(query_router.router, prefix="/api")
+    app.dependency_overrides[verify_api_key] = lambda: "test"
+    return TestClient(app)
+
+
+def test_stream_retrieval_runs_on_the_query_executor(mmap_store, monkeypatch):
+    add_many(
+        [{"text": "the notice period is ninety days", "page": 1, "document_name": "a.pdf", "user_id": "alice"}],
+        collection_name=mmap_store,
+    )
+    monkeypatch.setattr(query_router, "query_executor", BoundedExecutor(2, 2, 5, name="stream-test"))
+    threads = []
+    retrieve = query_router.retrieve_answer_context
+
+    def recording_retrieve(*args):
+        threads.append(threading.current_thread().name)
+        return retrieve(*args)
+
+    monkeypatch.setattr(query_router, "retrieve_answer_context", recording_retrieve)
+
+    response = _client().post(
+        "/api/query/stream", params={"format": "ndjson"}, json={"query": "notice period", "user_id": "alice"}
+    )
+
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert response.status_code == 200
+    assert [event["event"] for event in events][0] == "citations"
+    assert events[-1]["event"] == "done"
+    assert len(threads) == 1 and threads[0].startswith("stream-test")
+
+
+def test_stream_answers_429_when_the_executor_is_saturated(monkeypatch):
+    # No slots at all: every caller times out waiting for one
+    monkeypatch.setattr(query_router, "query_executor", BoundedExecutor(1, 0, 0.01, name="stream-test"))
+
+    response = _client().post("/api/query/stream", json={"query": "notice period"})
+
+    assert response.status_code == 429
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from app.services import context
+from app.services.context import estimate_tokens, pack_context
+
+QUERY = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+
+
+@pytest.fixture
+def query_vector(monkeypatch):
+    monkeypatch.setattr(context, "embed_query", lambda query: QUERY)
+
+
+@pytest.fixture
+def no_embedding(monkeypatch):
+    def fail(query):
+        raise AssertionError("the query should not be embedded")
+
+    monkeypatch.setattr(context, "embed_query", fail)
+
+
+def _unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def _sources(names):
+    return [{"filename": name} for name in names]
+
+
+def test_near_duplicates_are_dropped_and_results_sorted_by_relevance(query_vector):
+    names = ["best", "copy", "side", "other"]
+    vectors = [_unit(1, 0, 0), _unit(0.99, 0.14, 0), _unit(0.6, 0.8, 0), _unit(0.7, 0, 0.714)]
+
+    chunks, sources = pack_context("q", names, _sources(names), vectors, token_budget=1000)
+
+    assert chunks == ["best", "other", "side"]
+    assert [source["filename"] for source in sources] == chunks
+
+
+def test_lower_lambda_prefers_diverse_chunks(query_vector):
+    names = ["best", "similar", "different"]
+    vectors = [_unit(1, 0, 0), _unit(0.9, 0.4359, 0), _unit(0.5, 0, 0.866)]
+    # Room for two chunks only
+    budget = 2 * (estimate_tokens("different") + 4)
+
+    relevant, _ = pack_context("q", names, _sources(names), vectors, token_budget=budget, mmr_lambda=1.0)
+    diverse, _ = pack_context("q", names, _sources(names), vectors, token_budget=budget, mmr_lambda=0.3)
+
+    assert relevant == ["best", "similar"]
+    assert diverse == ["best", "different"]
+
+
+def test_packing_stops_at_the_token_budget(no_embedding):
+    chunks = ["a" * 40, "b" * 400, "c" * 40, "d" * 40]
+    # 14 tokens per short chunk with framing; the long one never fits
+    packed, sources = pack_context("q", chunks, _sources("abcd"), token_budget=30)
+
+    assert packed == ["a" * 40, "c" * 40]
+    assert [source["filename"] for source in sources] == ["a", "c"]
+
+
+def test_chunk_over_budget_is_truncated(no_embedding):
+    packed, sources = pack_context("q", ["x" * 400, "y" * 400], _sources("xy"), token_budget=10)
+
+    assert packed == ["x" * 24]
+    assert sources == [{"filename": "x"}]
+
+
+def test_missing_embeddings_keep_retrieval_order_and_duplicates(no_embedding):
+    chunks = ["same", "same", "third"]
+
+    assert pack_context("q", chunks, _sources("abc"), None, token_budget=1000)[0] == chunks
+    vectors = [_unit(1, 0, 0), None, _unit(0, 1, 0)]
+    assert pack_context("q", chunks, _sources("abc"), vectors, token_budget=1000)[0] == chunks
+
+
+def test_empty_context():
+    assert pack_context("q", [], [], [], token_budget=100) == ([], [])
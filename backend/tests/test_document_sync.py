@@ -0,0 +1,121 @@
+from app.ingestion.paragraphs import ParagraphBatch
+from app.services.catalog import get_catalog
+from app.services.vector_store import (
+    _match_previous,
+    content_hash,
+    delete_document,
+    get_chroma_collection,
+    sync_document,
+)
+
+DOCUMENT = "report.pdf"
+USER = "tester"
+TEXTS = [f"paragraph {i} about clause {i} of the contract" for i in range(6)]
+
+
+def _batch(texts, per_page=2):
+    batch = ParagraphBatch(DOCUMENT, USER)
+    for i, text in enumerate(texts):
+        batch.append(text, i // per_page + 1)
+    return batch
+
+
+def _summary(result):
+    return {key: result[key] for key in ("added", "removed", "unchanged", "updated", "embedded")}
+
+
+def _pages(collection_name, ids):
+    found = get_chroma_collection(collection_name).get(ids=ids, include=["metadatas"])
+    pages = dict(zip(found["ids"], (metadata["page"] for metadata in found["metadatas"])))
+    return [pages[chunk_id] for chunk_id in ids]
+
+
+def test_first_sync_adds_everything_and_resync_is_a_no_op(mmap_store):
+    first = sync_document(_batch(TEXTS), mmap_store)
+    again = sync_document(_batch(TEXTS), mmap_store)
+
+    assert _summary(first) == {"added": 6, "removed": 0, "unchanged": 0, "updated": 0, "embedded": 6}
+    assert _summary(again) == {"added": 0, "removed": 0, "unchanged": 6, "updated": 0, "embedded": 0}
+    assert again["chunk_ids"] == first["chunk_ids"]
+
+
+def test_inserted_paragraph_keeps_the_ids_of_the_rest(mmap_store):
+    first = sync_document(_batch(TEXTS), mmap_store)
+    second = sync_document(_batch(["a new opening paragraph"] + TEXTS), mmap_store)
+
+    # Every old paragraph shifted by one position; three of them onto the next page
+    assert _summary(second) == {"added": 1, "removed": 0, "unchanged": 6, "updated": 3, "embedded": 1}
+    assert second["chunk_ids"][1:] == first["chunk_ids"]
+    assert _pages(mmap_store, second["chunk_ids"]) == [1, 1, 2, 2, 3, 3, 4]
+    assert get_chroma_collection(mmap_store).count() == 7
+
+
+def test_reordered_paragraphs_only_update_metadata(mmap_store):
+    first = sync_document(_batch(TEXTS), mmap_store)
+    second = sync_document(_batch(TEXTS[4:] + TEXTS[:4]), mmap_store)
+
+    assert _summary(second) == {"added": 0, "removed": 0, "unchanged": 6, "updated": 6, "embedded": 0}
+    assert second["chunk_ids"] == first["chunk_ids"][4:] + first["chunk_ids"][:4]
+    assert _pages(mmap_store, second["chunk_ids"]) == [1, 1, 2, 2, 3, 3]
+
+
+def test_edited_paragraph_replaces_only_its_chunk(mmap_store):
+    first = sync_document(_batch(TEXTS), mmap_store)
+    edited = list(TEXTS)
+    edited[2] = "paragraph 2 was rewritten entirely"
+    second = sync_document(_batch(edited), mmap_store)
+
+    assert _summary(second) == {"added": 1, "removed": 1, "unchanged": 5, "updated": 0, "embedded": 1}
+    assert first["chunk_ids"][2] not in second["chunk_ids"]
+    assert get_chroma_collection(mmap_store).get(ids=[first["chunk_ids"][2]], include=[])["ids"] == []
+
+
+def test_duplicated_paragraph_reuses_the_stored_embedding(mmap_store):
+    first = sync_document(_batch(TEXTS), mmap_store)
+    second = sync_document(_batch(TEXTS + [TEXTS[0]]), mmap_store)
+
+    assert _summary(second) == {"added": 1, "removed": 0, "unchanged": 6, "updated": 0, "embedded": 0}
+    assert second["chunk_ids"][:6] == first["chunk_ids"]
+    assert len(set(second["chunk_ids"])) == 7
+
+    # Dropping one copy again keeps the first occurrence's chunk
+    third = sync_document(_batch(TEXTS), mmap_store)
+    assert _summary(third) == {"added": 0, "removed": 1, "unchanged": 6, "updated": 0, "embedded": 0}
+    assert third["chunk_ids"] == first["chunk_ids"]
+
+
+def test_catalog_records_chunks_in_document_order(mmap_store):
+    texts = ["a new opening paragraph"] + TEXTS
+    result = sync_document(_batch(texts), mmap_store, file_type="pdf", file_size=123)
+
+    chunks = get_catalog().chunks(mmap_store, USER, DOCUMENT)
+    assert list(chunks) == result["chunk_ids"]
+    assert list(chunks.values()) == [content_hash(text) for text in texts]
+    [document] = get_catalog().documents(mmap_store, USER)
+    assert (document["document_name"], document["paragraphs"], document["page_count"]) == (DOCUMENT, 7, 4)
+    assert (document["file_type"], document["file_size"]) == ("pdf", 123)
+
+
+def test_delete_document_removes_chunks_and_catalog_entry(mmap_store):
+    sync_document(_batch(TEXTS), mmap_store)
+    other = ParagraphBatch("other.pdf", USER)
+    other.append("a paragraph of another document", 1)
+    sync_document(other, mmap_store)
+
+    assert delete_document(DOCUMENT, USER, mmap_store) == 6
+
+    assert get_chroma_collection(mmap_store).count() == 1
+    assert not get_catalog().has_document(mmap_store, USER, DOCUMENT)
+    assert get_catalog().has_document(mmap_store, USER, "other.pdf")
+    assert delete_document(DOCUMENT, USER, mmap_store) == 0
+
+
+def test_match_previous_renames_new_ids_taken_by_kept_chunks():
+    # The new text at position 0 got the positional ID a kept chunk already owns
+    ids = ["chunk-a", "chunk-b"]
+    hashes = ["new-text", "old-text"]
+    kept, new_positions = _match_previous(ids, hashes, {"chunk-a": "old-text"})
+
+    assert (kept, new_positions) == ([1], [0])
+    assert ids[1] == "chunk-a"
+    assert ids[0] not in ("chunk-a", "chunk-b")
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from app.ingestion.cache import IngestionCache
+from app.ingestion.paragraphs import ParagraphBatch
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return IngestionCache(str(tmp_path / "cache"))
+
+
+def _batch():
+    batch = ParagraphBatch("a.pdf", "u")
+    batch.append("first paragraph", 1)
+    batch.append("second paragraph", 2)
+    return batch
+
+
+def test_paragraphs_round_trip_and_are_counted(cache):
+    assert cache.get_paragraphs("key", "a.pdf", "u") is None
+    cache.put_paragraphs("key", _batch())
+
+    cached = cache.get_paragraphs("key", "renamed.pdf", "other")
+
+    assert cached.texts == ["first paragraph", "second paragraph"]
+    assert cached.document_name == "renamed.pdf"
+    stats = cache.stats()
+    assert (stats["paragraph_hits"], stats["paragraph_misses"]) == (1, 1)
+    assert stats["paragraph_hit_rate"] == 0.5
+
+
+def test_embeddings_are_kept_per_model(cache):
+    cache.put_embeddings("key", "model-a", np.ones((2, 3)))
+
+    assert cache.get_embeddings("key", "model-a").shape == (2, 3)
+    assert cache.get_embeddings("key", "model-b") is None
+    stats = cache.stats()
+    assert (stats["embedding_hits"], stats["embedding_misses"]) == (1, 1)
+
+
+def test_worker_counts_merge_into_the_parent(cache, tmp_path):
+    worker = IngestionCache(str(tmp_path / "cache"))
+    worker.get_paragraphs("missing", "a.pdf", "u")
+    worker.put_paragraphs("key", _batch())
+    worker.get_paragraphs("key", "a.pdf", "u")
+
+    counts = worker.take_counts()
+    assert worker.stats()["paragraph_misses"] == 0
+
+    cache.merge_counts(counts)
+    cache.merge_counts(counts)
+    stats = cache.stats()
+    assert (stats["paragraph_hits"], stats["paragraph_misses"]) == (2, 2)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = IngestionCache(str(tmp_path / "cache"), max_bytes=1000)
+    for i in range(3):
+        cache.put_embeddings(f"key{i}", "model", np.zeros((1, 64), dtype=np.float32))
+
+    assert cache.stats()["evictions"] >= 1
+    assert cache.get_embeddings("key2", "model") is not None
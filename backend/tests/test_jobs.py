@@ -0,0 +1,122 @@
+import os
+import sys
+import time
+import types
+
+import pytest
+
+from app.services.jobs import InProcessJobQueue, JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+@pytest.fixture
+def ingested(monkeypatch):
+    """Replaces the parser pipeline; records the files each call ingested and marks them done."""
+    calls = []
+
+    def ingest_files(files, user_id, on_result=None):
+        calls.append([filename for _, filename in files])
+        for _, filename in files:
+            on_result({"filename": filename, "status": "success", "message": "ok", "paragraphs": 1})
+
+    monkeypatch.setitem(sys.modules, "app.ingestion.pipeline", types.SimpleNamespace(ingest_files=ingest_files))
+    return types.SimpleNamespace(calls=calls)
+
+
+def _jobs(store, tmp_path, batch_id, names, status="queued"):
+    batch_dir = tmp_path / "uploads" / batch_id
+    batch_dir.mkdir(parents=True)
+    jobs = []
+    for name in names:
+        path = batch_dir / name
+        path.write_text("content")
+        jobs.append({
+            "job_id": f"{batch_id}-{name}", "batch_id": batch_id, "user_id": "u",
+            "filename": name, "file_path": str(path), "status": status,
+        })
+    store.create(jobs)
+    return jobs
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_claim_is_exclusive_until_the_lease_expires(store, tmp_path):
+    _jobs(store, tmp_path, "b1", ["a.pdf", "b.pdf"])
+
+    assert len(store.claim("worker-1", 60)) == 2
+    assert store.claim("worker-2", 60) == []
+
+    with store._conn:
+        store._conn.execute("UPDATE jobs SET lease_expires = ?", (time.time() - 1,))
+    assert {job["owner"] for job in store.claim("worker-2", 60)} == {"worker-2"}
+
+
+def test_renew_keeps_a_live_workers_jobs(store, tmp_path):
+    _jobs(store, tmp_path, "b1", ["a.pdf"])
+    store.claim("worker-1", 0.05)
+    time.sleep(0.1)
+    assert store.renew("worker-1", 60) == 1
+    assert store.claim("worker-2", 60) == []
+
+
+def test_startup_leaves_jobs_of_a_live_worker_alone(store, tmp_path, ingested):
+    _jobs(store, tmp_path, "b1", ["a.pdf"], status="processing")
+    store.claim("other-worker", 60)
+
+    queue = InProcessJobQueue(store, lease_seconds=60)
+    try:
+        time.sleep(0.1)
+        assert ingested.calls == []
+        assert store.get("b1-a.pdf")["owner"] == "other-worker"
+    finally:
+        queue.shutdown()
+
+
+def test_expired_jobs_are_recovered_and_uploads_removed(store, tmp_path, ingested):
+    jobs = _jobs(store, tmp_path, "b1", ["a.pdf", "b.pdf"], status="processing")
+    store.claim("dead-worker", -1)
+
+    queue = InProcessJobQueue(store, lease_seconds=60)
+    try:
+        _wait_for(lambda: all(store.get(job["job_id"])["status"] == "success" for job in jobs))
+        assert ingested.calls == [["a.pdf", "b.pdf"]]
+        assert store.get("b1-a.pdf")["owner"] == queue.worker_id
+        _wait_for(lambda: not os.path.exists(tmp_path / "uploads" / "b1"))
+    finally:
+        queue.shutdown()
+
+
+def test_submit_runs_only_jobs_it_could_claim(store, tmp_path, ingested):
+    queue = InProcessJobQueue(store, lease_seconds=60)
+    try:
+        jobs = _jobs(store, tmp_path, "b1", ["a.pdf", "b.pdf"])
+        store.claim("other-worker", 60, [jobs[1]["job_id"]])
+
+        queue.submit("b1", jobs)
+        _wait_for(lambda: store.get(jobs[0]["job_id"])["status"] == "success")
+        assert ingested.calls == [["a.pdf"]]
+        # The other worker's file stays until its own job finishes
+        assert os.path.exists(jobs[1]["file_path"])
+        assert not os.path.exists(jobs[0]["file_path"])
+    finally:
+        queue.shutdown()
+
+
+def test_heartbeat_takes_over_a_dead_workers_jobs(store, tmp_path, ingested):
+    queue = InProcessJobQueue(store, lease_seconds=0.3)
+    try:
+        jobs = _jobs(store, tmp_path, "b1", ["a.pdf"], status="processing")
+        store.claim("dead-worker", 0.1)
+        _wait_for(lambda: store.get(jobs[0]["job_id"])["status"] == "success")
+        assert ingested.calls == [["a.pdf"]]
+    finally:
+        queue.shutdown()
@@ -0,0 +1,149 @@
+import math
+
+import pytest
+
+from app.services import vector_store
+from app.services.catalog import get_catalog
+from app.services.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+from app.services.vector_store import add_many, get_chroma_collection, get_lexical_index, search_vector_store
+
+
+def _index(docs, **kwargs):
+    index = BM25Index(**kwargs)
+    index.add_many(list(docs), list(docs.values()))
+    return index
+
+
+def test_tokenize_keeps_clause_numbers_and_codes():
+    assert tokenize("See Clause 4.2.1 and ART-5, GDPR.") == ["see", "clause", "4.2.1", "and", "art-5", "gdpr"]
+
+
+def test_bm25_score_matches_the_formula():
+    index = _index({"a": "indemnity clause", "b": "payment terms", "c": "indemnity indemnity cap"})
+
+    [(top, score), (second, _)] = index.search("indemnity", k=5)
+
+    # Two of three documents contain the term; average length is 7/3
+    idf = math.log(1 + (3 - 2 + 0.5) / (2 + 0.5))
+    norm = 1.5 * (1 - 0.75 + 0.75 * 3 / (7 / 3))
+    assert top == "c"
+    assert score == pytest.approx(idf * 2 * 2.5 / (2 + norm))
+    assert second == "a"
+
+
+def test_rare_terms_outrank_common_ones():
+    index = _index({
+        "common": "the contract the contract",
+        "rare": "the force majeure clause",
+        "other": "the contract renewal",
+    })
+
+    assert index.search("contract majeure", k=1)[0][0] == "rare"
+
+
+def test_search_respects_allowed_and_k():
+    index = _index({f"d{i}": f"liability clause {i}" for i in range(5)})
+
+    assert len(index.search("liability", k=2)) == 2
+    assert [doc_id for doc_id, _ in index.search("liability", allowed={"d3"})] == ["d3"]
+    assert index.search("") == []
+    assert index.search("unknown") == []
+
+
+def test_adding_an_existing_id_replaces_it_and_remove_drops_postings():
+    index = _index({"a": "old wording", "b": "other text"})
+    index.add("a", "new wording")
+    index.remove_many(["b", "missing"])
+
+    assert len(index) == 1
+    assert index.search("old") == []
+    assert index.search("other") == []
+    assert index.search("new")[0][0] == "a"
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "index.json.gz")
+    index = _index({"a": "termination for convenience", "b": "termination for cause", "c": "fees"}, path=path)
+    index.remove_many(["c"])
+    index.set_collection_version(7)
+    index.save()
+
+    loaded = BM25Index(path)
+
+    assert loaded.collection_version == 7
+    assert len(loaded) == 2
+    assert loaded.search("termination convenience") == pytest.approx(index.search("termination convenience"))
+    loaded.add("d", "convenience store")
+    assert {doc_id for doc_id, _ in loaded.search("convenience")} == {"a", "d"}
+
+
+def test_unreadable_snapshot_is_ignored(tmp_path):
+    path = tmp_path / "index.json.gz"
+    path.write_bytes(b"not gzip")
+
+    index = BM25Index(str(path))
+
+    assert len(index) == 0
+    assert index.collection_version is None
+
+
+def test_reciprocal_rank_fusion_order():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a", "d"]], k=60)
+
+    assert [doc_id for doc_id, _ in fused] == ["a", "c", "b", "d"]
+    assert dict(fused)["a"] == pytest.approx(1 / 61 + 1 / 62)
+    assert dict(fused)["d"] == pytest.approx(1 / 63)
+
+
+def _paragraphs(texts, user_id="tester"):
+    return [{"text": text, "page": 1, "document_name": "a.pdf", "user_id": user_id} for text in texts]
+
+
+@pytest.fixture
+def rebuilds(monkeypatch):
+    """Counts lexical index rebuilds done by the vector store."""
+    counter = {"count": 0}
+
+    class CountingIndex(BM25Index):
+        def __init__(self, *args, **kwargs):
+            counter["count"] += 1
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(vector_store, "BM25Index", CountingIndex)
+    return counter
+
+
+def test_own_writes_keep_the_index_current(mmap_store, rebuilds):
+    add_many(_paragraphs(["warranty period of two years"]), collection_name=mmap_store)
+    search_vector_store("warranty", 5, mmap_store, mode="lexical")
+    rebuilds["count"] = 0
+
+    add_many(_paragraphs(["arbitration seat in geneva"]), collection_name=mmap_store)
+    results = search_vector_store("arbitration", 5, mmap_store, mode="lexical")
+
+    assert [result["text"] for result in results] == ["arbitration seat in geneva"]
+    assert rebuilds["count"] == 0
+    assert get_lexical_index(mmap_store).collection_version == get_catalog().collection_version(mmap_store)
+
+
+def test_another_writers_version_bump_triggers_a_rebuild(mmap_store, rebuilds):
+    add_many(_paragraphs(["warranty period of two years"]), collection_name=mmap_store)
+    search_vector_store("warranty", 5, mmap_store, mode="lexical")
+    rebuilds["count"] = 0
+
+    # Another process writes straight to the shared collection and bumps the shared version
+    get_chroma_collection(mmap_store).add(
+        ids=["external"],
+        documents=["escrow agent fees"],
+        metadatas=[{"document_name": "b.pdf", "user_id": "tester", "page": 1}],
+        embeddings=[[0.0] * len(vector_store.embed_query("x"))],
+    )
+    get_catalog().bump_collection_version(mmap_store)
+
+    results = search_vector_store("escrow", 5, mmap_store, mode="lexical")
+
+    assert [result["id"] for result in results] == ["external"]
+    assert rebuilds["count"] == 1
+    assert get_lexical_index(mmap_store).collection_version == get_catalog().collection_version(mmap_store)
+    search_vector_store("warranty", 5, mmap_store, mode="lexical")
+    assert rebuilds["count"] == 1
@@ -0,0 +1,182 @@
+import numpy as np
+import pytest
+
+from app.services import mmap_index
+from app.services.mmap_index import MmapCollection, MmapIndexClient
+
+
+def _vectors(n, dimension=8, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, dimension)).astype(np.float32)
+
+
+def _add(collection, start, vectors, **metadata):
+    ids = [f"id{start + i}" for i in range(len(vectors))]
+    collection.add(
+        ids=ids,
+        documents=[f"document {start + i}" for i in range(len(vectors))],
+        metadatas=[{"n": start + i, **metadata} for i in range(len(vectors))],
+        embeddings=vectors,
+    )
+    return ids
+
+
+@pytest.fixture
+def collection(tmp_path):
+    collection = MmapCollection(str(tmp_path / "c"), "c")
+    yield collection
+    collection.close()
+
+
+def test_query_returns_nearest_rows_with_squared_l2_distances(collection):
+    vectors = _vectors(20)
+    _add(collection, 0, vectors)
+
+    result = collection.query(query_embeddings=vectors[[3, 7]], n_results=3)
+
+    assert [ids[0] for ids in result["ids"]] == ["id3", "id7"]
+    assert result["distances"][0][0] == pytest.approx(0.0, abs=1e-4)
+    expected = np.sum((vectors - vectors[3]) ** 2, axis=1)
+    assert result["distances"][0] == pytest.approx(sorted(expected)[:3], rel=1e-4, abs=1e-4)
+    assert result["documents"][0][0] == "document 3"
+    assert result["metadatas"][0][0] == {"n": 3}
+
+
+def test_add_skips_existing_and_repeated_ids(collection):
+    vectors = _vectors(3)
+    _add(collection, 0, vectors)
+    collection.add(ids=["id0", "new", "new"], documents=["x", "y", "z"], embeddings=_vectors(3, seed=1))
+
+    assert collection.count() == 4
+    assert collection.get(ids=["id0", "new"])["documents"] == ["document 0", "y"]
+
+
+def test_get_by_ids_where_and_pages(collection):
+    vectors = _vectors(10)
+    _add(collection, 0, vectors)
+
+    by_ids = collection.get(ids=["id4", "id2"], include=["embeddings"])
+    assert by_ids["ids"] == ["id2", "id4"]
+    np.testing.assert_allclose(by_ids["embeddings"], vectors[[2, 4]])
+
+    assert collection.get(where={"n": {"$gte": 8}})["ids"] == ["id8", "id9"]
+    assert collection.get(where={"$and": [{"n": {"$in": [1, 2, 3]}}, {"n": {"$ne": 2}}]})["ids"] == ["id1", "id3"]
+    assert collection.get(include=[], limit=3, offset=4)["ids"] == ["id4", "id5", "id6"]
+
+
+def test_query_where_restricts_candidates(collection):
+    vectors = _vectors(10)
+    _add(collection, 0, vectors[:5], owner="alice")
+    _add(collection, 5, vectors[5:], owner="bob")
+
+    result = collection.query(query_embeddings=vectors[:1], n_results=10, where={"owner": "bob"})
+
+    assert sorted(result["ids"][0]) == ["id5", "id6", "id7", "id8", "id9"]
+
+
+def test_update_rewrites_metadata_only(collection):
+    vectors = _vectors(2)
+    _add(collection, 0, vectors)
+    collection.update(ids=["id1", "missing"], metadatas=[{"n": 1, "page": 4}, {"n": 0}])
+
+    assert collection.get(ids=["id0", "id1"])["metadatas"] == [{"n": 0}, {"n": 1, "page": 4}]
+    assert collection.query(query_embeddings=vectors[1:], n_results=1)["ids"] == [["id1"]]
+    with pytest.raises(ValueError):
+        collection.update(ids=["id0"], embeddings=vectors[:1])
+
+
+def test_delete_by_ids_and_where(collection):
+    vectors = _vectors(6)
+    _add(collection, 0, vectors)
+
+    collection.delete(ids=["id0"])
+    collection.delete(where={"n": {"$gte": 4}})
+
+    assert collection.count() == 3
+    result = collection.query(query_embeddings=vectors[[0]], n_results=6)
+    assert sorted(result["ids"][0]) == ["id1", "id2", "id3"]
+
+
+def test_compaction_keeps_ids_and_vectors(collection):
+    vectors = _vectors(10)
+    _add(collection, 0, vectors)
+    # Deleting more than half of the file triggers a compaction
+    collection.delete(ids=[f"id{i}" for i in range(6)])
+
+    assert collection._epoch == 1
+    assert collection._file_rows == 4
+    assert collection.get(include=[])["ids"] == ["id6", "id7", "id8", "id9"]
+    result = collection.query(query_embeddings=vectors[[8]], n_results=1)
+    assert result["ids"] == [["id8"]]
+    assert result["distances"][0][0] == pytest.approx(0.0, abs=1e-4)
+
+
+def test_other_instances_see_writes_deletes_and_compaction(tmp_path):
+    writer = MmapCollection(str(tmp_path / "c"), "c")
+    reader = MmapCollection(str(tmp_path / "c"), "c")
+    try:
+        vectors = _vectors(10)
+        _add(writer, 0, vectors[:4])
+        assert reader.count() == 4
+
+        _add(writer, 4, vectors[4:])
+        writer.delete(ids=["id1"])
+        assert reader.count() == 9
+        assert reader.query(query_embeddings=vectors[[6]], n_results=1)["ids"] == [["id6"]]
+
+        writer.delete(ids=[f"id{i}" for i in range(6)])
+        assert reader.get(include=[])["ids"] == ["id6", "id7", "id8", "id9"]
+        assert reader.query(query_embeddings=vectors[[9]], n_results=1)["ids"] == [["id9"]]
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_reads_stay_within_the_refreshed_snapshot(tmp_path, monkeypatch):
+    writer = MmapCollection(str(tmp_path / "c"), "c")
+    reader = MmapCollection(str(tmp_path / "c"), "c")
+    try:
+        vectors = _vectors(6)
+        _add(writer, 0, vectors[:3])
+        refresh = reader._refresh
+
+        def refresh_then_append():
+            refresh()
+            # Another process appends right after this reader looked
+            if writer.count() == 3:
+                _add(writer, 3, vectors[3:])
+
+        monkeypatch.setattr(reader, "_refresh", refresh_then_append)
+        result = reader.get(where={"n": {"$gte": 0}}, include=["embeddings"])
+        assert result["ids"] == ["id0", "id1", "id2"]
+        hits = reader.query(query_embeddings=vectors[[4]], n_results=6, where={"n": {"$gte": 0}})
+        assert sorted(hits["ids"][0]) == [f"id{i}" for i in range(6)]
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_ivf_probes_a_subset_and_finds_exact_matches(collection, monkeypatch):
+    monkeypatch.setattr(mmap_index, "VECTOR_INDEX_IVF_LISTS", 4)
+    monkeypatch.setattr(mmap_index, "VECTOR_INDEX_IVF_MIN_ROWS", 10)
+    monkeypatch.setattr(mmap_index, "VECTOR_INDEX_IVF_PROBES", 1)
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(4, 8)).astype(np.float32) * 10
+    vectors = np.concatenate([center + rng.normal(size=(50, 8)).astype(np.float32) * 0.1 for center in centers])
+    _add(collection, 0, vectors)
+
+    result = collection.query(query_embeddings=vectors[[10, 60, 110, 160]], n_results=1)
+
+    assert result["ids"] == [["id10"], ["id60"], ["id110"], ["id160"]]
+    ivf = collection._ivf
+    assert ivf is not None and len(ivf["centroids"]) == 4
+    assert sum(len(rows) for rows in ivf["lists"]) == 200
+
+
+def test_client_reopens_collections_by_name(tmp_path):
+    client = MmapIndexClient(str(tmp_path))
+    collection = client.get_or_create_collection("docs")
+    _add(collection, 0, _vectors(2))
+
+    assert client.get_or_create_collection("docs") is collection
+    client.delete_collection("docs")
+    assert client.get_or_create_collection("docs").count() == 0
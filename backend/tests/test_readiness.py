@@ -0,0 +1,42 @@
+import pytest
+
+# app.main imports the upload routes, which need the parser stack
+pytest.importorskip("fitz")
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.core.resources import registry
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "start_job_queue", lambda: None)
+    monkeypatch.setattr(main, "stop_job_queue", lambda: None)
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_ready_without_warmup_flag(client):
+    # WARMUP_ON_STARTUP is unset; this waits for the startup warmup to finish loading them
+    for name in main.READINESS_RESOURCES:
+        registry.get(name)
+
+    response = client.get("/api/ready")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+
+
+def test_resource_loaded_as_none_is_not_ready(client):
+    registry.register("embedding_function", lambda: None)
+    registry.reset("embedding_function")
+    registry.get("embedding_function")
+    try:
+        response = client.get("/api/ready")
+        assert response.status_code == 503
+        assert response.json()["resources"]["embedding_function"]["state"] == "failed"
+    finally:
+        from app.services import vector_store
+        registry.register("embedding_function", vector_store._create_embedding_function)
+        registry.reset("embedding_function")
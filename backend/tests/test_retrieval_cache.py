@@ -0,0 +1,177 @@
+import pytest
+
+from app.core.resources import registry
+from app.services import vector_store
+from app.services.vector_store import (
+    RETRIEVAL_CACHE_SIZE,
+    add_many,
+    delete_from_vector_store,
+    invalidate_collection,
+    query_vector_store,
+    retrieval_cache,
+)
+
+COLLECTION = "cache_test"
+
+
+class FakeCollection:
+    """In-memory stand-in for a Chroma collection that counts searches."""
+
+    def __init__(self):
+        self.rows = {}
+        self.queries = 0
+
+    def count(self):
+        return len(self.rows)
+
+    def get(self, ids=None, where=None, include=None, limit=None, offset=None):
+        found = [i for i in (ids if ids is not None else list(self.rows)) if i in self.rows]
+        found = found[offset or 0:]
+        if limit is not None:
+            found = found[:limit]
+        result = {"ids": found}
+        if include is None or "documents" in include:
+            result["documents"] = [self.rows[i][0] for i in found]
+        if include is None or "metadatas" in include:
+            result["metadatas"] = [self.rows[i][1] for i in found]
+        if include and "embeddings" in include:
+            result["embeddings"] = [self.rows[i][2] for i in found]
+        return result
+
+    def add(self, ids, documents, metadatas, embeddings=None):
+        for doc_id, text, metadata, vector in zip(ids, documents, metadatas, embeddings):
+            self.rows[doc_id] = (text, metadata, vector)
+
+    def delete(self, ids=None, where=None):
+        for doc_id in ids or []:
+            self.rows.pop(doc_id, None)
+
+    def query(self, query_embeddings=None, query_texts=None, n_results=5, where=None, include=None):
+        self.queries += 1
+        ids = [
+            doc_id for doc_id, (_, metadata, _) in self.rows.items()
+            if not where or all(metadata.get(key) == value for key, value in where.items())
+        ][:n_results]
+        return {
+            "ids": [ids],
+            "documents": [[self.rows[i][0] for i in ids]],
+            "metadatas": [[self.rows[i][1] for i in ids]],
+            "distances": [[0.0] * len(ids)],
+        }
+
+
+class FakeClient:
+    def __init__(self):
+        self.collections = {}
+
+    def get_or_create_collection(self, name, embedding_function=None, metadata=None):
+        return self.collections.setdefault(name, FakeCollection())
+
+    def delete_collection(self, name):
+        self.collections.pop(name, None)
+
+
+def _paragraphs(document_name, count, user_id="tester"):
+    return [
+        {"text": f"{document_name} paragraph {i} about contract clause {i}", "page": 1,
+         "document_name": document_name, "user_id": user_id}
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def collection():
+    client = FakeClient()
+    registry.register("chroma_client", lambda: client)
+    registry.reset("chroma_client")
+    invalidate_collection()
+    retrieval_cache.clear()
+    add_many(_paragraphs("first.pdf", 3), collection_name=COLLECTION)
+    yield client.get_or_create_collection(COLLECTION)
+    invalidate_collection()
+    retrieval_cache.clear()
+
+
+def test_repeated_query_is_served_from_cache(collection):
+    first = query_vector_store("contract clause", 2, COLLECTION)
+    second = query_vector_store("  Contract   CLAUSE ", 2, COLLECTION)
+
+    assert collection.queries == 1
+    assert second == first
+
+
+def test_cached_results_are_copies(collection):
+    query_vector_store("contract clause", 2, COLLECTION)[0]["metadata"]["page"] = 99
+
+    assert query_vector_store("contract clause", 2, COLLECTION)[0]["metadata"]["page"] == 1
+
+
+def test_add_many_forces_a_fresh_search(collection):
+    query_vector_store("contract clause", 5, COLLECTION)
+    version = vector_store.get_collection_version(COLLECTION)
+
+    add_many(_paragraphs("second.pdf", 2), collection_name=COLLECTION)
+    results = query_vector_store("contract clause", 5, COLLECTION)
+
+    assert vector_store.get_collection_version(COLLECTION) > version
+    assert collection.queries == 2
+    assert len(results) == 5
+
+
+def test_delete_forces_a_fresh_search(collection):
+    results = query_vector_store("contract clause", 5, COLLECTION)
+    version = vector_store.get_collection_version(COLLECTION)
+
+    delete_from_vector_store([results[0]["id"]], COLLECTION)
+    after = query_vector_store("contract clause", 5, COLLECTION)
+
+    assert vector_store.get_collection_version(COLLECTION) > version
+    assert collection.queries == 2
+    assert results[0]["id"] not in [result["id"] for result in after]
+
+
+def test_invalidate_collection_forces_a_fresh_search(collection):
+    query_vector_store("contract clause", 2, COLLECTION)
+    version = vector_store.get_collection_version(COLLECTION)
+
+    invalidate_collection(COLLECTION)
+    query_vector_store("contract clause", 2, COLLECTION)
+
+    assert vector_store.get_collection_version(COLLECTION) > version
+    assert collection.queries == 2
+
+
+def test_invalidating_all_collections_forces_a_fresh_search(collection):
+    query_vector_store("contract clause", 2, COLLECTION)
+
+    invalidate_collection()
+    query_vector_store("contract clause", 2, COLLECTION)
+
+    assert collection.queries == 2
+
+
+def test_where_and_n_results_are_part_of_the_key(collection):
+    query_vector_store("contract clause", 2, COLLECTION)
+    query_vector_store("contract clause", 3, COLLECTION)
+    query_vector_store("contract clause", 2, COLLECTION, where={"document_name": "first.pdf"})
+    query_vector_store("contract clause", 2, COLLECTION, where={"document_name": "other.pdf"})
+    assert collection.queries == 4
+
+    query_vector_store("contract clause", 3, COLLECTION)
+    query_vector_store("contract clause", 2, COLLECTION, where={"document_name": "first.pdf"})
+    assert collection.queries == 4
+
+
+def test_lru_eviction_stays_within_cache_size(collection):
+    queries = [f"clause {i}" for i in range(RETRIEVAL_CACHE_SIZE + 3)]
+    for query in queries:
+        query_vector_store(query, 1, COLLECTION)
+    assert len(retrieval_cache) == RETRIEVAL_CACHE_SIZE
+    assert collection.queries == len(queries)
+
+    # Most recent entries are kept, the oldest were evicted
+    query_vector_store(queries[-1], 1, COLLECTION)
+    assert collection.queries == len(queries)
+    query_vector_store(queries[0], 1, COLLECTION)
+    assert collection.queries == len(queries) + 1
+    assert len(retrieval_cache) == RETRIEVAL_CACHE_SIZE
@@ -0,0 +1,68 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import query_router
+from app.services.security import verify_api_key
+from app.services.themes import get_themes
+from app.services.vector_store import DEFAULT_COLLECTION, add_many, build_where
+
+
+def _paragraphs(user_id, document_name, texts):
+    return [
+        {"text": text, "page": 1, "document_name": document_name, "user_id": user_id}
+        for text in texts
+    ]
+
+
+ALICE = [
+    "alice secret salary figures for 2024",
+    "alice medical leave policy text",
+    "alice quarterly budget review notes",
+]
+BOB = [
+    "bob warehouse inventory checklist",
+    "bob delivery route planning guide",
+]
+
+
+def _texts(themes):
+    return {rep["text"] for theme in themes for rep in theme["representatives"]}
+
+
+def test_themes_are_scoped_by_where(mmap_store):
+    add_many(_paragraphs("alice", "a.pdf", ALICE), collection_name=mmap_store)
+    add_many(_paragraphs("bob", "b.pdf", BOB), collection_name=mmap_store)
+
+    bob_themes = get_themes(mmap_store, build_where(user_id="bob"))
+
+    assert _texts(bob_themes) <= set(BOB)
+    assert sum(theme["size"] for theme in bob_themes) == len(BOB)
+    assert {doc for theme in bob_themes for doc in theme["documents"]} == {"b.pdf"}
+    # The unfiltered engine is separate and still sees everything
+    assert sum(theme["size"] for theme in get_themes(mmap_store)) == len(ALICE) + len(BOB)
+
+
+def test_scoped_themes_follow_new_writes(mmap_store):
+    add_many(_paragraphs("bob", "b.pdf", BOB[:1]), collection_name=mmap_store)
+    assert sum(theme["size"] for theme in get_themes(mmap_store, build_where(user_id="bob"))) == 1
+
+    add_many(_paragraphs("alice", "a.pdf", ALICE), collection_name=mmap_store)
+    add_many(_paragraphs("bob", "b2.pdf", BOB[1:]), collection_name=mmap_store)
+
+    assert sum(theme["size"] for theme in get_themes(mmap_store, build_where(user_id="bob"))) == len(BOB)
+
+
+def test_themes_route_never_returns_another_users_text(mmap_store):
+    add_many(_paragraphs("alice", "a.pdf", ALICE), collection_name=DEFAULT_COLLECTION)
+    add_many(_paragraphs("bob", "b.pdf", BOB), collection_name=DEFAULT_COLLECTION)
+
+    app = FastAPI()
+    app.include_router(query_router.router, prefix="/api")
+    app.dependency_overrides[verify_api_key] = lambda: "test"
+    response = TestClient(app).get("/api/themes", params={"user_id": "bob"})
+
+    assert response.status_code == 200
+    themes = response.json()["themes"]
+    assert themes
+    assert _texts(themes) <= set(BOB)
+    assert not any("alice" in theme["summary"] for theme in themes)